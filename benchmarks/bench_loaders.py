@@ -0,0 +1,99 @@
+"""
+Startup time of the product and customer loaders.
+
+    python benchmarks/bench_loaders.py            # 10k, 100k and 1M rows
+    python benchmarks/bench_loaders.py 50000      # custom sizes
+
+Writes synthetic CSVs to a temp folder and times ProductManager and
+CustomerManager loading them. The old row-by-row (iterrows) loader is timed
+next to the product loader for comparison, up to 100k rows.
+"""
+import os
+import sys
+import random
+import tempfile
+import time
+import contextlib
+import io
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.product_manager import ProductManager, PRODUCT_COLUMNS
+from src.customer_manager import CustomerManager, CUSTOMER_COLUMNS
+
+LEGACY_MAX_ROWS = 100_000
+
+
+def write_products(path, n):
+    rng = random.Random(n)
+    pd.DataFrame({
+        "EAN": [f"{7000000000000 + i:013d}" for i in range(n)],
+        "Name": [f"Product {i}" for i in range(n)],
+        "Shelf Life": [rng.randint(1, 30) for _ in range(n)],
+        # Most products have no URL, like the wholesaler feed
+        "URL": [f"example.com/p/{i}" if i % 10 == 0 else None for i in range(n)],
+        "Price In": [round(rng.uniform(5, 200), 2) for _ in range(n)],
+        "Price Out": [round(rng.uniform(5, 300), 2) for _ in range(n)],
+        "Warn Days": pd.array([rng.randint(1, 5) if i % 4 == 0 else None for i in range(n)], dtype="Int64"),
+    }, columns=PRODUCT_COLUMNS).to_csv(path, index=False)
+
+
+def write_customers(path, n):
+    pd.DataFrame({
+        "Customer ID": [f"CUST-{i:03d}" for i in range(1, n + 1)],
+        "Name": [f"Customer {i}" for i in range(n)],
+        "Company Name": [f"Company {i} AS" if i % 2 else None for i in range(n)],
+        "Org Number": [str(900000000 + i) if i % 2 else None for i in range(n)],
+        "VAT Number": [None] * n,
+        "Phone": [f"+47 {40000000 + i}" for i in range(n)],
+        "Email": [f"c{i}@example.com" for i in range(n)],
+        "Address": [f"Gate {i}, 0150 Oslo" for i in range(n)],
+        "Website": [None] * n,
+        "Notes": [None] * n,
+    }, columns=CUSTOMER_COLUMNS).to_csv(path, index=False)
+
+
+def legacy_load_products(path):
+    """The row-by-row loader ProductManager used before, for comparison."""
+    products = {}
+    df = pd.read_csv(path, dtype={'EAN': str})
+    for _, row in df.iterrows():
+        products[str(row['EAN'])] = {
+            'name': row['Name'],
+            'shelf_life': int(row['Shelf Life']),
+            'url': str(row.get('URL', '')),
+            'price_in': float(row.get('Price In', 0.0)),
+            'price_out': float(row.get('Price Out', 0.0)),
+            'warn_days': int(row['Warn Days']) if pd.notna(row.get('Warn Days')) else None
+        }
+    return products
+
+
+def timed(fn):
+    start = time.perf_counter()
+    # The managers print a "Loaded ..." line
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'rows':>10} {'products':>10} {'legacy':>10} {'customers':>10}")
+        for n in sizes:
+            products_csv = os.path.join(tmp, f"products-{n}.csv")
+            customers_csv = os.path.join(tmp, f"customers-{n}.csv")
+            write_products(products_csv, n)
+            write_customers(customers_csv, n)
+
+            products = timed(lambda: ProductManager(products_csv))
+            legacy = timed(lambda: legacy_load_products(products_csv)) if n <= LEGACY_MAX_ROWS else None
+            customers = timed(lambda: CustomerManager(customers_csv))
+            legacy_text = f"{legacy:9.2f}s" if legacy is not None else f"{'-':>10}"
+            print(f"{n:>10} {products:9.2f}s {legacy_text} {customers:9.2f}s")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
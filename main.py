@@ -1,28 +1,98 @@
-from nicegui import ui
+from src.startup import profile_imports, timed, report_startup
+# SHELFLIFE_PROFILE_STARTUP=1 reports the time of every import and init step below
+profile_imports()
+
+import os
+from nicegui import app, ui
 from src.product_manager import ProductManager
 from src.inventory_manager import InventoryManager
+from src.inventory_storage import SQLiteInventoryStorage, JournalInventoryStorage, CSVInventoryStorage
 from src.qr_generator import QRGenerator
 from src.alert_system import AlertSystem
-from src.scanner import QRScanner
+from src.expiry_watcher import ExpiryWatcher
+from src.scan_worker import ScanWorker
 from src.customer_manager import CustomerManager
 from src.order_manager import OrderManager
 from src.recipe_manager import RecipeManager
 from src.ui import create_ui
+from src.persistence import flush_all
+from src.events import EventBus
+
+# The managers and background jobs, created once by start_backend and shared by every browser tab
+backend = {}
+# SHELFLIFE_INVENTORY_STORAGE=journal keeps the stock as CSV snapshots plus a movement journal instead of SQLite
+USE_JOURNAL = os.environ.get("SHELFLIFE_INVENTORY_STORAGE", "sqlite") == "journal"
+
 
 # 1. Initialize Backend Systems
-products = ProductManager()
-inventory = InventoryManager()
-internal_inventory = InventoryManager("data/inventory/internal_inventory.csv")
-customers = CustomerManager()
-orders = OrderManager()
-recipes = RecipeManager()
-qr_gen = QRGenerator()
-alerts = AlertSystem()
-scanner = QRScanner()
-
-# 2. Build the UI
-create_ui(products, inventory, internal_inventory, customers, orders, recipes, qr_gen, alerts, scanner)
+def start_backend():
+    # Every manager publishes its changes here, so all open tabs stay in step
+    bus = EventBus()
+    with timed("ProductManager"):
+        products = ProductManager(bus=bus)
+    # Both inventories share one SQLite database (one table each); the CSVs are imported on first run
+    inventory_db = "data/inventory/inventory.db"
+
+    def inventory_storage(table, csv_path):
+        if USE_JOURNAL:
+            return JournalInventoryStorage(CSVInventoryStorage(csv_path))
+        return SQLiteInventoryStorage(inventory_db, table, seed_csv=csv_path)
+
+    # Batches are held in NumPy columns (see ColumnarBatchIndex), so large multi-site stocks stay small in memory
+    with timed("InventoryManager (inventory)"):
+        inventory = InventoryManager(storage=inventory_storage("inventory", "data/inventory/inventory.csv"),
+                                     columnar=True, bus=bus)
+    with timed("InventoryManager (internal)"):
+        internal_inventory = InventoryManager("data/inventory/internal_inventory.csv",
+                                              storage=inventory_storage("internal_inventory", "data/inventory/internal_inventory.csv"),
+                                              columnar=True, entity="internal_inventory", bus=bus)
+    with timed("CustomerManager"):
+        customers = CustomerManager(bus=bus)
+    with timed("OrderManager"):
+        orders = OrderManager(bus=bus)
+    with timed("RecipeManager"):
+        recipes = RecipeManager(bus=bus)
+    # Label printing and scanning import their libraries on first use
+    qr_gen = QRGenerator()
+    alerts = AlertSystem(horizons=(1, 3, 7))
+    # Recomputes alerts in the background on every stock change and at midnight
+    watcher = ExpiryWatcher(alerts, {"In Stock": inventory, "Ingredient": internal_inventory}, products.products)
+    with timed("ExpiryWatcher initial scan"):
+        watcher.start()
+    # Scans camera frames in its own process, started on the first scan
+    scanner = ScanWorker()
+    backend.update(products=products, inventory=inventory, internal_inventory=internal_inventory,
+                   customers=customers, orders=orders, recipes=recipes, qr_gen=qr_gen, alerts=alerts,
+                   scanner=scanner, watcher=watcher, bus=bus)
+    report_startup()
+
+
+def stop_backend():
+    if not backend:
+        return
+    backend['watcher'].stop()
+    backend['scanner'].stop()
+    # Edits are saved a moment after they happen; write whatever is still pending
+    flush_all()
+    # The stock lives in SQLite; the CSVs are kept as a readable export of it (and seed a new database).
+    # With the journal they are its snapshots already, written by its compaction
+    if not USE_JOURNAL:
+        backend['inventory'].export_csv()
+        backend['internal_inventory'].export_csv()
+
+
+# Runs in the server process only, once, however many tabs are opened
+app.on_startup(start_backend)
+app.on_shutdown(stop_backend)
+
+
+# 2. Build the UI, once per browser tab, on the shared backend
+@ui.page('/')
+def index():
+    with timed("create_ui"):
+        create_ui(**backend)
+
 
 # 3. Run
-if __name__ in {"__main__", "__mp_main__", "builtins"}:
+if __name__ in {"__main__", "__mp_main__"}:
     ui.run(title="ShelfLife", port=8080)
@@ -1,65 +1,167 @@
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from src.dates import parse_date, format_date, today_ordinal
+
+ALERT_COLUMNS = ['EAN', 'Name', 'Exp Date', 'Qty', 'Status']
+
+
+def to_columns(items):
+    """
+    Accepts InventoryManager.get_columns() output or a list of batch dicts
+    and returns NumPy columns: ean, name, exp_ord, qty.
+    """
+    if isinstance(items, dict):
+        return items
+    items = list(items)
+    exp_ords = []
+    for item in items:
+        exp_ord = item.get('exp_ord')
+        if exp_ord is None:
+            exp_ord = parse_date(item.get('exp_date'))
+        # Unreadable dates never alert
+        exp_ords.append(exp_ord if exp_ord is not None else np.iinfo(np.int64).max)
+    return {
+        'ean': np.array([item['ean'] for item in items], dtype=object),
+        'name': np.array([item['name'] for item in items], dtype=object),
+        'exp_ord': np.array(exp_ords, dtype=np.int64),
+        'qty': np.array([item.get('qty', 1) for item in items], dtype=np.float64),
+    }
+
+
+def format_dates(exp_ord):
+    """Formats an array of day ordinals, each distinct date only once."""
+    if not len(exp_ord):
+        return np.array([], dtype=object)
+    unique, inverse = np.unique(exp_ord, return_inverse=True)
+    return np.array([format_date(int(o)) for o in unique], dtype=object)[inverse]
 
 
 class AlertSystem:
-    def check_alerts(self, inventory_list, internal_list=None):
-        if internal_list is None:
-            internal_list = []
-            
-        today = datetime.now().date()
-        tomorrow = today + timedelta(days=1)
-        
-        alerts = []
-        expired_count = 0
-        soon_count = 0
-        
-        def process_item(item, source_type):
-            nonlocal expired_count, soon_count
-            try:
-                exp_date = datetime.strptime(item['exp_date'], "%d-%m-%Y").date()
-                
-                status_suffix = f" ({source_type})"
-                if exp_date < today:
-                    status = "EXPIRED" + status_suffix
-                    expired_count += 1
-                elif exp_date == today:
-                    status = "Expiring TODAY" + status_suffix
-                    soon_count += 1
-                elif exp_date == tomorrow:
-                    status = "Expiring Tomorrow" + status_suffix
-                    soon_count += 1
-                else:
-                    return None
-                    
-                return {
-                    'EAN': item['ean'],
-                    'Name': item['name'],
-                    'Exp Date': item['exp_date'],
-                    'Qty': item.get('qty', 1),
-                    'Status': status
-                }
-            except:
-                return None
-
-        for item in inventory_list:
-            res = process_item(item, "In Stock")
-            if res: alerts.append(res)
-                
-        for item in internal_list:
-            res = process_item(item, "Ingredient")
-            if res: alerts.append(res)
-
-        if not alerts:
-            return "No alerts.", pd.DataFrame(columns=['EAN', 'Name', 'Exp Date', 'Qty', 'Status'])
-
-        df = pd.DataFrame(alerts)
-        # Convert date strings to actual datetime objects for correct sorting
-        df['temp_date'] = pd.to_datetime(df['Exp Date'], format='%d-%m-%Y')
-        # Sort by Name (A-Z) and then temp_date (Soonest first)
-        df = df.sort_values(by=['Name', 'temp_date'])
-        # Remove temp column
-        df = df.drop(columns=['temp_date'])
+    """
+    Classifies inventory batches into expiry buckets in one vectorized pass.
+
+    horizons: upper bounds (days left) of the "expiring" buckets, e.g. (1, 3, 7)
+    gives Today / Tomorrow / within 3 days / within 7 days.
+    warn_days: default warning window; batches further out than their window
+    are not reported. Products can override it with their own 'warn_days'.
+    """
+
+    def __init__(self, horizons=(1,), warn_days=1):
+        self.horizons = sorted(set(int(h) for h in horizons if int(h) > 0))
+        self.warn_days = int(warn_days)
+        # Bucket edges for np.searchsorted: <0 expired, 0 today, then one per horizon
+        self.edges = np.array([-1, 0] + self.horizons, dtype=np.int64)
+        self.buckets = ["EXPIRED", "Expiring TODAY"]
+        for h in self.horizons:
+            self.buckets.append("Expiring Tomorrow" if h == 1 else f"Expiring within {h} days")
+        # Products whose own window reaches past the last horizon
+        self.buckets.append(f"Expiring in {self.horizons[-1] if self.horizons else 0}+ days")
+        # Counts per bucket from the last check: {bucket: count}
+        self.last_counts = {}
+        # Stock value (price_in * qty) per bucket from the last check: {bucket: value}
+        self.last_value = {}
+
+    def product_settings(self, products):
+        """Per-product warning windows and purchase prices: ({ean: days}, {ean: price_in}), or (None, None)."""
+        if not products:
+            return None, None
+        windows = {ean: p['warn_days'] for ean, p in products.items() if p.get('warn_days') is not None}
+        prices = {ean: p.get('price_in', 0.0) for ean, p in products.items()}
+        return windows, prices
+
+    def widest_window(self, products=None):
+        """
+        Days ahead that can produce an alert. Batches expiring later never alert,
+        so callers only need InventoryManager.get_columns(end=today + widest_window()).
+        """
+        windows = [p['warn_days'] for p in (products or {}).values() if p.get('warn_days') is not None]
+        return max([self.warn_days] + windows)
 
+    def _lookup(self, eans, mapping, default):
+        """Maps every EAN to a per-product value, looking each distinct EAN up only once."""
+        if len(eans) == 0:
+            return np.zeros(0, dtype=np.float64)
+        codes, unique = pd.factorize(eans)
+        values = np.array([mapping.get(ean, default) for ean in unique], dtype=np.float64)
+        return values[codes]
+
+    def classify(self, columns, today=None, windows=None, prices=None):
+        """
+        Classifies one set of columns.
+        Returns (rows, bucket, value): indexes of the alerting rows, their bucket
+        numbers (index into self.buckets) and their stock value (zeros without prices).
+        """
+        today = today_ordinal() if today is None else today
+        exp_ord = columns['exp_ord']
+        # Stay in int64; UNKNOWN_DATE ordinals would overflow when subtracting
+        days = np.clip(exp_ord, today - 1_000_000, today + 1_000_000) - today
+        # Cheap pass with the widest window first, per-product windows only for what is left
+        widest = max([self.warn_days] + list(windows.values())) if windows else self.warn_days
+        rows = np.flatnonzero(days <= widest)
+        if windows:
+            window = self._lookup(columns['ean'][rows], windows, self.warn_days)
+            rows = rows[days[rows] <= window]
+        bucket = np.searchsorted(self.edges, days[rows], side='left')
+        if prices:
+            value = self._lookup(columns['ean'][rows], prices, 0.0) * columns['qty'][rows]
+        else:
+            value = np.zeros(len(rows), dtype=np.float64)
+        return rows, bucket, value
+
+    def check_alerts(self, inventory_list, internal_list=None, products=None, today=None):
+        """
+        inventory_list / internal_list: columns from InventoryManager.get_columns() or lists of batches
+        products: ProductManager.products, for per-product windows and value at risk
+        Returns (message, DataFrame of alerts sorted by Name and expiry).
+        """
+        # Callers can pass only the batches up to today + widest_window(); the rest never alerts
+        today = today_ordinal() if today is None else today
+        windows, prices = self.product_settings(products)
+
+        counts = np.zeros(len(self.buckets), dtype=np.int64)
+        values = np.zeros(len(self.buckets), dtype=np.float64)
+        frames = []
+        for items, source_type in ((inventory_list, "In Stock"), (internal_list, "Ingredient")):
+            if items is None:
+                continue
+            cols = to_columns(items)
+            rows, bucket, value = self.classify(cols, today, windows, prices)
+            counts += np.bincount(bucket, minlength=len(self.buckets))
+            values += np.bincount(bucket, weights=value, minlength=len(self.buckets))
+            if not len(rows):
+                continue
+            status = np.array([f"{b} ({source_type})" for b in self.buckets], dtype=object)[bucket]
+            exp_ord = cols['exp_ord'][rows]
+            frame = {
+                'EAN': cols['ean'][rows],
+                'Name': cols['name'][rows],
+                'Exp Date': format_dates(exp_ord),
+                'Qty': cols['qty'][rows],
+                'Status': status,
+                'exp_ord': exp_ord,
+            }
+            if prices:
+                frame['Value'] = np.round(value, 2)
+            frames.append(pd.DataFrame(frame))
+
+        self.last_counts = {b: int(c) for b, c in zip(self.buckets, counts)}
+        self.last_value = {b: float(v) for b, v in zip(self.buckets, values)}
+
+        if not frames:
+            return "No alerts.", pd.DataFrame(columns=ALERT_COLUMNS)
+
+        df = pd.concat(frames, ignore_index=True)
+        # Sort by Name (A-Z) and then expiry (Soonest first)
+        df = df.sort_values(by=['Name', 'exp_ord'], kind='stable')
+        df = df.drop(columns=['exp_ord'])
+
+        expired_count = int(counts[0])
+        soon_count = int(counts[1:].sum())
         msg = f"{expired_count} expired, {soon_count} expiring soon."
-        return msg, df
\ No newline at end of file
+        if prices:
+            msg += f" Value at risk: {values.sum():.2f}"
+        return msg, df
+
+    def get_counts(self):
+        """Alerts per bucket from the last check, skipping empty buckets."""
+        return {b: c for b, c in self.last_counts.items() if c}
@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+from bisect import bisect_left, insort
+import sys
+from src.dates import parse_date, format_date
+from src.expiry_index import ExpiryIndex
+
+# Day ordinal used for batches whose date could not be read; they sort last
+UNKNOWN_DATE = sys.maxsize
+
+BATCH_FIELDS = ('ean', 'name', 'exp_date', 'exp_ord', 'qty')
+
+
+def prepare_batch(batch):
+    """
+    Parses a batch's exp_date once into 'exp_ord' (a day ordinal) and rewrites
+    exp_date in canonical DD-MM-YYYY form. Returns True if exp_date changed.
+    """
+    exp_ord = parse_date(batch['exp_date'])
+    if exp_ord is None:
+        batch['exp_ord'] = UNKNOWN_DATE
+        return False
+    batch['exp_ord'] = exp_ord
+    canonical = format_date(exp_ord)
+    if canonical != batch['exp_date']:
+        batch['exp_date'] = canonical
+        return True
+    return False
+
+
+class BatchIndex:
+    """
+    Holds inventory batches keyed on (ean, exp_ord), with every EAN's batches
+    kept in expiry order so FIFO picks don't have to filter and sort the whole inventory.
+    """
+
+    def __init__(self, batches=()):
+        # {(ean, exp_ord): batch}
+        self.batches = {}
+        # {ean: [exp_ord, ...]} sorted oldest first
+        self.by_ean = {}
+        # {ean: {exp_ord, ...}} batches currently below zero
+        self.negative = {}
+        # Batch keys by expiry day, for range queries across all EANs
+        self.expiry = ExpiryIndex()
+        for batch in batches:
+            self.add(batch)
+
+    def __len__(self):
+        return len(self.batches)
+
+    def __iter__(self):
+        return iter(self.batches.values())
+
+    def get(self, ean, exp_ord):
+        return self.batches.get((ean, exp_ord))
+
+    def add(self, batch):
+        """Adds a batch, merging it into an existing batch with the same EAN and date."""
+        if 'exp_ord' not in batch:
+            prepare_batch(batch)
+        key = (batch['ean'], batch['exp_ord'])
+        existing = self.batches.get(key)
+        if existing is not None:
+            self.set_qty(existing, existing['qty'] + batch['qty'])
+            return existing
+        if batch['qty'] == 0:
+            return batch
+        self.batches[key] = batch
+        insort(self.by_ean.setdefault(batch['ean'], []), batch['exp_ord'])
+        if batch['exp_ord'] != UNKNOWN_DATE:
+            self.expiry.add(batch['ean'], batch['exp_ord'])
+        if batch['qty'] < 0:
+            self.negative.setdefault(batch['ean'], set()).add(batch['exp_ord'])
+        return batch
+
+    def remove(self, ean, exp_ord):
+        batch = self.batches.pop((ean, exp_ord), None)
+        if batch is None:
+            return None
+        entries = self.by_ean[ean]
+        entries.pop(bisect_left(entries, exp_ord))
+        if not entries:
+            del self.by_ean[ean]
+        self._discard_negative(ean, exp_ord)
+        self.expiry.remove(ean, exp_ord)
+        return batch
+
+    def set_qty(self, batch, qty):
+        """Updates a batch quantity; batches that reach exactly 0 are dropped."""
+        batch['qty'] = qty
+        if qty == 0:
+            self.remove(batch['ean'], batch['exp_ord'])
+        elif qty < 0:
+            self.negative.setdefault(batch['ean'], set()).add(batch['exp_ord'])
+        else:
+            self._discard_negative(batch['ean'], batch['exp_ord'])
+
+    def _discard_negative(self, ean, exp_ord):
+        ords = self.negative.get(ean)
+        if ords is not None:
+            ords.discard(exp_ord)
+            if not ords:
+                del self.negative[ean]
+
+    def for_ean(self, ean):
+        """All batches of an EAN, oldest expiry first."""
+        return [self.batches[(ean, o)] for o in self.by_ean.get(ean, [])]
+
+    def oldest(self, ean):
+        entries = self.by_ean.get(ean)
+        if not entries:
+            return None
+        return self.batches[(ean, entries[0])]
+
+    def negatives(self, ean):
+        """Batches of an EAN with negative stock, oldest expiry first."""
+        ords = self.negative.get(ean)
+        if not ords:
+            return []
+        return [self.batches[(ean, o)] for o in sorted(ords)]
+
+    # --- Expiry queries (batches with unreadable dates are never included) ---
+
+    def expiring(self, start=None, end=None):
+        """Batches expiring within [start, end] (day ordinals, None = open), soonest first."""
+        return [self.batches[(ean, o)] for o, ean in self.expiry.range(start, end)]
+
+    def next_to_expire(self, n, start=None):
+        """The n batches expiring first, on or after start."""
+        return [self.batches[(ean, o)] for o, ean in self.expiry.next(n, start)]
+
+    def expiry_counts(self, start=None, end=None):
+        """Number of batches per expiry day: {exp_ord: count}."""
+        return self.expiry.counts(start, end)
+
+    # --- Bulk queries (same API as ColumnarBatchIndex) ---
+
+    def columns(self, start=None, end=None):
+        """
+        Batches as NumPy columns: ean, name, exp_ord, qty.
+        With start/end only the batches expiring in that range, via the expiry index.
+        """
+        if start is None and end is None:
+            batches = list(self.batches.values())
+        else:
+            batches = self.expiring(start, end)
+        return {
+            'ean': np.array([b['ean'] for b in batches], dtype=object),
+            'name': np.array([b['name'] for b in batches], dtype=object),
+            'exp_ord': np.fromiter((b['exp_ord'] for b in batches), dtype=np.int64, count=len(batches)),
+            'qty': np.fromiter((b['qty'] for b in batches), dtype=np.float64, count=len(batches)),
+        }
+
+    def totals(self):
+        """Total quantity per EAN: {ean: qty}."""
+        return {ean: sum(self.batches[(ean, o)]['qty'] for o in ords) for ean, ords in self.by_ean.items()}
+
+    def expired_mask(self, today):
+        """Boolean mask over columns() rows whose expiry is before today."""
+        return self.columns()['exp_ord'] < today
+
+    def to_frame(self):
+        """Batches as a DataFrame with ean, name, exp_date, exp_ord and qty columns."""
+        return pd.DataFrame(list(self.batches.values()), columns=list(BATCH_FIELDS))
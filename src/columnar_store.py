@@ -0,0 +1,386 @@
+import numpy as np
+import pandas as pd
+from src.batch_index import BATCH_FIELDS, UNKNOWN_DATE, prepare_batch
+from src.dates import format_date
+
+# Day ordinals take the low 32 bits of a batch key; unreadable dates get the highest so they sort last
+UNKNOWN_DAY = 0xFFFFFFFF
+# EAN codes take the low 31 bits of an expiry key
+EAN_BITS = 31
+
+
+class Interner:
+    """Maps repeated strings (EANs, product names) to small integer codes."""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+        # values as a NumPy object array, rebuilt only after new values are added
+        self._array = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def array(self):
+        if self._array is None or len(self._array) != len(self.values):
+            self._array = np.array(self.values, dtype=object)
+        return self._array
+
+
+class SortedKeys:
+    """
+    int64 keys kept sorted in a NumPy array, each pointing at a row of the store.
+    Lookups bisect with searchsorted; inserts and removals shift the tail in place.
+    """
+
+    def __init__(self, keys=(), rows=(), capacity=1024):
+        keys = np.asarray(keys, dtype=np.int64)
+        rows = np.asarray(rows, dtype=np.int64)
+        order = np.argsort(keys, kind='stable')
+        self.n = len(keys)
+        capacity = max(capacity, self.n)
+        self.keys = np.zeros(capacity, dtype=np.int64)
+        self.rows = np.zeros(capacity, dtype=np.int64)
+        self.keys[:self.n] = keys[order]
+        self.rows[:self.n] = rows[order]
+
+    def __len__(self):
+        return self.n
+
+    def find(self, key):
+        """Row of a key, or None."""
+        i = int(np.searchsorted(self.keys[:self.n], key))
+        if i < self.n and self.keys[i] == key:
+            return int(self.rows[i])
+        return None
+
+    def insert(self, key, row):
+        if self.n == len(self.keys):
+            self.keys = np.concatenate([self.keys, np.zeros(len(self.keys), dtype=np.int64)])
+            self.rows = np.concatenate([self.rows, np.zeros(len(self.rows), dtype=np.int64)])
+        i = int(np.searchsorted(self.keys[:self.n], key))
+        self.keys[i + 1:self.n + 1] = self.keys[i:self.n]
+        self.rows[i + 1:self.n + 1] = self.rows[i:self.n]
+        self.keys[i] = key
+        self.rows[i] = row
+        self.n += 1
+
+    def remove(self, key):
+        i = int(np.searchsorted(self.keys[:self.n], key))
+        if i < self.n and self.keys[i] == key:
+            self.keys[i:self.n - 1] = self.keys[i + 1:self.n]
+            self.rows[i:self.n - 1] = self.rows[i + 1:self.n]
+            self.n -= 1
+
+    def between(self, lo=None, hi=None):
+        """Rows of the keys in [lo, hi), in key order (a copy); None leaves that side open."""
+        keys = self.keys[:self.n]
+        start = 0 if lo is None else int(np.searchsorted(keys, lo))
+        end = self.n if hi is None else int(np.searchsorted(keys, hi))
+        return self.rows[start:end].copy()
+
+
+class BatchView:
+    """
+    Dict-like view of one row of a ColumnarBatchIndex, made when a batch is handed
+    out and not kept by the store. Once the batch is removed its qty reads 0.
+    """
+    __slots__ = ('store', 'row', 'generation', 'ean', 'name', 'exp_ord', 'odd_date')
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+        # Bumped by the store when the row is removed, so a reused row isn't read by old views
+        self.generation = store.generation[row]
+        self.ean = store.eans.values[store.ean_code[row]]
+        self.name = store.names.values[store.name_code[row]]
+        self.exp_ord = int(store.exp_ord[row])
+        self.odd_date = store.odd_dates.get(row)
+
+    def __getitem__(self, field):
+        if field == 'qty':
+            if self.store.generation[self.row] != self.generation:
+                return 0.0
+            return float(self.store.qty[self.row])
+        if field == 'ean':
+            return self.ean
+        if field == 'name':
+            return self.name
+        if field == 'exp_ord':
+            return self.exp_ord
+        if field == 'exp_date':
+            return self.odd_date if self.odd_date is not None else format_date(self.exp_ord)
+        raise KeyError(field)
+
+    def get(self, field, default=None):
+        return self[field] if field in BATCH_FIELDS else default
+
+    def keys(self):
+        return BATCH_FIELDS
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class ColumnarBatchIndex:
+    """
+    Array-backed alternative to BatchIndex for very large inventories.
+    qty and exp_ord live in NumPy columns and EANs and names are stored as
+    interned codes. Batches are found through two sorted int64 key arrays,
+    (EAN code, expiry) for per-EAN FIFO order and (expiry, EAN code) for expiry
+    ranges, so no Python object is kept per batch.
+    Batches handed out are BatchViews; iterating yields plain dicts.
+    """
+
+    def __init__(self, batches=(), capacity=1024):
+        batches = list(batches)
+        capacity = max(capacity, len(batches))
+        self.qty = np.zeros(capacity, dtype=np.float64)
+        self.exp_ord = np.zeros(capacity, dtype=np.int64)
+        self.ean_code = np.zeros(capacity, dtype=np.int32)
+        self.name_code = np.zeros(capacity, dtype=np.int32)
+        self.live = np.zeros(capacity, dtype=bool)
+        self.generation = np.zeros(capacity, dtype=np.int32)
+        self.size = 0
+        # Rows freed by remove(), reused by add()
+        self.free_rows = []
+        self.eans = Interner()
+        self.names = Interner()
+        # Original text of dates that could not be parsed: {row: exp_date}
+        self.odd_dates = {}
+        self._bulk_load(batches, capacity)
+
+    def _bulk_load(self, batches, capacity):
+        """Fills the columns and key arrays in one pass instead of one add() per batch."""
+        merged = {}
+        for batch in batches:
+            if batch.get('exp_ord') is None:
+                batch = dict(batch)
+                prepare_batch(batch)
+            key = (batch['ean'], batch['exp_ord'])
+            if key in merged:
+                merged[key]['qty'] += batch['qty']
+            else:
+                merged[key] = dict(batch)
+        items = [b for b in merged.values() if b['qty'] != 0]
+        n = len(items)
+        self.qty[:n] = np.fromiter((b['qty'] for b in items), dtype=np.float64, count=n)
+        self.exp_ord[:n] = np.fromiter((b['exp_ord'] for b in items), dtype=np.int64, count=n)
+        self.ean_code[:n] = np.fromiter((self.eans.code(b['ean']) for b in items), dtype=np.int32, count=n)
+        self.name_code[:n] = np.fromiter((self.names.code(b['name']) for b in items), dtype=np.int32, count=n)
+        self.live[:n] = True
+        self.size = n
+        for row, b in enumerate(items):
+            if b['exp_ord'] == UNKNOWN_DATE:
+                self.odd_dates[row] = b['exp_date']
+        rows = np.arange(n, dtype=np.int64)
+        codes = self.ean_code[:n].astype(np.int64)
+        exp_ord = self.exp_ord[:n]
+        known = exp_ord != UNKNOWN_DATE
+        days = np.where(known, exp_ord, UNKNOWN_DAY)
+        self.by_ean = SortedKeys((codes << 32) | days, rows, capacity)
+        self.by_expiry = SortedKeys((exp_ord[known] << EAN_BITS) | codes[known], rows[known], capacity)
+
+    def _keys(self, code, exp_ord):
+        """(by_ean key, by_expiry key or None) of a batch."""
+        if exp_ord == UNKNOWN_DATE:
+            return (code << 32) | UNKNOWN_DAY, None
+        return (code << 32) | exp_ord, (exp_ord << EAN_BITS) | code
+
+    def _row(self, ean, exp_ord):
+        code = self.eans.codes.get(ean)
+        if code is None:
+            return None
+        return self.by_ean.find(self._keys(code, exp_ord)[0])
+
+    def _ean_rows(self, ean):
+        """Rows of an EAN's batches, oldest expiry first."""
+        code = self.eans.codes.get(ean)
+        if code is None:
+            return np.zeros(0, dtype=np.int64)
+        return self.by_ean.between(code << 32, (code + 1) << 32)
+
+    def _expiry_rows(self, start=None, end=None):
+        """Rows of the batches expiring within [start, end], soonest first."""
+        lo = None if start is None else max(int(start), 0) << EAN_BITS
+        hi = None if end is None else (int(end) + 1) << EAN_BITS
+        return self.by_expiry.between(lo, hi)
+
+    def __len__(self):
+        return len(self.by_ean)
+
+    def __iter__(self):
+        for row in self.by_ean.between():
+            yield {field: self.value(row, field) for field in BATCH_FIELDS}
+
+    def value(self, row, field):
+        if field == 'qty':
+            return float(self.qty[row])
+        if field == 'exp_ord':
+            return int(self.exp_ord[row])
+        if field == 'ean':
+            return self.eans.values[self.ean_code[row]]
+        if field == 'name':
+            return self.names.values[self.name_code[row]]
+        if field == 'exp_date':
+            if row in self.odd_dates:
+                return self.odd_dates[row]
+            return format_date(int(self.exp_ord[row]))
+        raise KeyError(field)
+
+    def _grow(self):
+        capacity = len(self.qty) * 2
+        for attr in ('qty', 'exp_ord', 'ean_code', 'name_code', 'live', 'generation'):
+            old = getattr(self, attr)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, attr, new)
+
+    def get(self, ean, exp_ord):
+        row = self._row(ean, exp_ord)
+        return None if row is None else BatchView(self, row)
+
+    def add(self, batch):
+        """Adds a batch, merging it into an existing batch with the same EAN and date."""
+        if batch.get('exp_ord') is None:
+            batch = dict(batch)
+            prepare_batch(batch)
+        ean, exp_ord = batch['ean'], batch['exp_ord']
+        existing = self.get(ean, exp_ord)
+        if existing is not None:
+            self.set_qty(existing, existing['qty'] + batch['qty'])
+            return existing
+        if batch['qty'] == 0:
+            return batch
+        if self.free_rows:
+            row = self.free_rows.pop()
+        else:
+            if self.size == len(self.qty):
+                self._grow()
+            row = self.size
+            self.size += 1
+        code = self.eans.code(ean)
+        self.qty[row] = batch['qty']
+        self.exp_ord[row] = exp_ord
+        self.ean_code[row] = code
+        self.name_code[row] = self.names.code(batch['name'])
+        self.live[row] = True
+        ean_key, expiry_key = self._keys(code, exp_ord)
+        self.by_ean.insert(ean_key, row)
+        if expiry_key is None:
+            self.odd_dates[row] = batch['exp_date']
+        else:
+            self.by_expiry.insert(expiry_key, row)
+        return BatchView(self, row)
+
+    def remove(self, ean, exp_ord):
+        row = self._row(ean, exp_ord)
+        if row is None:
+            return None
+        view = BatchView(self, row)
+        ean_key, expiry_key = self._keys(int(self.ean_code[row]), exp_ord)
+        self.by_ean.remove(ean_key)
+        if expiry_key is not None:
+            self.by_expiry.remove(expiry_key)
+        self.generation[row] += 1
+        self.live[row] = False
+        self.qty[row] = 0
+        self.odd_dates.pop(row, None)
+        self.free_rows.append(row)
+        return view
+
+    def set_qty(self, batch, qty):
+        """Updates a batch quantity; batches that reach exactly 0 are dropped."""
+        ean, exp_ord = batch['ean'], batch['exp_ord']
+        self.qty[self._row(ean, exp_ord)] = qty
+        if qty == 0:
+            self.remove(ean, exp_ord)
+
+    def for_ean(self, ean):
+        """All batches of an EAN, oldest expiry first."""
+        return [BatchView(self, row) for row in self._ean_rows(ean)]
+
+    def oldest(self, ean):
+        rows = self._ean_rows(ean)
+        return BatchView(self, rows[0]) if len(rows) else None
+
+    def negatives(self, ean):
+        """Batches of an EAN with negative stock, oldest expiry first."""
+        rows = self._ean_rows(ean)
+        return [BatchView(self, row) for row in rows[self.qty[rows] < 0]]
+
+    # --- Expiry queries (batches with unreadable dates are never included) ---
+
+    def expiring(self, start=None, end=None):
+        """Batches expiring within [start, end] (day ordinals, None = open), soonest first."""
+        return [BatchView(self, row) for row in self._expiry_rows(start, end)]
+
+    def next_to_expire(self, n, start=None):
+        """The n batches expiring first, on or after start."""
+        return [BatchView(self, row) for row in self._expiry_rows(start)[:n]]
+
+    def expiry_counts(self, start=None, end=None):
+        """Number of batches per expiry day: {exp_ord: count}."""
+        days, counts = np.unique(self.exp_ord[self._expiry_rows(start, end)], return_counts=True)
+        return {int(day): int(n) for day, n in zip(days, counts)}
+
+    # --- Vectorized queries ---
+
+    def _columns(self, rows):
+        return {
+            'ean': self.eans.array()[self.ean_code[rows]] if len(rows) else np.array([], dtype=object),
+            'name': self.names.array()[self.name_code[rows]] if len(rows) else np.array([], dtype=object),
+            'exp_ord': self.exp_ord[rows],
+            'qty': self.qty[rows],
+        }
+
+    def columns(self, start=None, end=None):
+        """
+        Live batches as NumPy columns: ean, name, exp_ord, qty.
+        With start/end only the batches expiring in that range, via the expiry keys.
+        """
+        if start is not None or end is not None:
+            return self._columns(self._expiry_rows(start, end))
+        return self._columns(np.flatnonzero(self.live[:self.size]))
+
+    def totals(self):
+        """Total quantity per EAN: {ean: qty}."""
+        live = self.live[:self.size]
+        codes = self.ean_code[:self.size][live]
+        sums = np.bincount(codes, weights=self.qty[:self.size][live], minlength=len(self.eans))
+        present = np.bincount(codes, minlength=len(self.eans)) > 0
+        return {self.eans.values[code]: float(sums[code]) for code in np.flatnonzero(present)}
+
+    def expired_mask(self, today):
+        """Boolean mask over columns() rows whose expiry is before today."""
+        live = self.live[:self.size]
+        return self.exp_ord[:self.size][live] < today
+
+    def to_frame(self):
+        """Live batches as a DataFrame with ean, name, exp_date, exp_ord and qty columns."""
+        cols = self.columns()
+        exp_ord = cols['exp_ord']
+        # Format each distinct date once
+        unique, inverse = np.unique(exp_ord, return_inverse=True)
+        labels = np.array([format_date(int(o)) if o != UNKNOWN_DATE else '' for o in unique], dtype=object)
+        exp_date = labels[inverse] if len(unique) else np.array([], dtype=object)
+        if self.odd_dates:
+            live_rows = np.flatnonzero(self.live[:self.size])
+            for i, row in enumerate(live_rows):
+                if row in self.odd_dates:
+                    exp_date[i] = self.odd_dates[row]
+        return pd.DataFrame({
+            'ean': cols['ean'],
+            'name': cols['name'],
+            'exp_date': exp_date,
+            'exp_ord': exp_ord,
+            'qty': cols['qty'],
+        })
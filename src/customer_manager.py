@@ -1,39 +1,61 @@
 import pandas as pd
 import os
+from src.id_sequence import IdSequence, id_number
+from src.snapshot import load_snapshot, save_snapshot, snapshot_path
+from src.persistence import DebouncedWriter, write_csv
+from src.events import EventBus
+
+CUSTOMER_COLUMNS = ["Customer ID", "Name", "Company Name", "Org Number", "VAT Number", "Phone", "Email", "Address", "Website", "Notes"]
+# Keys of a customer dict, in the order of CUSTOMER_COLUMNS[1:]
+CUSTOMER_FIELDS = ['name', 'company', 'org_nr', 'vat_nr', 'phone', 'email', 'address', 'website', 'notes']
+
 
 class CustomerManager:
-    def __init__(self, file_path="data/customers/customers.csv"):
+    def __init__(self, file_path="data/customers/customers.csv", bus=None):
         self.file_path = file_path
         # Database: {'CUST-001': {'name': 'John Doe', ...}}
         self.customers = {}
+        # Increases every time the customers change, so the UI knows what to redraw
+        self.version = 0
+        # Every change is published here as a ChangeEvent (see src/events.py)
+        self.bus = bus if bus is not None else EventBus()
+        # Next customer number, shared with other processes using the same data folder
+        self.ids = IdSequence(os.path.join(os.path.dirname(file_path), "customer_id.seq"), "CUST")
+        # Edits are saved in the background, a burst of them at once (see DebouncedWriter)
+        self.writer = DebouncedWriter(self.save_data, "customers")
         self.load_data()
 
     def load_data(self):
-        """Loads customers from CSV on startup."""
+        """Loads customers on startup, from the binary snapshot if it matches the CSV."""
         if os.path.exists(self.file_path):
+            snapshot = load_snapshot([self.file_path], "customers")
+            if snapshot is not None:
+                customers, last_id = snapshot
+                self.customers.update(customers)
+                self.ids.reserve(last_id)
+                print(f"Loaded {len(self.customers)} customers from {snapshot_path(self.file_path)}")
+                return
             try:
-                df = pd.read_csv(self.file_path, dtype={'Customer ID': str})
-                for _, row in df.iterrows():
-                    cid = str(row['Customer ID'])
-                    self.customers[cid] = {
-                        'name': str(row.get('Name', '')),
-                        'company': str(row.get('Company Name', '')),
-                        'org_nr': str(row.get('Org Number', '')),
-                        'vat_nr': str(row.get('VAT Number', '')),
-                        'phone': str(row.get('Phone', '')),
-                        'email': str(row.get('Email', '')),
-                        'address': str(row.get('Address', '')),
-                        'website': str(row.get('Website', '')),
-                        'notes': str(row.get('Notes', ''))
-                    }
+                # Everything is text; dtype str keeps e.g. org numbers from turning into floats
+                df = pd.read_csv(self.file_path, dtype=str)
+                df = df.reindex(columns=CUSTOMER_COLUMNS).dropna(subset=['Customer ID']).fillna('')
+                self.customers.update(zip(df['Customer ID'].tolist(), [
+                    dict(zip(CUSTOMER_FIELDS, values))
+                    for values in zip(*(df[column].tolist() for column in CUSTOMER_COLUMNS[1:]))
+                ]))
+                for cid in self.customers:
+                    self.ids.reserve(id_number(cid, 'CUST'))
                 print(f"Loaded {len(self.customers)} customers from {self.file_path}")
+                self._save_snapshot(self.customers)
             except Exception as e:
                 print(f"Error loading customers: {e}")
 
     def save_data(self):
-        """Saves current customers to CSV."""
+        """Saves current customers to CSV (and the binary snapshot). Runs in the writer thread."""
+        # Copied in one step, so edits made meanwhile can't change it under us
+        customers = dict(self.customers)
         data = []
-        for cid, d in self.customers.items():
+        for cid, d in customers.items():
             data.append({
                 "Customer ID": cid,
                 "Name": d['name'],
@@ -47,25 +69,17 @@ class CustomerManager:
                 "Notes": d['notes']
             })
 
-        df = pd.DataFrame(data, columns=["Customer ID", "Name", "Company Name", "Org Number", "VAT Number", "Phone", "Email", "Address", "Website", "Notes"])
-        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
-        df.to_csv(self.file_path, index=False)
+        df = pd.DataFrame(data, columns=CUSTOMER_COLUMNS)
+        write_csv(df, self.file_path)
+        self._save_snapshot(customers)
+
+    def _save_snapshot(self, customers):
+        # The highest customer number goes along, so a snapshot load needn't parse every ID
+        last_id = max((id_number(cid, 'CUST') or 0 for cid in customers), default=0)
+        save_snapshot([self.file_path], "customers", (customers, last_id))
 
     def _generate_next_id(self):
-        if not self.customers:
-            return "CUST-001"
-        try:
-            ids = []
-            for cid in self.customers.keys():
-                if cid.startswith('CUST-'):
-                    num_part = cid.split('-')[1]
-                    if num_part.isdigit():
-                        ids.append(int(num_part))
-            if not ids: return "CUST-001"
-            next_num = max(ids) + 1
-            return f"CUST-{next_num:03d}"
-        except:
-            return f"CUST-{len(self.customers) + 1:03d}"
+        return self.ids.next_id()
 
     def add_customer(self, name, company="", org_nr="", vat_nr="", phone="", email="", address="", website="", notes=""):
         name = str(name).strip()
@@ -85,12 +99,15 @@ class CustomerManager:
             'notes': str(notes).strip()
         }
 
-        self.save_data()
+        self.version += 1
+        self.writer.mark_dirty()
+        self.bus.emit("customer", cid, None, self.customers[cid])
         return f"Saved: {name if name else company} (ID: {cid})", self.get_customers_df()
 
     def update_customer(self, cid, name, company="", org_nr="", vat_nr="", phone="", email="", address="", website="", notes=""):
         cid = str(cid).strip()
         if cid in self.customers:
+            old = self.customers[cid]
             self.customers[cid] = {
                 'name': str(name).strip(),
                 'company': str(company).strip(),
@@ -102,15 +119,19 @@ class CustomerManager:
                 'website': str(website).strip(),
                 'notes': str(notes).strip()
             }
-            self.save_data()
+            self.version += 1
+            self.writer.mark_dirty()
+            self.bus.emit("customer", cid, old, self.customers[cid])
             return f"Updated: {cid}", self.get_customers_df()
         return f"Error: Customer ID '{cid}' not found.", self.get_customers_df()
 
     def delete_customer(self, cid):
         cid = str(cid).strip()
         if cid in self.customers:
-            del self.customers[cid]
-            self.save_data()
+            old = self.customers.pop(cid)
+            self.version += 1
+            self.writer.mark_dirty()
+            self.bus.emit("customer", cid, old, None)
             return f"Deleted: {cid}", self.get_customers_df()
         return f"Error: Customer ID '{cid}' not found.", self.get_customers_df()
 
@@ -0,0 +1,48 @@
+from datetime import date, datetime
+from functools import lru_cache
+
+DATE_FORMAT = "%d-%m-%Y"
+
+
+@lru_cache(maxsize=8192)
+def parse_date(date_str):
+    """
+    Parses a DD-MM-YYYY (or YYYY-MM-DD) string into a day ordinal.
+    Returns None if the string is not a date. Cached, since the same
+    few dates arrive over and over from the scanner and the UI.
+    """
+    if date_str is None:
+        return None
+    date_str = str(date_str).strip()
+    if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
+        fmt = "%Y-%m-%d"
+    else:
+        fmt = DATE_FORMAT
+    try:
+        return datetime.strptime(date_str, fmt).toordinal()
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=8192)
+def format_date(ordinal):
+    """Formats a day ordinal as DD-MM-YYYY."""
+    return date.fromordinal(ordinal).strftime(DATE_FORMAT)
+
+
+def today_ordinal():
+    return date.today().toordinal()
+
+
+def normalize_date(date_str):
+    """Converts YYYY-MM-DD to DD-MM-YYYY if detected, otherwise returns original."""
+    if not date_str:
+        return ""
+    date_str = str(date_str).strip()
+
+    # Check if it's in YYYY-MM-DD format (e.g. 2026-03-06)
+    if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
+        ordinal = parse_date(date_str)
+        if ordinal is not None:
+            return format_date(ordinal)
+    return date_str
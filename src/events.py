@@ -0,0 +1,83 @@
+import queue
+import threading
+
+
+class ChangeEvent:
+    """
+    One change to a manager's data, e.g.
+    ChangeEvent('product', '7038010000737', old_details, new_details).
+
+    entity: 'product', 'customer', 'order', 'recipe' or the inventory's name
+    key:    the changed record's key (EAN, customer/order ID, (ean, exp_date), ...);
+            None when everything may have changed (e.g. a reload)
+    old:    the record before the change, None if it was created
+    new:    the record after the change, None if it was deleted
+
+    old and new are never changed afterwards, so subscribers may keep them.
+    """
+
+    __slots__ = ('entity', 'key', 'old', 'new')
+
+    def __init__(self, entity, key, old=None, new=None):
+        self.entity = entity
+        self.key = key
+        self.old = old
+        self.new = new
+
+    @property
+    def kind(self):
+        if self.old is None:
+            return "reload" if self.key is None else "created"
+        return "deleted" if self.new is None else "updated"
+
+    def __repr__(self):
+        return f"ChangeEvent({self.entity!r}, {self.key!r}, {self.kind})"
+
+
+class EventBus:
+    """
+    In-process publish/subscribe for ChangeEvents. The managers publish every
+    change; each subscriber (e.g. a browser tab) gets its own queue and drains
+    it at its own pace, so a publisher never waits for a slow subscriber.
+
+    Queues receive lists of events, one list per publish() call.
+    """
+
+    def __init__(self):
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    def subscribe(self):
+        """Returns a queue that receives the lists of published events."""
+        q = queue.Queue()
+        with self.lock:
+            self.subscribers.append(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            if q in self.subscribers:
+                self.subscribers.remove(q)
+
+    def publish(self, events):
+        """Hands a list of ChangeEvents to every subscriber."""
+        if not events:
+            return
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for q in subscribers:
+            q.put(events)
+
+    def emit(self, entity, key, old=None, new=None):
+        """Publishes a single change."""
+        self.publish([ChangeEvent(entity, key, old, new)])
+
+
+def drain(q):
+    """All events waiting in a subscriber queue, oldest first."""
+    events = []
+    while True:
+        try:
+            events.extend(q.get_nowait())
+        except queue.Empty:
+            return events
@@ -0,0 +1,66 @@
+from bisect import bisect_left, bisect_right, insort
+
+
+class ExpiryIndex:
+    """
+    Batch keys bucketed by expiry day, with the days kept in a sorted list.
+    Range queries bisect into the days and only visit batches inside the range,
+    so stock that is nowhere near expiring is never touched.
+    Batches with unreadable dates are left out by the owning store.
+    """
+
+    def __init__(self):
+        # {exp_ord: {ean: None}} in insertion order
+        self.by_day = {}
+        # Days that have at least one batch, ascending
+        self.days = []
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, ean, exp_ord):
+        bucket = self.by_day.get(exp_ord)
+        if bucket is None:
+            bucket = self.by_day[exp_ord] = {}
+            insort(self.days, exp_ord)
+        if ean not in bucket:
+            bucket[ean] = None
+            self.count += 1
+
+    def remove(self, ean, exp_ord):
+        bucket = self.by_day.get(exp_ord)
+        if bucket is None or ean not in bucket:
+            return
+        del bucket[ean]
+        self.count -= 1
+        if not bucket:
+            del self.by_day[exp_ord]
+            self.days.pop(bisect_left(self.days, exp_ord))
+
+    def _day_slice(self, start=None, end=None):
+        """Days within [start, end]; None leaves that side open."""
+        lo = 0 if start is None else bisect_left(self.days, start)
+        hi = len(self.days) if end is None else bisect_right(self.days, end)
+        return self.days[lo:hi]
+
+    def range(self, start=None, end=None):
+        """(exp_ord, ean) keys expiring within [start, end], soonest first."""
+        return [(day, ean) for day in self._day_slice(start, end) for ean in self.by_day[day]]
+
+    def next(self, n, start=None):
+        """The first n (exp_ord, ean) keys expiring on or after start."""
+        keys = []
+        lo = 0 if start is None else bisect_left(self.days, start)
+        # Walk by index from lo; slicing would copy the whole tail of the day list
+        for i in range(lo, len(self.days)):
+            day = self.days[i]
+            for ean in self.by_day[day]:
+                if len(keys) == n:
+                    return keys
+                keys.append((day, ean))
+        return keys
+
+    def counts(self, start=None, end=None):
+        """Number of batches per expiry day within [start, end]: {exp_ord: count}."""
+        return {day: len(self.by_day[day]) for day in self._day_slice(start, end)}
@@ -0,0 +1,169 @@
+import queue
+import threading
+from src.alert_system import to_columns, format_dates
+from src.dates import today_ordinal
+
+
+class ExpiryWatcher:
+    """
+    Keeps the expiry alert state up to date in a background thread.
+
+    Inventory listeners hand over a copy of the batches of every changed EAN,
+    and a full (expiry-index backed) snapshot is taken at day rollover. The
+    worker classifies them with the AlertSystem and pushes every batch that
+    crossed into a more urgent bucket to the subscribed queues as
+    {'ean', 'name', 'exp_date', 'qty', 'status'} dicts. It also keeps the
+    alert table (see report) so pages only have to show it.
+
+    Snapshots are always taken on the caller's thread, so the worker never
+    reads an inventory while it is being changed.
+    """
+
+    def __init__(self, alerts, sources, products=None):
+        self.alerts = alerts
+        # {source_type: InventoryManager}, e.g. {"In Stock": inventory, "Ingredient": internal_inventory}
+        self.sources = sources
+        self.products = products
+        # {source_type: {(ean, exp_ord): bucket}}
+        self.state = {source: {} for source in sources}
+        # The alerting batches behind state: {source_type: {(ean, exp_ord): {'ean', 'name', 'exp_ord', 'qty'}}}
+        self.alerting = {source: {} for source in sources}
+        # (message, rows) of AlertSystem.check_alerts over the alerting batches, rebuilt when they change
+        self.report = ("No alerts.", [])
+        # Increases whenever the alert state changes
+        self.version = 0
+        self.day = None
+        self.jobs = queue.Queue()
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        """Takes the initial snapshot (without notifications) and starts the worker."""
+        for source, manager in self.sources.items():
+            manager.add_listener(self._on_change)
+        self.day = today_ordinal()
+        for source in self.sources:
+            self._run(self._full_job(source, notify=False))
+        self.thread = threading.Thread(target=self._work, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stops listening to the inventories and ends the worker after the queued jobs."""
+        for manager in self.sources.values():
+            if self._on_change in manager.listeners:
+                manager.listeners.remove(self._on_change)
+        if self.thread is not None:
+            self.jobs.put(None)
+            self.thread.join(5.0)
+            self.thread = None
+
+    def subscribe(self):
+        """Returns a queue that receives newly crossed alerts."""
+        q = queue.Queue()
+        with self.lock:
+            self.subscribers.append(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            if q in self.subscribers:
+                self.subscribers.remove(q)
+
+    def count(self):
+        """Number of batches currently in an alert bucket."""
+        return sum(len(s) for s in self.state.values())
+
+    def tick(self):
+        """Call periodically; rescans everything once the date has changed."""
+        today = today_ordinal()
+        if today != self.day:
+            self.day = today
+            for source in self.sources:
+                self.jobs.put(self._full_job(source, notify=True))
+
+    def _products(self):
+        # list() copies in one step, so product edits on another thread can't break the iteration
+        return dict(list(self.products.items())) if self.products else None
+
+    def _full_job(self, source, notify):
+        manager = self.sources[source]
+        end = self.day + self.alerts.widest_window(self._products())
+        return ('all', source, None, manager.get_columns(end=end), notify)
+
+    def _on_change(self, manager, batches):
+        source = next(s for s, m in self.sources.items() if m is manager)
+        if batches is None:
+            self.jobs.put(self._full_job(source, notify=True))
+            return
+        for ean in {b['ean'] for b in batches}:
+            snapshot = [dict(b) for b in manager.get_batches(ean)]
+            self.jobs.put(('ean', source, ean, snapshot, True))
+
+    def _build_report(self, products):
+        msg, df = self.alerts.check_alerts(list(self.alerting.get("In Stock", {}).values()),
+                                           list(self.alerting.get("Ingredient", {}).values()),
+                                           products=products, today=self.day)
+        return msg, df.to_dict('records')
+
+    def _work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            try:
+                self._run(job)
+            except Exception as e:
+                print(f"Error in expiry watcher: {e}")
+
+    def _run(self, job):
+        kind, source, ean, items, notify = job
+        products = self._products()
+        windows, _ = self.alerts.product_settings(products)
+        cols = to_columns(items)
+        rows, bucket, _ = self.alerts.classify(cols, self.day, windows)
+        current = {}
+        batches = {}
+        for r, b in zip(rows, bucket):
+            key = (cols['ean'][r], int(cols['exp_ord'][r]))
+            current[key] = int(b)
+            batches[key] = {'ean': key[0], 'name': cols['name'][r], 'exp_ord': key[1], 'qty': float(cols['qty'][r])}
+
+        state = self.state[source]
+        alerting = self.alerting[source]
+        if kind == 'all':
+            previous = state
+            previous_batches = alerting
+        else:
+            previous = {key: b for key, b in state.items() if key[0] == ean}
+            previous_batches = {key: b for key, b in alerting.items() if key[0] == ean}
+        crossed = [(i, key) for i, key in enumerate(current)
+                   if key not in previous or current[key] < previous[key]]
+
+        if kind == 'all':
+            self.state[source] = current
+            self.alerting[source] = batches
+        else:
+            for key in previous:
+                if key not in current:
+                    del state[key]
+                    del alerting[key]
+            state.update(current)
+            alerting.update(batches)
+        if current != previous or batches != previous_batches:
+            self.report = self._build_report(products)
+            self.version += 1
+
+        if notify and crossed:
+            index = [rows[i] for i, _ in crossed]
+            dates = format_dates(cols['exp_ord'][index])
+            events = [{
+                'ean': key[0],
+                'name': cols['name'][r],
+                'exp_date': exp_date,
+                'qty': float(cols['qty'][r]),
+                'status': f"{self.alerts.buckets[current[key]]} ({source})",
+            } for (_, key), r, exp_date in zip(crossed, index, dates)]
+            with self.lock:
+                for q in self.subscribers:
+                    q.put_nowait(events)
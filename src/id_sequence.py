@@ -0,0 +1,85 @@
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def id_number(value, prefix):
+    """Numeric part of a PREFIX-123 style ID, or None."""
+    value = str(value)
+    if value.startswith(prefix + '-'):
+        num_part = value[len(prefix) + 1:]
+        if num_part.isdigit():
+            return int(num_part)
+    return None
+
+
+class IdSequence:
+    """
+    Persistent counter for PREFIX-001 style IDs.
+
+    The last number handed out is kept in a small text file. Every allocation
+    takes an exclusive lock on a .lock file next to it, reads the counter,
+    advances it and writes it back, so several processes sharing the data folder
+    never get the same number. The cost doesn't depend on how many records exist.
+
+    floor is the highest number already in use (from the loaded data); the
+    counter never goes below it, which also seeds a missing or stale file.
+    """
+
+    def __init__(self, path, prefix, width=3, floor=0):
+        self.path = path
+        self.prefix = prefix
+        self.width = width
+        self.floor = floor
+        self.lock = threading.Lock()
+
+    def format(self, number):
+        return f"{self.prefix}-{number:0{self.width}d}"
+
+    def reserve(self, number):
+        """Makes sure number (e.g. an ID that was imported) is never handed out."""
+        if number is not None and number > self.floor:
+            self.floor = number
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _write(self, number):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(number))
+        os.replace(tmp_path, self.path)
+
+    def allocate(self, n=1):
+        """Reserves n consecutive IDs and returns them."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self.lock, open(self.path + ".lock", "a+") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                first = max(self._read(), self.floor) + 1
+                last = first + n - 1
+                self._write(last)
+                self.floor = last
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        return [self.format(number) for number in range(first, last + 1)]
+
+    def next_id(self):
+        return self.allocate(1)[0]
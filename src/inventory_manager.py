@@ -1,165 +1,400 @@
 import pandas as pd
-import os
+import threading
 from datetime import datetime
+from src.inventory_storage import CSVInventoryStorage, JournalInventoryStorage, write_inventory_csv
+from src.batch_index import BatchIndex, prepare_batch
+from src.columnar_store import ColumnarBatchIndex
+from src.dates import parse_date, format_date, today_ordinal
+from src.inventory_view import SortedInventoryView
+from src.persistence import DebouncedWriter
+from src.events import EventBus, ChangeEvent
 
 
 class InventoryManager:
-    def __init__(self, file_path="data/inventory/inventory.csv"):
+    def __init__(self, file_path="data/inventory/inventory.csv", storage=None, columnar=False, entity="inventory", bus=None):
         self.file_path = file_path
-        # Inventory: [{'ean': '12345', 'exp_date': '2023-12-01', 'qty': 10}]
-        self.inventory = []
+        # Every commit is published here as ChangeEvents keyed (ean, exp_date), entity naming this inventory
+        self.entity = entity
+        self.bus = bus if bus is not None else EventBus()
+        # Storage backend (CSV snapshot + movement journal by default, or SQLiteInventoryStorage)
+        self.storage = storage if storage is not None else JournalInventoryStorage(CSVInventoryStorage(file_path))
+        # Batches: {('12345', 738855): {'ean': '12345', 'exp_date': '01-12-2023', 'exp_ord': 738855, 'qty': 10}}
+        # exp_ord is the parsed day ordinal; batches are indexed per EAN in expiry order (see BatchIndex).
+        # columnar=True keeps them in NumPy columns instead (see ColumnarBatchIndex)
+        self.index_class = ColumnarBatchIndex if columnar else BatchIndex
+        self.batches = self.index_class()
+        # Batches touched since the last commit: {(ean, exp_ord): batch}
+        self._pending = {}
+        # Movements recorded since the last commit (see _mark)
+        self._movements = []
+        # Commits not yet written to storage, merged until the writer runs: {(ean, exp_ord): batch} and movements.
+        # The batches are copies taken at commit time, so later edits or a rollback can't change what is written
+        self._unsaved = {}
+        self._unsaved_movements = []
+        # Copies of every batch as of the last commit, {(ean, exp_ord): batch}: the full inventory
+        # handed to storage snapshots, so the writer thread never reads self.batches
+        self._committed = {}
+        self._unsaved_lock = threading.Lock()
+        self.writer = DebouncedWriter(self._write_commits, "inventory")
+        # Display rows kept sorted by Name and expiry, patched on every commit
+        self.view = SortedInventoryView()
+        # Called after every commit as callback(manager, batches); batches is None after a reload
+        self.listeners = []
         self.load_data()
 
     def load_data(self):
-        """Loads inventory from CSV on startup and converts dates if needed."""
-        if os.path.exists(self.file_path):
-            try:
-                df = pd.read_csv(self.file_path, dtype={'ean': str})
-                self.inventory = df.to_dict('records')
-                
-                # Auto-convert dates from YYYY-MM-DD to DD-MM-YYYY
-                converted = False
-                for item in self.inventory:
-                    date_str = str(item['exp_date'])
-                    if "-" in date_str and len(date_str.split('-')[0]) == 4:
-                        try:
-                            dt = datetime.strptime(date_str, "%Y-%m-%d")
-                            item['exp_date'] = dt.strftime("%d-%m-%Y")
-                            converted = True
-                        except:
-                            pass
+        """Loads inventory from the storage backend on startup and converts dates if needed."""
+        try:
+            loaded = self.storage.load()
+            
+            # Parse every date once; YYYY-MM-DD dates are converted to DD-MM-YYYY
+            converted = False
+            for item in loaded:
+                item['ean'] = str(item['ean'])
+                if prepare_batch(item):
+                    converted = True
+            
+            self.batches = self.index_class(loaded)
+            self._reset_committed()
+
+            if converted:
+                print(f"Migrated inventory dates to DD-MM-YYYY")
+                self.save_data()
                 
-                if converted:
-                    print(f"Migrated inventory dates to DD-MM-YYYY")
-                    self.save_data()
-                    
-                print(f"Loaded {len(self.inventory)} inventory batches from {self.file_path}")
-            except Exception as e:
-                print(f"Error loading inventory: {e}")
+            print(f"Loaded {len(self.inventory)} inventory batches from {self.storage.describe()}")
+        except Exception as e:
+            print(f"Error loading inventory: {e}")
+        self.view.rebuild(self.batches)
+        self._notify(None)
+        self.bus.emit(self.entity, None)
+
+    @property
+    def version(self):
+        """Increases every time the inventory changes."""
+        return self.view.version
+
+    @property
+    def inventory(self):
+        """All batches as a list: [{'ean': '12345', 'name': 'Milk', 'exp_date': '01-12-2023', 'qty': 10}]"""
+        return list(self.batches)
 
     def save_data(self):
-        """Saves current inventory to CSV."""
-        df = pd.DataFrame(self.inventory)
-        if df.empty:
-            # Ensure columns exist even if empty
-            df = pd.DataFrame(columns=['ean', 'name', 'exp_date', 'qty'])
+        """Writes the full inventory to the storage backend."""
+        self.writer.flush()
+        with self.writer.lock:
+            self.storage.save_all(self.inventory)
+            with self._unsaved_lock:
+                self._unsaved = {}
+                self._unsaved_movements = []
+            self._reset_committed()
+        self._pending = {}
+        self._movements = []
+
+    def _reset_committed(self):
+        committed = {(b['ean'], b['exp_ord']): dict(b) for b in self.batches}
+        with self._unsaved_lock:
+            self._committed = committed
+
+    def _committed_batches(self):
+        """Copies of the batches as of the last commit (called by storage, in the writer thread)."""
+        with self._unsaved_lock:
+            return [dict(b) for b in self._committed.values()]
 
-        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
-        df.to_csv(self.file_path, index=False)
+    def _mark(self, batch, delta, action):
+        """
+        Remembers a batch that was created, changed or cleared to 0,
+        and records the movement for the storage journal.
+        """
+        self._pending[(batch['ean'], batch['exp_ord'])] = batch
+        self._movements.append({
+            'ean': batch['ean'],
+            'name': batch['name'],
+            'exp_date': batch['exp_date'],
+            'delta': delta,
+            'qty': batch['qty'],
+            'action': action,
+            'timestamp': datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+        })
+
+    def _commit(self):
+        """
+        Publishes the batches touched since the last commit. They are written to
+        storage by the writer thread, several commits in one go.
+        """
+        copies = {key: dict(b) for key, b in self._pending.items()}
+        with self._unsaved_lock:
+            self._unsaved.update(copies)
+            self._unsaved_movements.extend(self._movements)
+            for key, b in copies.items():
+                if b['qty'] == 0:
+                    self._committed.pop(key, None)
+                else:
+                    self._committed[key] = b
+        self.writer.mark_dirty()
+        changed = list(self._pending.values())
+        events = self._change_events(changed)
+        self.view.apply(changed)
+        self._pending = {}
+        self._movements = []
+        self._notify(changed)
+        self.bus.publish(events)
+
+    def _change_events(self, batches):
+        """ChangeEvents for committed batches; the quantity before comes from each batch's first movement."""
+        first = {}
+        for m in self._movements:
+            first.setdefault((m['ean'], m['exp_date']), m)
+        events = []
+        for b in batches:
+            key = (b['ean'], b['exp_date'])
+            new = {'ean': b['ean'], 'name': b['name'], 'exp_date': b['exp_date'], 'qty': b['qty']}
+            m = first.get(key)
+            old_qty = m['qty'] - m['delta'] if m is not None else 0
+            old = {**new, 'qty': old_qty} if old_qty else None
+            events.append(ChangeEvent(self.entity, key, old, new if b['qty'] else None))
+        return events
+
+    def _write_commits(self):
+        """Writes the commits made since the last write (runs in the writer thread)."""
+        with self._unsaved_lock:
+            unsaved, self._unsaved = self._unsaved, {}
+            movements, self._unsaved_movements = self._unsaved_movements, []
+        batches = list(unsaved.values())
+        upserts = [b for b in batches if b['qty'] != 0]
+        deletes = [(b['ean'], b['exp_date']) for b in batches if b['qty'] == 0]
+        try:
+            self.storage.commit(upserts, deletes, self._committed_batches, movements)
+        except Exception:
+            # Put them back for the retry, in front of anything committed meanwhile
+            with self._unsaved_lock:
+                self._unsaved = {**unsaved, **self._unsaved}
+                self._unsaved_movements = movements + self._unsaved_movements
+            raise
+
+    def add_listener(self, callback):
+        """Registers callback(manager, batches), run after every change to the inventory."""
+        self.listeners.append(callback)
+
+    def _notify(self, batches):
+        for callback in self.listeners:
+            try:
+                callback(self, batches)
+            except Exception as e:
+                print(f"Error in inventory listener: {e}")
+
+    def get_movements(self, ean=None):
+        """Returns the recorded stock movements (oldest first), optionally for one EAN."""
+        self.writer.flush()
+        movements = self.storage.read_movements()
+        if ean is not None:
+            ean = str(ean).strip()
+            movements = [m for m in movements if m['ean'] == ean]
+        return movements
+
+    def export_csv(self, file_path=None):
+        """Exports the current inventory as CSV (defaults to file_path)."""
+        write_inventory_csv(file_path or self.file_path, self.inventory)
+
+    def import_csv(self, file_path=None):
+        """Replaces the current inventory with the contents of a CSV file."""
+        storage = CSVInventoryStorage(file_path or self.file_path)
+        self.batches = self.index_class(storage.load())
+        self.save_data()
+        self.view.rebuild(self.batches)
+        self._notify(None)
+        self.bus.emit(self.entity, None)
 
     def update_stock(self, ean, name, exp_date, qty, action, shelf_life=None):
+        ok, msg = self._move(ean, name, exp_date, qty, action, shelf_life)
+        if ok:
+            self._commit()  # <--- Auto Save
+        return msg, self.get_inventory_df()
+
+    def apply_movements(self, movements):
+        """
+        Applies several stock movements as one unit: either every line succeeds
+        and the result is persisted once, or nothing is changed.
+        movements: [{'ean', 'name', 'exp_date', 'qty', 'action', 'shelf_life' (optional)}]
+        Returns (success, results) with one (ok, message) tuple per line.
+        """
+        # Copies of every touched EAN's batches, taken before its first change
+        saved = {}
+        results = []
+        success = True
+        for m in movements:
+            ean = str(m.get('ean', '')).strip()
+            if ean not in saved:
+                saved[ean] = [dict(b) for b in self.batches.for_ean(ean)]
+            ok, msg = self._move(ean, m.get('name', ''), m.get('exp_date'), m.get('qty'), m.get('action', ''), m.get('shelf_life'))
+            results.append((ok, msg))
+            if not ok:
+                success = False
+                break
+
+        if not success:
+            # Roll back: put every touched EAN back the way it was
+            for ean, batches in saved.items():
+                for batch in self.batches.for_ean(ean):
+                    self.batches.remove(ean, batch['exp_ord'])
+                for batch in batches:
+                    self.batches.add(batch)
+            self._pending = {}
+            self._movements = []
+            # Lines after the failing one were never tried
+            results += [(False, "Skipped")] * (len(movements) - len(results))
+            return False, results
+
+        self._commit()
+        return True, results
+
+    def _move(self, ean, name, exp_date, qty, action, shelf_life=None):
+        """
+        Applies one Add/Remove movement in memory without persisting it.
+        Returns (ok, message); nothing is changed when ok is False.
+        """
         ean = str(ean).strip()
         exp_date = str(exp_date).strip() if exp_date else ""
 
         if not ean:
-            return "No EAN provided", self.get_inventory_df()
+            return False, "No EAN provided"
 
         # If date is missing and we're removing, find the OLDEST batch (FIFO)
         if not exp_date and "Remove" in action:
-            matches = [b for b in self.inventory if b['ean'] == ean]
-            if not matches:
-                return f"No stock found for {ean}", self.get_inventory_df()
-            
-            # Sort by actual date object
-            matches.sort(key=lambda x: datetime.strptime(x['exp_date'], "%d-%m-%Y"))
-            target_batch = matches[0]
+            target_batch = self.batches.oldest(ean)
+            if target_batch is None:
+                return False, f"No stock found for {ean}"
             exp_date = target_batch['exp_date']
         
         # If date is missing and we're adding, use shelf_life if provided
         if not exp_date and "Add" in action:
             if shelf_life is not None:
-                from datetime import timedelta
-                new_date = datetime.now() + timedelta(days=int(shelf_life))
-                exp_date = new_date.strftime("%d-%m-%Y")
+                exp_date = format_date(today_ordinal() + int(shelf_life))
             else:
-                return "Scan QR first (Date missing)", self.get_inventory_df()
+                return False, "Scan QR first (Date missing)"
+
+        exp_ord = parse_date(exp_date)
+        if exp_ord is None:
+            return False, f"Invalid date: {exp_date}"
+        exp_date = format_date(exp_ord)
 
         try:
             qty = float(qty)
-            if qty <= 0: return "Qty must be > 0", self.get_inventory_df()
+            if qty <= 0: return False, "Qty must be > 0"
         except:
-            return "Invalid Qty", self.get_inventory_df()
+            return False, "Invalid Qty"
 
-        # Find specific batch
-        found = False
-        
         if "Add" in action:
-            # First, try to "pay back" any negative stock for this EAN (FIFO)
-            negative_batches = [b for b in self.inventory if b['ean'] == ean and b['qty'] < 0]
-            # Sort by date to pay back oldest "debt" first
-            negative_batches.sort(key=lambda x: datetime.strptime(x['exp_date'], "%d-%m-%Y"))
-            
-            for neg_batch in negative_batches:
+            # First, try to "pay back" any negative stock for this EAN (oldest "debt" first)
+            for neg_batch in self.batches.negatives(ean):
                 if qty <= 0: break
                 
                 needed_to_clear = abs(neg_batch['qty'])
                 if qty >= needed_to_clear:
                     qty -= needed_to_clear
-                    neg_batch['qty'] = 0
+                    # Batches cleared to 0 drop out of the index
+                    self.batches.set_qty(neg_batch, 0)
+                    self._mark(neg_batch, needed_to_clear, action)
                 else:
-                    neg_batch['qty'] += qty
+                    self.batches.set_qty(neg_batch, neg_batch['qty'] + qty)
+                    self._mark(neg_batch, qty, action)
                     qty = 0
             
-            # Remove any batches we just cleared to 0
-            self.inventory = [b for b in self.inventory if b['qty'] != 0]
-            
             if qty <= 0:
                 # We used all new stock to cover negative debt
-                self.save_data()
-                return f"{action}: {name} (Used to cover negative stock)", self.get_inventory_df()
+                return True, f"{action}: {name} (Used to cover negative stock)"
 
         # If we still have qty left, find or create the specific batch
-        for batch in self.inventory:
-            if batch['ean'] == ean and batch['exp_date'] == exp_date:
-                if "Add" in action:
-                    batch['qty'] += qty
-                else:
-                    if batch['qty'] < qty:
-                        return "Not enough stock!", self.get_inventory_df()
-                    batch['qty'] -= qty
-                found = True
-                break
-
-        if not found:
+        batch = self.batches.get(ean, exp_ord)
+        if batch is not None:
+            if "Add" in action:
+                self.batches.set_qty(batch, batch['qty'] + qty)
+                self._mark(batch, qty, action)
+            else:
+                if batch['qty'] < qty:
+                    return False, "Not enough stock!"
+                self.batches.set_qty(batch, batch['qty'] - qty)
+                self._mark(batch, -qty, action)
+        else:
             if "Remove" in action:
                 # If we didn't find the batch but want to remove, we allow it to go negative
                 # This would usually be handled by deduct_total for recipes, 
                 # but if called directly via UI 'Remove', we can support it here too if desired.
                 # For now, keep the original logic:
-                return f"Batch {exp_date} not found for {ean}", self.get_inventory_df()
+                return False, f"Batch {exp_date} not found for {ean}"
             else:
-                self.inventory.append({
+                new_batch = {
                     'ean': ean,
                     'name': name,
                     'exp_date': exp_date,
+                    'exp_ord': exp_ord,
                     'qty': qty
-                })
+                }
+                self.batches.add(new_batch)
+                self._mark(new_batch, qty, action)
 
-        # Final cleanup: remove any exactly 0 batches
-        self.inventory = [b for b in self.inventory if b['qty'] != 0]
-
-        self.save_data()  # <--- Auto Save
-        return f"{action}: {name} ({exp_date})", self.get_inventory_df()
+        return True, f"{action}: {name} ({exp_date})"
 
     def get_inventory_df(self):
-        if not self.inventory:
-            return pd.DataFrame(columns=["EAN", "Name", "Exp Date", "Qty"])
-        
-        df = pd.DataFrame(self.inventory)
-        
-        # Convert date strings to actual datetime objects for correct sorting
-        df['temp_date'] = pd.to_datetime(df['exp_date'], format='%d-%m-%Y')
-        # Sort by Name (A-Z) and then temp_date (Soonest first)
-        df = df.sort_values(by=['name', 'temp_date'])
-        # Remove temp column
-        df = df.drop(columns=['temp_date'])
-        
-        # Capitalize headers for display
-        return df.rename(columns={"ean": "EAN", "name": "Name", "exp_date": "Exp Date", "qty": "Qty"})
+        # The view is already sorted by Name (A-Z) and then expiry (Soonest first)
+        return pd.DataFrame(self.view.get_rows(), columns=["EAN", "Name", "Exp Date", "Qty"])
+
+    def get_inventory_rows(self):
+        """Display rows in table order, each with an 'id' row key."""
+        return self.view.get_rows()
+
+    def get_inventory_changes(self, since):
+        """
+        Rows inserted/updated/removed since `since` (a previous version), or None
+        when the caller has to reload everything. See SortedInventoryView.get_changes.
+        """
+        return self.view.get_changes(since)
 
     def get_raw_inventory(self):
         return self.inventory
 
+    def get_totals(self):
+        """Total quantity per EAN: {ean: qty}."""
+        return self.batches.totals()
+
+    def get_columns(self, start=None, end=None):
+        """
+        Batches as NumPy columns (ean, name, exp_ord, qty) for vectorized checks.
+        start/end (dates or day ordinals) limit them to batches expiring in that range.
+        """
+        return self.batches.columns(self._day(start), self._day(end))
+
+    def _day(self, value):
+        """Day ordinal for a DD-MM-YYYY / YYYY-MM-DD string; ordinals and None pass through."""
+        if value is None or not isinstance(value, str):
+            return value
+        return parse_date(value)
+
+    def get_expiring(self, start=None, end=None):
+        """Batches expiring between start and end (inclusive, dates or day ordinals), soonest first."""
+        return self.batches.expiring(self._day(start), self._day(end))
+
+    def get_next_to_expire(self, n=10, start=None):
+        """The n batches that expire first, from start (default today) on."""
+        start = today_ordinal() if start is None else self._day(start)
+        return self.batches.next_to_expire(n, start)
+
+    def get_expiry_counts(self, start=None, end=None):
+        """Number of batches expiring per day: {'DD-MM-YYYY': count}."""
+        counts = self.batches.expiry_counts(self._day(start), self._day(end))
+        return {format_date(day): n for day, n in counts.items()}
+
+    def get_in_stock_eans(self):
+        """EANs with at least one batch above zero."""
+        cols = self.batches.columns()
+        return set(cols['ean'][cols['qty'] > 0])
+
+    def get_batches(self, ean):
+        """Batches of one EAN, oldest expiry first."""
+        return self.batches.for_ean(str(ean).strip())
+
+    def get_batch(self, ean, exp_date):
+        return self.batches.get(str(ean).strip(), parse_date(exp_date))
+
     def deduct_total(self, ean, name, total_to_remove):
         """
         Deducts quantity from all batches of an EAN using FIFO.
@@ -169,10 +404,8 @@ class InventoryManager:
         ean = str(ean).strip()
         total_to_remove = float(total_to_remove)
 
-        # Get all batches for this EAN
-        matches = [b for b in self.inventory if b['ean'] == ean]
-        # Sort by date (FIFO)
-        matches.sort(key=lambda x: datetime.strptime(x['exp_date'], "%d-%m-%Y"))
+        # Get all batches for this EAN, oldest first (FIFO)
+        matches = self.batches.for_ean(ean)
 
         total_available = sum(b['qty'] for b in matches)
         is_insufficient = total_available < total_to_remove
@@ -182,31 +415,36 @@ class InventoryManager:
         if not matches:
             # Create a new batch with negative qty
             # Use today as exp_date
-            today_str = datetime.now().strftime("%d-%m-%Y")
-            self.inventory.append({
+            today = today_ordinal()
+            new_batch = {
                 'ean': ean,
                 'name': name,
-                'exp_date': today_str,
+                'exp_date': format_date(today),
+                'exp_ord': today,
                 'qty': -remaining
-            })
+            }
+            self.batches.add(new_batch)
+            self._mark(new_batch, -remaining, "Deduct")
         else:
             # Deduct from batches in order
             for i, batch in enumerate(matches):
+                old_qty = batch['qty']
                 if i == len(matches) - 1:
                     # Last batch takes the rest, potentially going negative
-                    batch['qty'] -= remaining
+                    new_qty = old_qty - remaining
                     remaining = 0
                 else:
-                    if batch['qty'] >= remaining:
-                        batch['qty'] -= remaining
+                    if old_qty >= remaining:
+                        new_qty = old_qty - remaining
                         remaining = 0
-                        break
                     else:
-                        remaining -= batch['qty']
-                        batch['qty'] = 0
+                        remaining -= old_qty
+                        new_qty = 0
+                # Batches that reach exactly 0 drop out of the index
+                self.batches.set_qty(batch, new_qty)
+                self._mark(batch, new_qty - old_qty, "Deduct")
+                if remaining == 0:
+                    break
 
-            # Remove batches that reached exactly 0
-            self.inventory = [b for b in self.inventory if b['qty'] != 0]
-
-        self.save_data()
+        self._commit()
         return is_insufficient, total_available
\ No newline at end of file
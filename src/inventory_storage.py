@@ -0,0 +1,345 @@
+import pandas as pd
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from src.snapshot import load_snapshot, save_snapshot
+
+INVENTORY_COLUMNS = ['ean', 'name', 'exp_date', 'qty']
+MOVEMENT_COLUMNS = ['ean', 'name', 'exp_date', 'delta', 'qty', 'action', 'timestamp']
+
+
+def read_inventory_csv(file_path):
+    """Reads an inventory CSV into a list of batch dicts."""
+    df = pd.read_csv(file_path, dtype={'ean': str})
+    return df.to_dict('records')
+
+
+def write_inventory_csv(file_path, batches):
+    """Writes a list of batch dicts to an inventory CSV (temp file + rename, so a crash never leaves half a file)."""
+    df = pd.DataFrame(batches, columns=INVENTORY_COLUMNS)
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    tmp_path = file_path + ".tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, file_path)
+
+
+def merge_batch_rows(batches):
+    """
+    (ean, name, exp_date, qty) rows for a table keyed on (ean, exp_date).
+    Batches that share a key (e.g. repeated lines in a hand-edited CSV) are merged
+    by adding up their qty.
+    """
+    rows = {}
+    for b in batches:
+        key = (str(b['ean']), b['exp_date'])
+        if key in rows:
+            rows[key][3] += float(b['qty'])
+        else:
+            rows[key] = [key[0], b['name'], key[1], float(b['qty'])]
+    return [tuple(r) for r in rows.values()]
+
+
+def replay_movements(batches, movements):
+    """
+    Applies journal records on top of a list of batches.
+    Records carry the resulting qty of the batch, so replaying a record twice is harmless.
+    """
+    by_key = {(b['ean'], b['exp_date']): b for b in batches}
+    for m in movements:
+        key = (m['ean'], m['exp_date'])
+        if m['qty'] == 0:
+            by_key.pop(key, None)
+        elif key in by_key:
+            by_key[key]['qty'] = m['qty']
+        else:
+            by_key[key] = {'ean': m['ean'], 'name': m['name'], 'exp_date': m['exp_date'], 'qty': m['qty']}
+    return list(by_key.values())
+
+
+class CSVInventoryStorage:
+    """
+    Keeps the whole inventory as a single CSV snapshot.
+    CSV has no row-level writes, so every commit rewrites the file.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+    def load(self):
+        if not os.path.exists(self.file_path):
+            return []
+        # The binary snapshot next to the CSV is used while the CSV is unchanged
+        batches = load_snapshot([self.file_path], "inventory")
+        if batches is None:
+            batches = read_inventory_csv(self.file_path)
+            save_snapshot([self.file_path], "inventory", batches)
+        return batches
+
+    def save_all(self, batches):
+        write_inventory_csv(self.file_path, batches)
+        save_snapshot([self.file_path], "inventory", batches)
+
+    def commit(self, upserts, deletes, snapshot, movements=None):
+        """
+        upserts: batches that were created or changed
+        deletes: (ean, exp_date) keys of batches that reached 0
+        snapshot: callable returning the full inventory
+        movements: journal records describing the change
+        """
+        self.save_all(snapshot())
+
+    def read_movements(self):
+        # A bare snapshot keeps no history
+        return []
+
+    def describe(self):
+        return self.file_path
+
+
+class JournalInventoryStorage:
+    """
+    Appends every movement to a JSON-lines journal next to a snapshot storage.
+    Once the journal passes compact_threshold bytes it is rotated and folded
+    into a new snapshot on a background thread. Compacted journal segments are
+    kept as movement history.
+    """
+
+    def __init__(self, snapshot_storage, journal_path=None, compact_threshold=1_000_000):
+        self.snapshot_storage = snapshot_storage
+        if journal_path is None:
+            journal_path = os.path.splitext(snapshot_storage.file_path)[0] + ".journal.jsonl"
+        self.journal_path = journal_path
+        # Journal being folded into the snapshot
+        self.compacting_path = journal_path + ".compacting"
+        self.compact_threshold = compact_threshold
+        self.lock = threading.Lock()
+        self.compaction_thread = None
+        self.journal = None
+
+    def _open_journal(self):
+        if self.journal is None:
+            os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+            self.journal = open(self.journal_path, "a", encoding="utf-8")
+        return self.journal
+
+    def _read_journal(self, path):
+        records = []
+        if not os.path.exists(path):
+            return records
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A torn last line from a crash mid-append
+                    print(f"Skipping unreadable journal line in {path}")
+        return records
+
+    def load(self):
+        """Loads the last snapshot and replays the journal tail on top of it."""
+        self.wait_for_compaction()
+        batches = self.snapshot_storage.load()
+        # A compaction that was interrupted leaves its journal behind
+        tail = self._read_journal(self.compacting_path) + self._read_journal(self.journal_path)
+        if tail:
+            print(f"Replaying {len(tail)} journal records from {self.journal_path}")
+        return replay_movements(batches, tail)
+
+    def save_all(self, batches):
+        """Writes a fresh snapshot and starts an empty journal."""
+        self.wait_for_compaction()
+        with self.lock:
+            self.snapshot_storage.save_all(batches)
+            self._archive_segment(self.compacting_path)
+            self._close_journal()
+            self._archive_segment(self.journal_path)
+
+    def commit(self, upserts, deletes, snapshot, movements=None):
+        if not movements:
+            return
+        with self.lock:
+            journal = self._open_journal()
+            for m in movements:
+                journal.write(json.dumps(m, ensure_ascii=False) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+            needs_compaction = journal.tell() >= self.compact_threshold
+        if needs_compaction:
+            self.compact(snapshot)
+
+    def compact(self, snapshot):
+        """Rotates the journal and writes the snapshot in the background."""
+        with self.lock:
+            if self.compaction_thread is not None and self.compaction_thread.is_alive():
+                return
+            self._close_journal()
+            if not os.path.exists(self.journal_path):
+                return
+            if os.path.exists(self.compacting_path):
+                # Left over from an interrupted compaction, fold it in as well
+                with open(self.compacting_path, "a", encoding="utf-8") as dst, open(self.journal_path, encoding="utf-8") as src:
+                    dst.write(src.read())
+                os.remove(self.journal_path)
+            else:
+                os.replace(self.journal_path, self.compacting_path)
+            # Copy the batches now so later movements can't leak into this snapshot
+            batches = [dict(b) for b in snapshot()]
+            self.compaction_thread = threading.Thread(target=self._write_snapshot, args=(batches,), daemon=True)
+            self.compaction_thread.start()
+
+    def _write_snapshot(self, batches):
+        try:
+            self.snapshot_storage.save_all(batches)
+            self._archive_segment(self.compacting_path)
+        except Exception as e:
+            print(f"Error compacting inventory journal: {e}")
+
+    def wait_for_compaction(self):
+        if self.compaction_thread is not None:
+            self.compaction_thread.join()
+
+    def _close_journal(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def _archive_segment(self, path):
+        """Moves a folded journal segment into the movement history."""
+        if os.path.exists(path):
+            stamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+            os.replace(path, f"{self.journal_path}.{stamp}.done")
+
+    def _history_segments(self):
+        directory = os.path.dirname(self.journal_path) or "."
+        prefix = os.path.basename(self.journal_path) + "."
+        names = [n for n in os.listdir(directory) if n.startswith(prefix) and n.endswith(".done")]
+        return [os.path.join(directory, n) for n in sorted(names)]
+
+    def read_movements(self):
+        """Returns every recorded movement, oldest first."""
+        movements = []
+        for path in self._history_segments():
+            movements.extend(self._read_journal(path))
+        with self.lock:
+            if self.journal is not None:
+                self.journal.flush()
+            movements.extend(self._read_journal(self.compacting_path))
+            movements.extend(self._read_journal(self.journal_path))
+        return movements
+
+    def describe(self):
+        return f"{self.snapshot_storage.describe()} + {self.journal_path}"
+
+
+class SQLiteInventoryStorage:
+    """
+    Keeps one row per batch in a SQLite table keyed on (ean, exp_date).
+    Several InventoryManagers can share one database file by using different tables.
+    """
+
+    def __init__(self, db_path, table="inventory", seed_csv=None):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table}")
+        self.db_path = db_path
+        self.table = table
+        # Existing CSV data is imported the first time the table is created
+        self.seed_csv = seed_csv
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_table()
+
+    def _create_table(self):
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (self.table,)
+        ).fetchone()
+        seed = not exists and self.seed_csv and os.path.exists(self.seed_csv)
+        # Tables and seed data in one transaction: if the import fails the tables are
+        # rolled back too, so the next start imports again instead of starting empty
+        with self.lock, self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "ean TEXT NOT NULL, "
+                "name TEXT, "
+                "exp_date TEXT NOT NULL, "
+                "qty REAL NOT NULL, "
+                "PRIMARY KEY (ean, exp_date))"
+            )
+            # Movement history, written in the same transaction as the batch rows
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table}_movements ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "ean TEXT NOT NULL, "
+                "name TEXT, "
+                "exp_date TEXT NOT NULL, "
+                "delta REAL NOT NULL, "
+                "qty REAL NOT NULL, "
+                "action TEXT, "
+                "timestamp TEXT)"
+            )
+            if seed:
+                self._replace_rows(read_inventory_csv(self.seed_csv))
+        if seed:
+            print(f"Imported {self.seed_csv} into {self.db_path}:{self.table}")
+
+    def load(self):
+        with self.lock:
+            rows = self.conn.execute(f"SELECT ean, name, exp_date, qty FROM {self.table}").fetchall()
+        return [{'ean': r[0], 'name': r[1], 'exp_date': r[2], 'qty': r[3]} for r in rows]
+
+    def save_all(self, batches):
+        """Replaces the whole table in a single transaction."""
+        with self.lock, self.conn:
+            self._replace_rows(batches)
+
+    def _replace_rows(self, batches):
+        # Runs inside the caller's transaction
+        self.conn.execute(f"DELETE FROM {self.table}")
+        self.conn.executemany(
+            f"INSERT INTO {self.table} (ean, name, exp_date, qty) VALUES (?, ?, ?, ?)", merge_batch_rows(batches)
+        )
+
+    def commit(self, upserts, deletes, snapshot=None, movements=None):
+        """Writes only the touched batches, all inside one transaction."""
+        if not upserts and not deletes:
+            return
+        with self.lock, self.conn:
+            if movements:
+                self.conn.executemany(
+                    f"INSERT INTO {self.table}_movements ({', '.join(MOVEMENT_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [tuple(m[c] for c in MOVEMENT_COLUMNS) for m in movements]
+                )
+            if upserts:
+                self.conn.executemany(
+                    f"INSERT INTO {self.table} (ean, name, exp_date, qty) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(ean, exp_date) DO UPDATE SET name=excluded.name, qty=excluded.qty",
+                    [(str(b['ean']), b['name'], b['exp_date'], float(b['qty'])) for b in upserts]
+                )
+            if deletes:
+                self.conn.executemany(
+                    f"DELETE FROM {self.table} WHERE ean=? AND exp_date=?", deletes
+                )
+
+    def read_movements(self):
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(MOVEMENT_COLUMNS)} FROM {self.table}_movements ORDER BY id"
+            ).fetchall()
+        return [dict(zip(MOVEMENT_COLUMNS, r)) for r in rows]
+
+    def import_csv(self, file_path):
+        self.save_all(read_inventory_csv(file_path))
+
+    def export_csv(self, file_path):
+        write_inventory_csv(file_path, self.load())
+
+    def describe(self):
+        return f"{self.db_path}:{self.table}"
@@ -0,0 +1,115 @@
+from bisect import bisect_left, insort
+
+# How many row changes are kept for clients catching up with get_changes()
+CHANGE_LOG_LIMIT = 2000
+
+
+def row_id(batch):
+    return f"{batch['ean']}|{batch['exp_date']}"
+
+
+class SortedInventoryView:
+    """
+    Display rows of an inventory kept sorted by Name and then expiry (soonest first).
+    Every applied change bumps version and is logged, so a table that was
+    rendered at some version can be patched with only the rows that changed.
+    """
+
+    def __init__(self):
+        self.version = 0
+        # {row_id: {'id', 'EAN', 'Name', 'Exp Date', 'Qty'}}
+        self.rows = {}
+        # [(sort_key, row_id), ...] in display order
+        self.order = []
+        # {row_id: sort_key}
+        self.sort_keys = {}
+        # [(version, kind, row_id)] with kind in 'inserted', 'updated', 'removed'
+        self.log = []
+        # Oldest version the log can answer from
+        self.log_floor = 0
+
+    def _sort_key(self, batch):
+        return (str(batch['name']), batch['exp_ord'], batch['ean'])
+
+    def rebuild(self, batches):
+        """Recreates the view from scratch; clients have to reload."""
+        self.rows = {}
+        self.sort_keys = {}
+        order = []
+        for batch in batches:
+            rid = row_id(batch)
+            self.rows[rid] = {'id': rid, 'EAN': batch['ean'], 'Name': batch['name'],
+                              'Exp Date': batch['exp_date'], 'Qty': batch['qty']}
+            self.sort_keys[rid] = self._sort_key(batch)
+            order.append((self.sort_keys[rid], rid))
+        order.sort()
+        self.order = order
+        self.version += 1
+        self.log = []
+        self.log_floor = self.version
+
+    def apply(self, batches):
+        """Applies changed batches (qty 0 means the batch is gone)."""
+        if not batches:
+            return
+        self.version += 1
+        for batch in batches:
+            rid = row_id(batch)
+            if batch['qty'] == 0:
+                if rid not in self.rows:
+                    continue
+                del self.rows[rid]
+                key = self.sort_keys.pop(rid)
+                self.order.pop(bisect_left(self.order, (key, rid)))
+                self.log.append((self.version, 'removed', rid))
+            elif rid in self.rows:
+                self.rows[rid]['Qty'] = batch['qty']
+                self.log.append((self.version, 'updated', rid))
+            else:
+                self.rows[rid] = {'id': rid, 'EAN': batch['ean'], 'Name': batch['name'],
+                                  'Exp Date': batch['exp_date'], 'Qty': batch['qty']}
+                key = self.sort_keys[rid] = self._sort_key(batch)
+                insort(self.order, (key, rid))
+                self.log.append((self.version, 'inserted', rid))
+        if len(self.log) > CHANGE_LOG_LIMIT:
+            drop = len(self.log) - CHANGE_LOG_LIMIT
+            self.log_floor = self.log[drop - 1][0]
+            del self.log[:drop]
+
+    def get_rows(self):
+        """All rows in display order (copies)."""
+        return [dict(self.rows[rid]) for _, rid in self.order]
+
+    def get_changes(self, since):
+        """
+        Row-level delta since a version:
+        {'version', 'inserted': [(index, row)], 'updated': [row], 'removed': [row_id]}
+        Inserted rows are in ascending index order and the indexes refer to the current order,
+        so they apply cleanly after removals. Returns None if the caller has to reload everything.
+        """
+        if since is None or since < self.log_floor or since > self.version:
+            return None
+        # First change after `since` tells whether the row existed back then
+        first_kind = {}
+        # Rows removed (and possibly re-created, maybe at another position) since then
+        was_removed = set()
+        for version, kind, rid in self.log:
+            if version > since:
+                first_kind.setdefault(rid, kind)
+                if kind == 'removed':
+                    was_removed.add(rid)
+        inserted, updated, removed = [], [], []
+        for rid, kind in first_kind.items():
+            existed = kind != 'inserted'
+            exists = rid in self.rows
+            if existed and exists and rid not in was_removed:
+                updated.append(dict(self.rows[rid]))
+            elif exists:
+                if existed:
+                    removed.append(rid)
+                index = bisect_left(self.order, (self.sort_keys[rid], rid))
+                inserted.append((index, dict(self.rows[rid])))
+            elif existed:
+                removed.append(rid)
+        inserted.sort(key=lambda item: item[0])
+        return {'version': self.version, 'inserted': inserted, 'updated': updated, 'removed': removed}
@@ -0,0 +1,383 @@
+import pandas as pd
+import os
+import json
+import heapq
+import threading
+from itertools import islice
+from collections import OrderedDict
+from datetime import datetime
+from src.order_index import sort_value
+from src.search_index import SearchIndex
+from src.id_sequence import id_number
+
+ORDER_COLUMNS = ["Order ID", "Customer ID", "Customer Name", "Date", "Due Date", "Total", "Status"]
+ITEM_COLUMNS = ["Order ID", "EAN", "Name", "Exp Date", "Qty", "Price"]
+TIMESTAMP_FORMAT = "%d-%m-%Y %H:%M:%S"
+# Sort keys whose per-month range is kept in the manifest, so a page sorted by them
+# only reads the months it shows (see OrderArchive.iter_sorted)
+BOUNDED_SORT_KEYS = ("Order ID", "Date")
+
+
+def summarize_items(items):
+    """Items column of the order tables: "2.0x Milk, 1.0x Bread"."""
+    return ", ".join(f"{it['Qty']}x {it['Name']}" for it in items)
+
+
+def order_search_fields(order, items):
+    """Weighted text fields of an order for SearchIndex."""
+    fields = [(order['Order ID'], 3), (order.get('Customer Name'), 2), (order.get('Customer ID'), 2)]
+    for item in items:
+        fields.append((item['Name'], 1))
+        fields.append((item['EAN'], 1))
+    return fields
+
+
+def order_number(order_id):
+    """Numeric part of an ORD-123 style ID, or None."""
+    return id_number(order_id, 'ORD')
+
+
+def archive_month(order):
+    """YYYY-MM partition of a finished order: the month it was finished (or created, for older data)."""
+    for field in ("Finished Date", "Date"):
+        value = order.get(field)
+        if isinstance(value, str):
+            try:
+                return datetime.strptime(value[:10], "%d-%m-%Y").strftime("%Y-%m")
+            except ValueError:
+                pass
+    return "0000-00"
+
+
+class ArchiveMonth:
+    """The finished orders of one month, as loaded from its partition files."""
+
+    def __init__(self, month, orders, items):
+        self.month = month
+        self.orders_by_id = {o['Order ID']: o for o in orders}
+        self.items_by_order = {}
+        for item in items:
+            self.items_by_order.setdefault(item['Order ID'], []).append(item)
+        self.summaries = {oid: summarize_items(its) for oid, its in self.items_by_order.items()}
+        # Built on the first search of this month (see _search_index)
+        self.search_index = None
+
+    def _search_index(self):
+        if self.search_index is None:
+            self.search_index = SearchIndex()
+            for order_id, order in self.orders_by_id.items():
+                self.search_index.add(order_id, order_search_fields(order, self.items_by_order.get(order_id, [])))
+        return self.search_index
+
+    def put(self, order, items):
+        order_id = order['Order ID']
+        self.orders_by_id[order_id] = order
+        self.items_by_order[order_id] = items
+        self.summaries[order_id] = summarize_items(items)
+        if self.search_index is not None:
+            self.search_index.add(order_id, order_search_fields(order, items))
+
+    def pop(self, order_id):
+        order = self.orders_by_id.pop(order_id)
+        items = self.items_by_order.pop(order_id, [])
+        self.summaries.pop(order_id, None)
+        if self.search_index is not None:
+            self.search_index.remove(order_id)
+        return order, items
+
+    def bounds(self):
+        """{field: [[value, order_id], [value, order_id]]}: the lowest and highest sort key for each BOUNDED_SORT_KEYS field."""
+        bounds = {}
+        for field in BOUNDED_SORT_KEYS:
+            key = self.sort_key(field)
+            ids = sorted(self.orders_by_id, key=key)
+            bounds[field] = [[self.orders_by_id[oid].get(field), oid] for oid in (ids[0], ids[-1])]
+        return bounds
+
+    def row(self, order_id):
+        row = dict(self.orders_by_id[order_id])
+        row['Items'] = self.summaries.get(order_id, "")
+        row['ACTIONS'] = ""
+        return row
+
+    def sort_key(self, sort_by):
+        """Sort key of this month's order IDs, comparable with OrderManager's for open orders."""
+        if sort_by == "Items":
+            return lambda oid: (sort_value(self.summaries.get(oid, "")), oid)
+        return lambda oid: (sort_value(self.orders_by_id[oid].get(sort_by)), oid)
+
+    def matching(self, customer_id=None, search=None, sort_by="Order ID", descending=True):
+        """Order IDs of this month matching the filters, sorted."""
+        if search:
+            ids = [oid for oid, _ in self._search_index().search(search)]
+        else:
+            ids = list(self.orders_by_id)
+        if customer_id is not None:
+            ids = [oid for oid in ids if str(self.orders_by_id[oid].get('Customer ID')) == str(customer_id)]
+        ids.sort(key=self.sort_key(sort_by), reverse=descending)
+        return ids
+
+
+class OrderArchive:
+    """
+    Finished orders in monthly partitions: orders-YYYY-MM.csv.gz and
+    order_items-YYYY-MM.csv.gz, plus a manifest with per-month (and per-customer)
+    counts and the month of every archived order. Months are only loaded when a
+    page, search or lookup needs them, and the most recently used ones are kept
+    in memory.
+
+    Changes are made in memory and written by save(), which the OrderManager
+    runs on its writer thread; a past month's files are only rewritten when one
+    of its orders is edited, deleted or reopened.
+    """
+
+    def __init__(self, directory, cache_size=12):
+        self.directory = directory
+        self.cache_size = cache_size
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        # {'months': {'YYYY-MM': {'count': n, 'customers': {customer_id: n}, 'bounds': {field: [low, high]}}},
+        #  'orders': {order_id: 'YYYY-MM'}, 'max_number': n}
+        self.manifest = {'months': {}, 'orders': {}, 'max_number': 0}
+        # {'YYYY-MM': ArchiveMonth}, least recently used first
+        self.cache = OrderedDict()
+        # Months changed since the last save(), {'YYYY-MM': ArchiveMonth}; kept here so
+        # an unsaved month is never dropped from the cache and read back stale
+        self.dirty = {}
+        self.manifest_dirty = False
+        # {order_id: (order, items)} archived since the last save() (see unsaved_orders)
+        self.added = {}
+        # Guards the manifest and the dirty state against save() on the writer thread
+        self.lock = threading.Lock()
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, encoding="utf-8") as f:
+                    self.manifest = json.load(f)
+            except Exception as e:
+                print(f"Error loading order archive manifest: {e}")
+        if 'orders' not in self.manifest or any('bounds' not in info for info in self.manifest['months'].values()):
+            # Written before the manifest knew each order's month and each month's range: read every month once
+            self.manifest['orders'] = {}
+            for month in self.months():
+                part = self.load(month)
+                self.manifest['orders'].update(dict.fromkeys(part.orders_by_id, month))
+                self._describe(part)
+
+    def _paths(self, month):
+        return (os.path.join(self.directory, f"orders-{month}.csv.gz"),
+                os.path.join(self.directory, f"order_items-{month}.csv.gz"))
+
+    def months(self):
+        """Archived months, newest first."""
+        return sorted(self.manifest['months'], reverse=True)
+
+    def max_number(self):
+        """Highest ORD- number ever archived, so IDs are never reused."""
+        return self.manifest.get('max_number', 0)
+
+    def count(self, month=None, customer_id=None):
+        months = [month] if month else self.manifest['months']
+        total = 0
+        for m in months:
+            info = self.manifest['months'].get(m, {})
+            if customer_id is None:
+                total += info.get('count', 0)
+            else:
+                total += info.get('customers', {}).get(str(customer_id), 0)
+        return total
+
+    def __contains__(self, order_id):
+        return order_id in self.manifest['orders']
+
+    def load(self, month):
+        """The ArchiveMonth for a month, read from disk unless it is cached or unsaved."""
+        if month in self.dirty:
+            return self.dirty[month]
+        if month in self.cache:
+            self.cache.move_to_end(month)
+            return self.cache[month]
+        orders_path, items_path = self._paths(month)
+        orders, items = [], []
+        if os.path.exists(orders_path):
+            orders = pd.read_csv(orders_path).to_dict('records')
+        if os.path.exists(items_path):
+            items = pd.read_csv(items_path, dtype={'EAN': str}).to_dict('records')
+        part = self.cache[month] = ArchiveMonth(month, orders, items)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return part
+
+    def _changed(self, part):
+        """Updates a changed month's manifest entry and marks it for the next save()."""
+        self._describe(part)
+        with self.lock:
+            self.dirty[part.month] = part
+
+    def _describe(self, part):
+        """Updates a month's manifest entry from its orders."""
+        with self.lock:
+            if part.orders_by_id:
+                customers = {}
+                for o in part.orders_by_id.values():
+                    key = str(o.get('Customer ID'))
+                    customers[key] = customers.get(key, 0) + 1
+                self.manifest['months'][part.month] = {'count': len(part.orders_by_id), 'customers': customers,
+                                                       'bounds': part.bounds()}
+            else:
+                self.manifest['months'].pop(part.month, None)
+                self.cache.pop(part.month, None)
+            self.manifest_dirty = True
+
+    def add(self, entries):
+        """Archives finished orders: [(order, items), ...]."""
+        touched = {}
+        for order, items in entries:
+            month = archive_month(order)
+            part = touched.get(month) or self.load(month)
+            part.put(order, items)
+            touched[month] = part
+            with self.lock:
+                self.manifest['orders'][order['Order ID']] = month
+                self.added[order['Order ID']] = (order, items)
+                number = order_number(order['Order ID'])
+                if number is not None and number > self.max_number():
+                    self.manifest['max_number'] = number
+        for part in touched.values():
+            self._changed(part)
+
+    def find(self, order_id):
+        """The ArchiveMonth holding an order, or None."""
+        month = self.manifest['orders'].get(order_id)
+        return self.load(month) if month is not None else None
+
+    def remove(self, order_id):
+        """Takes an order out of the archive: (order, items), or None if it is not archived."""
+        part = self.find(order_id)
+        if part is None:
+            return None
+        order, items = part.pop(order_id)
+        with self.lock:
+            self.manifest['orders'].pop(order_id, None)
+            self.added.pop(order_id, None)
+        self._changed(part)
+        return order, items
+
+    def replace(self, order, items):
+        """Saves changes to an archived order in place."""
+        part = self.find(order['Order ID'])
+        part.put(order, items)
+        self._changed(part)
+
+    def unsaved_orders(self):
+        """Copies of the orders archived since the last save(): [(order, items), ...]."""
+        with self.lock:
+            return [(dict(order), [dict(item) for item in items]) for order, items in self.added.values()]
+
+    def save(self):
+        """Writes the changed months (temp file + rename) and the manifest. Runs in the writer thread."""
+        with self.lock:
+            if not self.dirty and not self.manifest_dirty:
+                return
+            dirty, self.dirty = self.dirty, {}
+            added, self.added = self.added, {}
+            self.manifest_dirty = False
+            manifest = json.dumps(self.manifest)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            for part in dirty.values():
+                self._write(part)
+            tmp_path = self.manifest_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(manifest)
+            os.replace(tmp_path, self.manifest_path)
+        except Exception:
+            # Put them back for the retry, under anything changed meanwhile
+            with self.lock:
+                self.dirty = {**dirty, **self.dirty}
+                self.added = {**added, **self.added}
+                self.manifest_dirty = True
+            raise
+
+    def _write(self, part):
+        """Rewrites a month's partition files, or removes them once the month is empty."""
+        orders_path, items_path = self._paths(part.month)
+        # Copied first, so edits made meanwhile can't change the rows under pandas
+        orders = [dict(o) for o in list(part.orders_by_id.values())]
+        items = [dict(item) for its in list(part.items_by_order.values()) for item in its]
+        if not orders:
+            for path in (orders_path, items_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            return
+        columns = ORDER_COLUMNS + [c for c in pd.DataFrame(orders).columns if c not in ORDER_COLUMNS]
+        pd.DataFrame(orders, columns=columns).to_csv(orders_path + ".tmp", index=False, compression="gzip")
+        pd.DataFrame(items, columns=ITEM_COLUMNS).to_csv(items_path + ".tmp", index=False, compression="gzip")
+        os.replace(orders_path + ".tmp", orders_path)
+        os.replace(items_path + ".tmp", items_path)
+
+    def iter_sorted(self, customer_id=None, search=None, sort_by="Order ID", descending=True):
+        """
+        The matching archived orders in sort order across all months, as
+        (sort key, ArchiveMonth, order_id), plus their total.
+        Without a search, pages sorted by a BOUNDED_SORT_KEYS field read months
+        lazily, by their range in the manifest, so a page only reads the months it
+        shows. Otherwise every month with a match is read, sorted on its own, and
+        the runs are merged.
+        """
+        # Without a search the manifest counts say which months can match
+        months = [m for m in self.months() if search or self.count(m, customer_id)]
+        if not search and sort_by in BOUNDED_SORT_KEYS:
+            return self._merge_by_bounds(months, customer_id, sort_by, descending), self.count(None, customer_id)
+        runs = []
+        total = 0
+        for month in months:
+            entries = self._entries(self.load(month), customer_id, search, sort_by, descending)
+            runs.append(entries)
+            total += len(entries)
+        return heapq.merge(*runs, key=lambda entry: entry[0], reverse=descending), total
+
+    def _entries(self, part, customer_id, search, sort_by, descending):
+        key = part.sort_key(sort_by)
+        return [(key(oid), part, oid) for oid in part.matching(customer_id, search, sort_by, descending)]
+
+    def _merge_by_bounds(self, months, customer_id, sort_by, descending):
+        """Merges the months' sorted runs, reading a month only once its range can hold the next entry."""
+        def first_key(month):
+            # The key its run starts with at best: its highest when descending, else its lowest
+            value, order_id = self.manifest['months'][month]['bounds'][sort_by][1 if descending else 0]
+            return (sort_value(value), order_id)
+
+        def before(a, b):
+            return a > b if descending else a < b
+
+        waiting = sorted(months, key=first_key, reverse=descending)
+        # [next entry, rest of the run] of each month read so far
+        heads = []
+        while heads or waiting:
+            best = (max if descending else min)(heads, key=lambda head: head[0][0], default=None)
+            if waiting and (best is None or not before(best[0][0], first_key(waiting[0]))):
+                run = iter(self._entries(self.load(waiting.pop(0)), customer_id, None, sort_by, descending))
+                entry = next(run, None)
+                if entry is not None:
+                    heads.append([entry, run])
+                continue
+            yield best[0]
+            best[0] = next(best[1], None)
+            if best[0] is None:
+                heads.remove(best)
+
+    def query(self, customer_id=None, search=None, sort_by="Order ID", descending=True, offset=0, limit=None):
+        """One page of archived orders as display rows, sorted across months. Returns (rows, total)."""
+        merged, total = self.iter_sorted(customer_id, search, sort_by, descending)
+        end = offset + limit if limit is not None else None
+        return [part.row(oid) for _, part, oid in islice(merged, offset, end)], total
+
+    def search(self, query, limit=None):
+        """Ranked archived orders for a search, newest month first, as display rows."""
+        rows = []
+        for month in self.months():
+            part = self.load(month)
+            for oid, _ in part._search_index().search(query):
+                rows.append(part.row(oid))
+                if limit and len(rows) >= limit:
+                    return rows
+        return rows
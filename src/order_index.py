@@ -0,0 +1,101 @@
+import heapq
+from bisect import bisect_left, insort
+from src.dates import parse_date
+
+# Sort keys kept presorted per status; other columns are sorted on demand
+INDEXED_SORT_KEYS = ('Order ID', 'Date')
+
+
+def sort_value(value):
+    """Comparable sort key for an order field: numbers by value, dates by day and time, the rest as text."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # NaN (empty CSV cell) sorts after everything else
+        return (0, float(value)) if value == value else (3, 0)
+    text = '' if value is None else str(value)
+    ordinal = parse_date(text[:10]) if len(text) >= 10 else None
+    if ordinal is not None:
+        return (1, ordinal, text[10:].strip())
+    return (2, text)
+
+
+class OrderIndex:
+    """
+    Order IDs partitioned by status, each partition kept sorted on INDEXED_SORT_KEYS,
+    plus the order IDs of every customer. Pages of one or more statuses are read
+    by merging the presorted partitions, so only the rows shown are touched.
+    """
+
+    def __init__(self):
+        # {status: {sort_key: [(value, order_id), ...]}} ascending
+        self.partitions = {}
+        # {order_id: (status, customer_id, {sort_key: value})}
+        self.entries = {}
+        # {customer_id: {order_id: None}}
+        self.by_customer = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, order):
+        order_id = order['Order ID']
+        if order_id in self.entries:
+            self.remove(order_id)
+        status = order.get('Status', "Received")
+        customer_id = order.get('Customer ID')
+        values = {key: sort_value(order.get(key)) for key in INDEXED_SORT_KEYS}
+        partition = self.partitions.setdefault(status, {key: [] for key in INDEXED_SORT_KEYS})
+        for key, value in values.items():
+            insort(partition[key], (value, order_id))
+        self.entries[order_id] = (status, customer_id, values)
+        self.by_customer.setdefault(customer_id, {})[order_id] = None
+
+    def remove(self, order_id):
+        entry = self.entries.pop(order_id, None)
+        if entry is None:
+            return
+        status, customer_id, values = entry
+        partition = self.partitions[status]
+        for key, value in values.items():
+            entries = partition[key]
+            entries.pop(bisect_left(entries, (value, order_id)))
+        if not partition[INDEXED_SORT_KEYS[0]]:
+            del self.partitions[status]
+        orders = self.by_customer[customer_id]
+        del orders[order_id]
+        if not orders:
+            del self.by_customer[customer_id]
+
+    def status_of(self, order_id):
+        return self.entries[order_id][0]
+
+    def statuses(self, status=None, exclude_status=None):
+        """Statuses selected by a status (or list of statuses) and/or an excluded status (or list)."""
+        if isinstance(status, str):
+            status = [status]
+        if isinstance(exclude_status, str):
+            exclude_status = [exclude_status]
+        selected = list(self.partitions) if status is None else [s for s in status if s in self.partitions]
+        if exclude_status:
+            selected = [s for s in selected if s not in exclude_status]
+        return selected
+
+    def count(self, statuses):
+        return sum(len(self.partitions[s][INDEXED_SORT_KEYS[0]]) for s in statuses)
+
+    def iter_sorted(self, statuses, sort_key, descending=False):
+        """Order IDs of the given statuses in sort_key order (sort_key in INDEXED_SORT_KEYS)."""
+        if descending:
+            runs = [reversed(self.partitions[s][sort_key]) for s in statuses]
+            merged = heapq.merge(*runs, reverse=True)
+        else:
+            merged = heapq.merge(*(self.partitions[s][sort_key] for s in statuses))
+        return (order_id for _, order_id in merged)
+
+    def iter_ids(self, statuses):
+        for s in statuses:
+            for _, order_id in self.partitions[s][INDEXED_SORT_KEYS[0]]:
+                yield order_id
+
+    def for_customer(self, customer_id, statuses):
+        wanted = set(statuses)
+        return [oid for oid in self.by_customer.get(customer_id, ()) if self.entries[oid][0] in wanted]
@@ -1,81 +1,132 @@
 import pandas as pd
 import os
 from datetime import datetime
+from itertools import islice
+import heapq
 import json
+from src.order_index import OrderIndex, INDEXED_SORT_KEYS, sort_value
+from src.search_index import SearchIndex
+from src.id_sequence import IdSequence
+from src.snapshot import load_snapshot, save_snapshot, snapshot_path
+from src.persistence import DebouncedWriter, write_csv
+from src.events import EventBus, ChangeEvent
+from src.order_archive import OrderArchive, ORDER_COLUMNS, ITEM_COLUMNS, TIMESTAMP_FORMAT, \
+    summarize_items, order_search_fields, order_number
 
 class OrderManager:
-    def __init__(self, orders_file="data/orders/orders.csv", items_file="data/orders/order_items.csv"):
+    def __init__(self, orders_file="data/orders/orders.csv", items_file="data/orders/order_items.csv", archive_dir=None, bus=None):
         self.orders_file = orders_file
         self.items_file = items_file
-        self.orders = []
-        self.order_items = []
+        # {order_id: order} of the open orders, oldest first; finished orders live in the monthly archive
+        self.orders_by_id = {}
+        # {order_id: [item, ...]}
+        self.items_by_order = {}
+        # {order_id: "2.0x Milk, 1.0x Bread"}, kept in step with items_by_order
+        self.item_summaries = {}
+        # Order IDs by status, presorted for paging (see query_orders)
+        self.index = OrderIndex()
+        # Text search over order ID, customer and item names/EANs (see search_orders), built on first use
+        self.search_index = None
+        # Finished orders, partitioned by month and loaded on demand
+        self.archive = OrderArchive(archive_dir or os.path.join(os.path.dirname(orders_file), "archive"))
+        # Next order number, shared with other processes using the same data folder
+        self.ids = IdSequence(os.path.join(os.path.dirname(orders_file), "order_id.seq"), "ORD")
+        # Increases every time an order (open or archived) changes, so the UI knows what to redraw
+        self.version = 0
+        # Every change is published here as a ChangeEvent with copies of the order header (see src/events.py)
+        self.bus = bus if bus is not None else EventBus()
+        # Edits are saved in the background, a burst of them at once (see DebouncedWriter)
+        self.writer = DebouncedWriter(self.save_data, "orders")
         self.load_data()
 
     def load_data(self):
-        """Loads orders and items from CSV."""
+        """Loads the open orders and their items, from the binary snapshot if it matches the CSVs."""
+        state = load_snapshot([self.orders_file, self.items_file], "orders")
+        if state is not None:
+            # The order index is part of the snapshot; the search index is rebuilt on the first search
+            self.orders_by_id, self.items_by_order, self.item_summaries, self.index = state
+            self.search_index = None
+            print(f"Loaded {len(self.orders_by_id)} orders from {snapshot_path(self.orders_file)}")
+        else:
+            self._load_csv()
+            if os.path.exists(self.orders_file):
+                self._save_snapshot()
+
+        # An order reopened just before a crash can still be in the archive too; the
+        # open orders file is written first (see save_data), so its copy is the newer one
+        reopened = [oid for oid, o in self.orders_by_id.items() if o['Status'] != "Finished" and oid in self.archive]
+        for oid in reopened:
+            self.archive.remove(oid)
+
+        # Finished orders from before the archive existed (or not yet dropped from the
+        # open orders file) are moved there once
+        finished = [oid for oid, o in self.orders_by_id.items() if o['Status'] == "Finished"]
+        if finished:
+            self.archive.add([self._take(oid) for oid in finished])
+            print(f"Archived {len(finished)} finished orders")
+        if finished or reopened or self.archive.manifest_dirty:
+            self.save_data()
+
+        # Archived orders count too, so IDs are never reused
+        for order_id in self.orders_by_id:
+            self.ids.reserve(order_number(order_id))
+        self.ids.reserve(self.archive.max_number())
+
+    def _load_csv(self):
         if os.path.exists(self.orders_file):
             try:
                 df = pd.read_csv(self.orders_file)
-                self.orders = df.to_dict('records')
-                print(f"Loaded {len(self.orders)} orders from {self.orders_file}")
+                self.orders_by_id = {}
+                self.index = OrderIndex()
+                for o in df.to_dict('records'):
+                    # Older data has no Status column
+                    if not isinstance(o.get('Status'), str):
+                        o['Status'] = "Received"
+                    self.orders_by_id[o['Order ID']] = o
+                    self.index.add(o)
+                print(f"Loaded {len(self.orders_by_id)} orders from {self.orders_file}")
             except Exception as e:
                 print(f"Error loading orders: {e}")
 
         if os.path.exists(self.items_file):
             try:
                 df = pd.read_csv(self.items_file, dtype={'EAN': str})
-                self.order_items = df.to_dict('records')
-                print(f"Loaded {len(self.order_items)} order items from {self.items_file}")
+                items = df.to_dict('records')
+                self.items_by_order = {}
+                for item in items:
+                    self.items_by_order.setdefault(item['Order ID'], []).append(item)
+                self.item_summaries = {oid: self._summarize(its) for oid, its in self.items_by_order.items()}
+                print(f"Loaded {len(items)} order items from {self.items_file}")
             except Exception as e:
                 print(f"Error loading order items: {e}")
 
-    def save_data(self):
-        """Saves orders and items to CSV."""
-        os.makedirs(os.path.dirname(self.orders_file), exist_ok=True)
-        
-        df_orders = pd.DataFrame(self.orders)
-        if df_orders.empty:
-            df_orders = pd.DataFrame(columns=["Order ID", "Customer ID", "Customer Name", "Date", "Due Date", "Total", "Status"])
-        df_orders.to_csv(self.orders_file, index=False)
+        self.search_index = None
 
-        df_items = pd.DataFrame(self.order_items)
-        if df_items.empty:
-            df_items = pd.DataFrame(columns=["Order ID", "EAN", "Name", "Exp Date", "Qty", "Price"])
-        df_items.to_csv(self.items_file, index=False)
+    def _save_snapshot(self):
+        save_snapshot([self.orders_file, self.items_file], "orders",
+                      (self.orders_by_id, self.items_by_order, self.item_summaries, self.index))
 
-    def _generate_order_id(self):
-        if not self.orders:
-            return "ORD-001"
-        try:
-            ids = []
-            for order in self.orders:
-                oid = order['Order ID']
-                if oid.startswith('ORD-'):
-                    num_part = oid.split('-')[1]
-                    if num_part.isdigit():
-                        ids.append(int(num_part))
-            if not ids: return "ORD-001"
-            next_num = max(ids) + 1
-            return f"ORD-{next_num:03d}"
-        except:
-            return f"ORD-{len(self.orders) + 1:03d}"
+    @property
+    def orders(self):
+        """The open orders as a list, oldest first."""
+        return list(self.orders_by_id.values())
 
-    def create_order(self, customer_id, customer_name, items, due_date=""):
-        """
-        Creates a new order.
-        items: List of dicts [{'EAN', 'Name', 'Exp Date', 'Qty', 'Price'}]
-        """
-        if not items:
-            return None, "Error: No items in order."
+    @property
+    def order_items(self):
+        """All items of the open orders as one list, grouped by order."""
+        return [item for items in self.items_by_order.values() for item in items]
 
-        order_id = self._generate_order_id()
-        date_str = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
-        
+    def _summarize(self, items):
+        return summarize_items(items)
+
+    def _item_rows(self, order_id, items):
+        """Order item rows for a list of basket items, and the order total."""
+        rows = []
         total = 0.0
         for item in items:
             item_total = float(item['Price']) * float(item['Qty'])
             total += item_total
-            self.order_items.append({
+            rows.append({
                 "Order ID": order_id,
                 "EAN": str(item['EAN']),
                 "Name": item['Name'],
@@ -83,97 +134,315 @@ class OrderManager:
                 "Qty": float(item['Qty']),
                 "Price": float(item['Price'])
             })
+        return rows, total
+
+    def _set_items(self, order_id, items):
+        """Replaces the items of an open order and returns the order total."""
+        rows, total = self._item_rows(order_id, items)
+        self.items_by_order[order_id] = rows
+        self.item_summaries[order_id] = self._summarize(rows)
+        return total
+
+    def _search_index(self):
+        if self.search_index is None:
+            self.search_index = SearchIndex()
+            for order_id, order in self.orders_by_id.items():
+                self.search_index.add(order_id, order_search_fields(order, self.items_by_order.get(order_id, [])))
+        return self.search_index
 
+    def _index_text(self, order_id):
+        """(Re-)indexes an order for search_orders, once the search index exists."""
+        if self.search_index is not None:
+            order = self.orders_by_id[order_id]
+            self.search_index.add(order_id, order_search_fields(order, self.items_by_order.get(order_id, [])))
+
+    def _put(self, order, items):
+        """Adds an order (and its item rows) to the open orders."""
+        order_id = order['Order ID']
+        self.orders_by_id[order_id] = order
+        self.items_by_order[order_id] = items
+        self.item_summaries[order_id] = self._summarize(items)
+        self.index.add(order)
+        self._index_text(order_id)
+
+    def _take(self, order_id):
+        """Removes an open order from memory and returns (order, items)."""
+        order = self.orders_by_id.pop(order_id)
+        self.index.remove(order_id)
+        if self.search_index is not None:
+            self.search_index.remove(order_id)
+        self.item_summaries.pop(order_id, None)
+        return order, self.items_by_order.pop(order_id, [])
+
+    def save_data(self):
+        """
+        Saves the open orders and their items to CSV, and the archive changes. Runs
+        in the writer thread.
+        The open orders file is written first and still lists the orders archived
+        since the last save, so an order moving either way is in at least one of
+        the files if the archive write fails (load_data sorts it out).
+        """
+        in_transit = self.archive.unsaved_orders()
+        self._write_open(in_transit)
+        self.archive.save()
+        if in_transit:
+            self._write_open()
+        self._save_snapshot()
+
+    def _write_open(self, extra=()):
+        """Writes the open orders and their items, plus extra [(order, items), ...]."""
+        # Copied first, so edits made meanwhile can't change the rows under pandas
+        orders = [dict(o) for o in list(self.orders_by_id.values())] + [order for order, _ in extra]
+        items = [dict(item) for rows in list(self.items_by_order.values()) for item in rows]
+        items += [item for _, rows in extra for item in rows]
+
+        df_orders = pd.DataFrame(orders)
+        if df_orders.empty:
+            df_orders = pd.DataFrame(columns=ORDER_COLUMNS)
+        write_csv(df_orders, self.orders_file)
+
+        df_items = pd.DataFrame(items)
+        if df_items.empty:
+            df_items = pd.DataFrame(columns=ITEM_COLUMNS)
+        write_csv(df_items, self.items_file)
+
+    def _generate_order_id(self):
+        return self.ids.next_id()
+
+    def _add_order(self, order_id, customer_id, customer_name, items, due_date):
+        """Adds a new open order with its items (without saving) and returns its total."""
+        total = self._set_items(order_id, items)
         new_order = {
             "Order ID": order_id,
             "Customer ID": customer_id,
             "Customer Name": customer_name,
-            "Date": date_str,
+            "Date": datetime.now().strftime(TIMESTAMP_FORMAT),
             "Due Date": due_date,
             "Total": round(total, 2),
             "Status": "Received"
         }
-        self.orders.append(new_order)
-        self.save_data()
+        self.orders_by_id[order_id] = new_order
+        self.index.add(new_order)
+        self._index_text(order_id)
+        return total
+
+    def create_order(self, customer_id, customer_name, items, due_date=""):
+        """
+        Creates a new order.
+        items: List of dicts [{'EAN', 'Name', 'Exp Date', 'Qty', 'Price'}]
+        """
+        if not items:
+            return None, "Error: No items in order."
+
+        order_id = self._generate_order_id()
+        total = self._add_order(order_id, customer_id, customer_name, items, due_date)
+        self.version += 1
+        self.writer.mark_dirty()
+        self.bus.emit("order", order_id, None, dict(self.orders_by_id[order_id]))
         return order_id, f"Order {order_id} created for {customer_name}. Total: {total:.2f}"
 
+    def create_orders(self, new_orders):
+        """
+        Creates several orders at once (e.g. a standing-order list), with one ID
+        allocation and one save.
+        new_orders: List of dicts {'customer_id', 'customer_name', 'items', 'due_date'}
+        Returns (order_ids, msg); orders without items are skipped.
+        """
+        new_orders = [o for o in new_orders if o.get('items')]
+        if not new_orders:
+            return [], "Error: No items in order."
+
+        order_ids = self.ids.allocate(len(new_orders))
+        for order_id, o in zip(order_ids, new_orders):
+            self._add_order(order_id, o['customer_id'], o['customer_name'], o['items'], o.get('due_date', ""))
+        self.version += 1
+        self.writer.mark_dirty()
+        self.bus.publish([ChangeEvent("order", oid, None, dict(self.orders_by_id[oid])) for oid in order_ids])
+        return order_ids, f"Created {len(order_ids)} orders ({order_ids[0]} to {order_ids[-1]})."
+
     def update_order_status(self, order_id, new_status):
-        for o in self.orders:
-            if o['Order ID'] == order_id:
-                o['Status'] = new_status
-                self.save_data()
-                return True
-        return False
+        o = self.orders_by_id.get(order_id)
+        if o is not None:
+            old = dict(o)
+            o['Status'] = new_status
+            self.version += 1
+            if new_status == "Finished":
+                # Finished orders move to this month's archive partition
+                o['Finished Date'] = datetime.now().strftime(TIMESTAMP_FORMAT)
+                self.archive.add([self._take(order_id)])
+            else:
+                self.index.add(o)
+            self.writer.mark_dirty()
+            self.bus.emit("order", order_id, old, dict(o))
+            return True
+
+        part = self.archive.find(order_id)
+        if part is None:
+            return False
+        if new_status == "Finished":
+            return True
+        # Reopened: back to the open orders
+        order, items = self.archive.remove(order_id)
+        old = dict(order)
+        order['Status'] = new_status
+        order.pop('Finished Date', None)
+        self._put(order, items)
+        self.version += 1
+        self.writer.mark_dirty()
+        self.bus.emit("order", order_id, old, dict(order))
+        return True
+
+    def get_order(self, order_id):
+        order = self.orders_by_id.get(order_id)
+        if order is None:
+            part = self.archive.find(order_id)
+            if part is not None:
+                order = part.orders_by_id[order_id]
+        return order
 
     def get_orders_df(self):
-        if not self.orders:
+        """Open orders as a DataFrame; finished orders are read page by page with query_orders."""
+        if not self.orders_by_id:
             return pd.DataFrame(columns=["Order ID", "Customer Name", "Date", "Due Date", "Total", "Status", "Items", "ACTIONS"])
-        
-        df = pd.DataFrame(self.orders)
-        # Ensure Status column exists for older data
-        if 'Status' not in df.columns:
-            df['Status'] = "Received"
-            for o in self.orders:
-                if 'Status' not in o:
-                    o['Status'] = "Received"
-
-        # Add Items summary
-        item_summaries = []
-        for order_id in df['Order ID']:
-            items = [f"{it['Qty']}x {it['Name']}" for it in self.order_items if it['Order ID'] == order_id]
-            item_summaries.append(", ".join(items))
-        df['Items'] = item_summaries
+
+        df = pd.DataFrame(list(self.orders_by_id.values()))
+
+        # Add Items summary (cached per order)
+        df['Items'] = [self.item_summaries.get(order_id, "") for order_id in df['Order ID']]
 
         df['ACTIONS'] = ""
         # Sort by ID descending (newest first)
         return df.sort_values(by="Order ID", ascending=False)
 
+    def _row(self, order_id):
+        """Display row of an order, as in get_orders_df."""
+        row = dict(self.orders_by_id[order_id])
+        row['Items'] = self.item_summaries.get(order_id, "")
+        row['ACTIONS'] = ""
+        return row
+
+    def query_orders(self, status=None, exclude_status=None, customer_id=None, search=None,
+                     sort_by="Order ID", descending=True, offset=0, limit=None):
+        """
+        One page of orders as display rows.
+        status / exclude_status: a status or list of statuses to include / leave out
+        customer_id: only this customer's orders
+        search: text to find in the order ID, customer or item names/EANs (see search_orders)
+        Returns (rows, total) where total counts every matching order.
+        Open and archived (finished) orders are merged into one sort order.
+        """
+        statuses = self.index.statuses(status, exclude_status)
+        search = (search or "").lower().strip()
+        end = offset + limit if limit else None
+        key = self._sort_key(sort_by)
+
+        if customer_id is None and not search and sort_by in INDEXED_SORT_KEYS:
+            # Walk the presorted partitions and stop at the end of the page
+            total = self.index.count(statuses)
+            open_ids = self.index.iter_sorted(statuses, sort_by, descending)
+        else:
+            if customer_id is not None:
+                candidates = self.index.for_customer(customer_id, statuses)
+            else:
+                candidates = self.index.iter_ids(statuses)
+            if search:
+                hits = {oid for oid, _ in self._search_index().search(search)}
+                candidates = [oid for oid in candidates if oid in hits]
+            else:
+                candidates = list(candidates)
+            candidates.sort(key=key, reverse=descending)
+            total = len(candidates)
+            open_ids = candidates
+
+        # Finished orders are all in the archive
+        wanted = [status] if isinstance(status, str) else status
+        excluded = [exclude_status] if isinstance(exclude_status, str) else (exclude_status or [])
+        if (wanted is None or "Finished" in wanted) and "Finished" not in excluded:
+            archived, archive_total = self.archive.iter_sorted(customer_id, search, sort_by, descending)
+            total += archive_total
+            # Both streams are sorted by the same key, so the page is cut from their merge
+            open_entries = ((key(oid), None, oid) for oid in open_ids)
+            merged = heapq.merge(open_entries, archived, key=lambda entry: entry[0], reverse=descending)
+            rows = [part.row(oid) if part is not None else self._row(oid)
+                    for _, part, oid in islice(merged, offset, end)]
+        else:
+            rows = [self._row(oid) for oid in islice(open_ids, offset, end)]
+        return rows, total
+
+    def _sort_key(self, sort_by):
+        """Sort key of open order IDs; matches ArchiveMonth.sort_key and the OrderIndex order."""
+        if sort_by == "Items":
+            return lambda oid: (sort_value(self.item_summaries.get(oid, "")), oid)
+        return lambda oid: (sort_value(self.orders_by_id[oid].get(sort_by)), oid)
+
+    def search_orders(self, query, limit=50):
+        """
+        Orders matching every word of the query (in the order ID, customer name/ID
+        or item names/EANs), best matches first, as display rows.
+        Open orders are ranked first, then archived months are searched newest first.
+        """
+        rows = [self._row(oid) for oid, _ in self._search_index().search(query, limit)]
+        if not limit or len(rows) < limit:
+            rows += self.archive.search(query, limit - len(rows) if limit else None)
+        return rows
+
     def get_order_items(self, order_id):
-        return [item for item in self.order_items if item['Order ID'] == order_id]
+        # Copies, so edits in the UI can't change the index (and its summary) behind our back
+        items = self.items_by_order.get(order_id)
+        if items is None:
+            part = self.archive.find(order_id)
+            items = part.items_by_order.get(order_id, []) if part is not None else []
+        return [dict(item) for item in items]
 
     def delete_order(self, order_id):
-        self.orders = [o for o in self.orders if o['Order ID'] != order_id]
-        self.order_items = [i for i in self.order_items if i['Order ID'] != order_id]
-        self.save_data()
+        self.version += 1
+        if order_id in self.orders_by_id:
+            old, _ = self._take(order_id)
+            self.writer.mark_dirty()
+        else:
+            removed = self.archive.remove(order_id)
+            old = removed[0] if removed else None
+            self.writer.mark_dirty()
+        if old is not None:
+            self.bus.emit("order", order_id, old, None)
         return f"Deleted Order: {order_id}"
 
     def update_order(self, order_id, items, due_date=None):
         """
         Updates an existing order with a new set of items and optionally a new due date.
         """
-        # Find the order
-        order_index = -1
-        for i, o in enumerate(self.orders):
-            if o['Order ID'] == order_id:
-                order_index = i
-                break
-        
-        if order_index == -1:
-            return False, f"Error: Order {order_id} not found."
+        order = self.orders_by_id.get(order_id)
+        if order is None:
+            part = self.archive.find(order_id)
+            if part is None:
+                return False, f"Error: Order {order_id} not found."
+            # Finished order: rewrite it in its archive partition
+            order = part.orders_by_id[order_id]
+            old = dict(order)
+            if due_date is not None:
+                order['Due Date'] = due_date
+            rows, total = self._item_rows(order_id, items)
+            order['Total'] = round(total, 2)
+            self.archive.replace(order, rows)
+            self.version += 1
+            self.writer.mark_dirty()
+            self.bus.emit("order", order_id, old, dict(order))
+            return True, f"Order {order_id} updated successfully."
 
+        old = dict(order)
         # Update due date if provided
         if due_date is not None:
-            self.orders[order_index]['Due Date'] = due_date
+            order['Due Date'] = due_date
 
-        # Remove old items
-        self.order_items = [item for item in self.order_items if item['Order ID'] != order_id]
-
-        # Add new items and calculate total
-        total = 0.0
-        for item in items:
-            item_total = float(item['Price']) * float(item['Qty'])
-            total += item_total
-            self.order_items.append({
-                "Order ID": order_id,
-                "EAN": str(item['EAN']),
-                "Name": item['Name'],
-                "Exp Date": item.get('Exp Date', 'N/A'),
-                "Qty": float(item['Qty']),
-                "Price": float(item['Price'])
-            })
+        # Replace the items and recalculate the total
+        total = self._set_items(order_id, items)
 
         # Update order header
-        self.orders[order_index]['Total'] = round(total, 2)
-        
-        self.save_data()
+        order['Total'] = round(total, 2)
+        self.index.add(order)
+        self._index_text(order_id)
+
+        self.version += 1
+        self.writer.mark_dirty()
+        self.bus.emit("order", order_id, old, dict(order))
         return True, f"Order {order_id} updated successfully."
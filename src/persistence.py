@@ -0,0 +1,76 @@
+import atexit
+import os
+import threading
+
+# Seconds an edit waits for more edits before the manager is written
+SAVE_DELAY = 1.0
+
+# Every DebouncedWriter, so flush_all() can write them all on shutdown
+_writers = []
+
+
+def write_csv(df, path, **kwargs):
+    """Writes a DataFrame to CSV via a temp file + rename, so a crash never leaves half a file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    df.to_csv(tmp_path, index=False, **kwargs)
+    os.replace(tmp_path, path)
+
+
+class DebouncedWriter:
+    """
+    Coalesces a manager's saves. mark_dirty() schedules the save function on a
+    background thread SAVE_DELAY seconds later, so a burst of edits is written
+    once and the NiceGUI event loop never waits for pandas or the disk.
+
+    Only one save runs at a time; hold `lock` to keep a save from starting
+    (e.g. around a synchronous full write). A failed save is retried after
+    the next delay.
+    """
+
+    def __init__(self, save, name, delay=SAVE_DELAY):
+        self.save = save
+        self.name = name
+        self.delay = delay
+        # Held while saving
+        self.lock = threading.RLock()
+        # Guards dirty/timer
+        self._state_lock = threading.Lock()
+        self.dirty = False
+        self.timer = None
+        _writers.append(self)
+
+    def mark_dirty(self):
+        with self._state_lock:
+            self.dirty = True
+            if self.timer is None:
+                self.timer = threading.Timer(self.delay, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self, retry=True):
+        """Saves now if anything is pending (called by the timer, or directly to force a write)."""
+        with self.lock:
+            with self._state_lock:
+                if self.timer is not None:
+                    self.timer.cancel()
+                    self.timer = None
+                dirty, self.dirty = self.dirty, False
+            if not dirty:
+                return
+            try:
+                self.save()
+            except Exception as e:
+                print(f"Error saving {self.name}: {e}")
+                if retry:
+                    self.mark_dirty()
+
+
+def flush_all():
+    """Writes every pending change; run on shutdown."""
+    for writer in list(_writers):
+        writer.flush(retry=False)
+
+
+# Daemon timer threads die with the process, so pending writes are flushed at exit
+atexit.register(flush_all)
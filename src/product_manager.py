@@ -1,53 +1,92 @@
 import pandas as pd
 import os
+from src.product_search import ProductSearchIndex, product_label
+from src.snapshot import load_snapshot, save_snapshot, snapshot_path
+from src.persistence import DebouncedWriter, write_csv
+from src.events import EventBus
+
+
+PRODUCT_COLUMNS = ["EAN", "Name", "Shelf Life", "URL", "Price In", "Price Out", "Warn Days"]
 
 
 class ProductManager:
-    def __init__(self):
+    def __init__(self, file_path="data/inventory/products.csv", bus=None):
         # Path to the CSV file
-        self.file_path = "data/inventory/products.csv"
+        self.file_path = file_path
         # Database: {'12345': {'name': 'Milk', 'shelf_life': 7}}
         self.products = {}
+        # Increases every time the products change, so the UI knows what to redraw
+        self.version = 0
+        # Every change is published here as a ChangeEvent (see src/events.py)
+        self.bus = bus if bus is not None else EventBus()
+        # EAN/name search for the product selects, built on the first search (see search_products)
+        self.search_index = None
+        # Edits are saved in the background, a burst of them at once (see DebouncedWriter)
+        self.writer = DebouncedWriter(self.save_data, "products")
         self.load_data()
 
     def load_data(self):
-        """Loads products from CSV on startup."""
+        """Loads products on startup, from the binary snapshot if it matches the CSV."""
         if os.path.exists(self.file_path):
+            snapshot = load_snapshot([self.file_path], "products")
+            if snapshot is not None:
+                self.products.update(snapshot)
+                self.search_index = None
+                print(f"Loaded {len(self.products)} products from {snapshot_path(self.file_path)}")
+                return
             try:
-                # dtype={'EAN': str} ensures EANs like "00123" don't lose leading zeros
-                df = pd.read_csv(self.file_path, dtype={'EAN': str})
-                for _, row in df.iterrows():
-                    self.products[str(row['EAN'])] = {
-                        'name': row['Name'],
-                        'shelf_life': int(row['Shelf Life']),
-                        'url': str(row.get('URL', '')),
-                        'price_in': float(row.get('Price In', 0.0)),
-                        'price_out': float(row.get('Price Out', 0.0))
+                # dtype str keeps EANs like "00123" from losing their leading zeros
+                df = pd.read_csv(self.file_path, dtype={'EAN': str, 'Name': str, 'URL': str})
+                # Older files lack the optional columns; empty cells become '' / 0 / None
+                df = df.reindex(columns=PRODUCT_COLUMNS).dropna(subset=['EAN'])
+                warn_days = pd.to_numeric(df['Warn Days'], errors='coerce').astype('Int64')
+                self.products.update(zip(df['EAN'].tolist(), [
+                    {
+                        'name': name,
+                        'shelf_life': shelf_life,
+                        'url': url,
+                        'price_in': price_in,
+                        'price_out': price_out,
+                        # Optional expiry warning window in days (see AlertSystem)
+                        'warn_days': warn
                     }
+                    for name, shelf_life, url, price_in, price_out, warn in zip(
+                        df['Name'].fillna('').tolist(),
+                        pd.to_numeric(df['Shelf Life'], errors='coerce').fillna(0).astype(int).tolist(),
+                        df['URL'].fillna('').tolist(),
+                        pd.to_numeric(df['Price In'], errors='coerce').fillna(0.0).astype(float).tolist(),
+                        pd.to_numeric(df['Price Out'], errors='coerce').fillna(0.0).astype(float).tolist(),
+                        warn_days.astype(object).where(warn_days.notna(), None).tolist())
+                ]))
+                self.search_index = None
                 print(f"Loaded {len(self.products)} products from {self.file_path}")
+                save_snapshot([self.file_path], "products", self.products)
             except Exception as e:
                 print(f"Error loading products: {e}")
 
     def save_data(self):
-        """Saves current products to CSV."""
+        """Saves current products to CSV (and the binary snapshot). Runs in the writer thread."""
+        # Copied in one step, so edits made meanwhile can't change it under us
+        products = dict(self.products)
         data = []
-        for ean, details in self.products.items():
+        for ean, details in products.items():
             data.append({
                 "EAN": ean,
                 "Name": details['name'],
                 "Shelf Life": details['shelf_life'],
                 "URL": details.get('url', ''),
                 "Price In": details.get('price_in', 0.0),
-                "Price Out": details.get('price_out', 0.0)
+                "Price Out": details.get('price_out', 0.0),
+                "Warn Days": details.get('warn_days')
             })
 
-        df = pd.DataFrame(data, columns=["EAN", "Name", "Shelf Life", "URL", "Price In", "Price Out"])
+        df = pd.DataFrame(data, columns=PRODUCT_COLUMNS)
+        df["Warn Days"] = df["Warn Days"].astype("Int64")
         df = df.sort_values(by="EAN", key=lambda x: pd.to_numeric(x, errors='coerce'))
-        # Create directory if it doesn't exist just in case
-        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
-        df.to_csv(self.file_path, index=False)
+        write_csv(df, self.file_path)
+        save_snapshot([self.file_path], "products", products)
 
-    def add_product(self, ean, name, shelf_life, url="", price_in=0.0, price_out=0.0):
+    def add_product(self, ean, name, shelf_life, url="", price_in=0.0, price_out=0.0, warn_days=None):
         ean = str(ean).strip()
         if not ean or not name:
             return "Error: EAN and Name are required.", self.get_products_df()
@@ -60,35 +99,76 @@ class ProductManager:
             'shelf_life': int(shelf_life),
             'url': url.strip(),
             'price_in': float(price_in),
-            'price_out': float(price_out)
+            'price_out': float(price_out),
+            'warn_days': int(warn_days) if warn_days is not None else None
         }
+        self._index(ean)
 
-        self.save_data()  # <--- Auto Save
+        self.version += 1
+        self.writer.mark_dirty()  # <--- Auto Save
+        self.bus.emit("product", ean, None, self.products[ean])
         return f"Saved: {name} (EAN: {ean})", self.get_products_df()
 
-    def update_product(self, ean, name, shelf_life, url="", price_in=0.0, price_out=0.0):
+    def update_product(self, ean, name, shelf_life, url="", price_in=0.0, price_out=0.0, warn_days=None):
         ean = str(ean).strip()
         if ean in self.products:
+            # Keep the warning window unless a new one is given
+            if warn_days is None:
+                warn_days = self.products[ean].get('warn_days')
+            old = self.products[ean]
             self.products[ean] = {
                 'name': name,
                 'shelf_life': int(shelf_life),
                 'url': url.strip(),
                 'price_in': float(price_in),
-                'price_out': float(price_out)
+                'price_out': float(price_out),
+                'warn_days': int(warn_days) if warn_days is not None else None
             }
-            self.save_data()
+            self._index(ean)
+            self.version += 1
+            self.writer.mark_dirty()
+            self.bus.emit("product", ean, old, self.products[ean])
             return f"Updated: {name} (EAN: {ean})", self.get_products_df()
         return f"Error: EAN '{ean}' not found.", self.get_products_df()
 
     def delete_product(self, ean):
         ean = str(ean).strip()
         if ean in self.products:
-            name = self.products[ean]['name']
-            del self.products[ean]
-            self.save_data()  # <--- Auto Save
+            old = self.products.pop(ean)
+            name = old['name']
+            if self.search_index is not None:
+                self.search_index.remove(ean)
+            self.version += 1
+            self.writer.mark_dirty()  # <--- Auto Save
+            self.bus.emit("product", ean, old, None)
             return f"Deleted: {name} (EAN: {ean})", self.get_products_df()
         return f"Error: EAN '{ean}' not found.", self.get_products_df()
 
+    def _index(self, ean):
+        if self.search_index is not None:
+            self.search_index.add(ean, self.products[ean]['name'])
+
+    def search_products(self, query, limit=50, allowed=None):
+        """
+        {ean: "Name (EAN)"} of up to limit products whose label contains the query,
+        best matches first. allowed: optional set of EANs to pick from; those
+        without a product entry follow as "Unknown (EAN)".
+        """
+        if self.search_index is None:
+            self.search_index = ProductSearchIndex()
+            self.search_index.load(self.products)
+        options = {ean: product_label(ean, self.products[ean]['name']) for ean in self.search_index.search(query, limit, allowed)}
+        if allowed is not None:
+            # Stocked EANs missing from the product master aren't in the index
+            needle = (query or "").strip().lower()
+            for ean in sorted(str(e) for e in allowed if str(e) not in self.products):
+                if limit and len(options) >= limit:
+                    break
+                label = product_label(ean, "Unknown")
+                if needle in label.lower():
+                    options[ean] = label
+        return options
+
     def get_product_details(self, ean):
         return self.products.get(str(ean).strip())
 
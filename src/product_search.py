@@ -0,0 +1,123 @@
+import re
+from bisect import bisect_left, insort
+
+WORD_RE = re.compile(r"\S+")
+
+
+def product_label(ean, name):
+    """Option label of a product in the selects: "Milk (7038010000737)"."""
+    return f"{name} ({ean})"
+
+
+def word_suffixes(text):
+    """The text from the start of each of its words: "dark rye bread" -> ["dark rye bread", "rye bread", "bread"]."""
+    text = text.lower()
+    return [text[m.start():] for m in WORD_RE.finditer(text)]
+
+
+class ProductSearchIndex:
+    """
+    Finds products whose option label ("Name (EAN)") contains a query, best first:
+    exact EAN, EAN prefix, a name word starting with the query, then any other
+    substring. This matches the select's own filter, which hides options whose
+    label doesn't contain the typed text.
+
+    EANs and name word-suffixes are kept in sorted lists, so the prefix stages are
+    a bisect plus the hits. Plain substrings are found with str.find over all
+    labels joined into one lower-cased string, which is rebuilt on the next search
+    after products change.
+    """
+
+    def __init__(self):
+        # {ean: name}
+        self.names = {}
+        # Sorted EANs
+        self.eans = []
+        # Sorted "word suffix of the name\0ean" strings (strings sort much faster than tuples)
+        self.words = []
+        # "label\nlabel\n..." (lower-cased) and the start offset / EAN of each label
+        self.haystack = None
+        self.offsets = []
+        self.order = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def load(self, products):
+        """Rebuilds the index from {ean: {'name': ...}}."""
+        self.names = {ean: str(details['name']) for ean, details in products.items()}
+        self.eans = sorted(self.names)
+        self.words = sorted(f"{suffix}\0{ean}" for ean, name in self.names.items() for suffix in word_suffixes(name))
+        self.haystack = None
+
+    def add(self, ean, name):
+        if ean in self.names:
+            self.remove(ean)
+        name = str(name)
+        self.names[ean] = name
+        insort(self.eans, ean)
+        for suffix in word_suffixes(name):
+            insort(self.words, f"{suffix}\0{ean}")
+        self.haystack = None
+
+    def remove(self, ean):
+        name = self.names.pop(ean, None)
+        if name is None:
+            return
+        self.eans.pop(bisect_left(self.eans, ean))
+        for suffix in word_suffixes(name):
+            self.words.pop(bisect_left(self.words, f"{suffix}\0{ean}"))
+        self.haystack = None
+
+    def _build_haystack(self):
+        self.order = list(self.names)
+        labels = [product_label(ean, self.names[ean]).lower() for ean in self.order]
+        self.offsets = []
+        position = 0
+        for label in labels:
+            self.offsets.append(position)
+            position += len(label) + 1
+        self.haystack = "\n".join(labels)
+
+    def _prefixed(self, entries, prefix):
+        """Entries of a sorted list of strings that start with prefix."""
+        i = bisect_left(entries, prefix)
+        while i < len(entries) and entries[i].startswith(prefix):
+            yield entries[i]
+            i += 1
+
+    def _substrings(self, needle):
+        if self.haystack is None:
+            self._build_haystack()
+        position = self.haystack.find(needle)
+        while position != -1:
+            # Label containing the match, then continue after that label
+            i = bisect_left(self.offsets, position + 1) - 1
+            yield self.order[i]
+            end = self.offsets[i + 1] if i + 1 < len(self.offsets) else len(self.haystack)
+            position = self.haystack.find(needle, end)
+
+    def search(self, query, limit=50, allowed=None):
+        """
+        EANs of the products whose label contains the query, best first.
+        allowed: optional set of EANs to pick from (e.g. the ones in stock).
+        An empty query returns the first products by EAN.
+        """
+        needle = (query or "").strip().lower()
+        if not needle:
+            stages = [self.eans]
+        else:
+            stages = [
+                [needle] if needle in self.names else [],
+                self._prefixed(self.eans, needle),
+                (entry.rpartition("\0")[2] for entry in self._prefixed(self.words, needle)),
+                self._substrings(needle),
+            ]
+        found = {}
+        for stage in stages:
+            for ean in stage:
+                if ean not in found and (allowed is None or ean in allowed):
+                    found[ean] = None
+                    if limit and len(found) >= limit:
+                        return list(found)
+        return list(found)
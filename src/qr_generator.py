@@ -1,9 +1,12 @@
-import qrcode
 import os
 from datetime import datetime, timedelta
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import cm
+from src.startup import LazyModule
+
+# Imported when the first label or PDF is made
+qrcode = LazyModule('qrcode')
+canvas = LazyModule('reportlab.pdfgen.canvas')
+pagesizes = LazyModule('reportlab.lib.pagesizes')
+units = LazyModule('reportlab.lib.units')
 
 class QRGenerator:
     def __init__(self):
@@ -42,7 +45,6 @@ class QRGenerator:
         name = product_details['name']
         shelf_life = product_details['shelf_life']
         url = str(product_details.get('url', '')).strip()
-        if url == 'nan': url = '' # Handle pandas NaN
 
         # Determine Expiration Date
         if manual_exp_date:
@@ -93,6 +95,7 @@ class QRGenerator:
         pdf_filename = f"Print_{ean}_{clean_name}_{exp_date_str}.pdf"
         pdf_path = os.path.join(self.pdf_dir, pdf_filename)
         
+        A4, cm = pagesizes.A4, units.cm
         c = canvas.Canvas(pdf_path, pagesize=A4)
         width, height = A4
         
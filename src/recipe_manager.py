@@ -1,45 +1,75 @@
 import pandas as pd
 import os
+from src.snapshot import load_snapshot, save_snapshot, snapshot_path
+from src.persistence import DebouncedWriter, write_csv
+from src.events import EventBus, ChangeEvent
 
 class RecipeManager:
-    def __init__(self, file_path="data/inventory/recipes.csv"):
+    def __init__(self, file_path="data/inventory/recipes.csv", bus=None):
         self.file_path = file_path
+        # Increases every time the recipes change, so the UI knows what to redraw
+        self.version = 0
+        # Every change is published here as a ChangeEvent keyed (product_ean, ingredient_ean) (see src/events.py)
+        self.bus = bus if bus is not None else EventBus()
         self.recipes = [] # List of {'product_ean', 'ingredient_ean', 'qty'}
+        # Edits are saved in the background, a burst of them at once (see DebouncedWriter)
+        self.writer = DebouncedWriter(self.save_data, "recipes")
         self.load_data()
 
     def load_data(self):
         if os.path.exists(self.file_path):
+            snapshot = load_snapshot([self.file_path], "recipes")
+            if snapshot is not None:
+                self.recipes = snapshot
+                print(f"Loaded {len(self.recipes)} recipe ingredients from {snapshot_path(self.file_path)}")
+                return
             try:
                 df = pd.read_csv(self.file_path, dtype={'product_ean': str, 'ingredient_ean': str})
                 self.recipes = df.to_dict('records')
                 print(f"Loaded {len(self.recipes)} recipe ingredients from {self.file_path}")
+                save_snapshot([self.file_path], "recipes", self.recipes)
             except Exception as e:
                 print(f"Error loading recipes: {e}")
 
     def save_data(self):
-        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
-        df = pd.DataFrame(self.recipes)
+        # Copied in one step, so edits made meanwhile can't change it under us (runs in the writer thread)
+        recipes = list(self.recipes)
+        df = pd.DataFrame(recipes)
         if df.empty:
             df = pd.DataFrame(columns=['product_ean', 'ingredient_ean', 'qty'])
-        df.to_csv(self.file_path, index=False)
+        write_csv(df, self.file_path)
+        save_snapshot([self.file_path], "recipes", recipes)
 
     def add_ingredient_to_recipe(self, product_ean, ingredient_ean, qty):
         # Remove existing if any (to update)
+        old = next((r for r in self.recipes if r['product_ean'] == product_ean and r['ingredient_ean'] == ingredient_ean), None)
         self.recipes = [r for r in self.recipes if not (r['product_ean'] == product_ean and r['ingredient_ean'] == ingredient_ean)]
-        self.recipes.append({
+        new = {
             'product_ean': str(product_ean),
             'ingredient_ean': str(ingredient_ean),
             'qty': float(qty)
-        })
-        self.save_data()
+        }
+        self.recipes.append(new)
+        self.version += 1
+        self.writer.mark_dirty()
+        self.bus.emit("recipe", (new['product_ean'], new['ingredient_ean']), old, new)
 
     def remove_ingredient_from_recipe(self, product_ean, ingredient_ean):
+        removed = [r for r in self.recipes if r['product_ean'] == product_ean and r['ingredient_ean'] == ingredient_ean]
         self.recipes = [r for r in self.recipes if not (r['product_ean'] == product_ean and r['ingredient_ean'] == ingredient_ean)]
-        self.save_data()
+        self.version += 1
+        self.writer.mark_dirty()
+        self._publish_removed(removed)
+
+    def _publish_removed(self, removed):
+        self.bus.publish([ChangeEvent("recipe", (r['product_ean'], r['ingredient_ean']), r, None) for r in removed])
 
     def get_recipe(self, product_ean):
         return [r for r in self.recipes if r['product_ean'] == str(product_ean)]
 
     def delete_recipe(self, product_ean):
+        removed = [r for r in self.recipes if r['product_ean'] == str(product_ean)]
         self.recipes = [r for r in self.recipes if r['product_ean'] != str(product_ean)]
-        self.save_data()
+        self.version += 1
+        self.writer.mark_dirty()
+        self._publish_removed(removed)
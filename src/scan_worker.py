@@ -0,0 +1,181 @@
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Frames that can be queued for the worker at once, each in its own slot of the ring
+RING_SLOTS = 3
+# Seconds to wait for a result before the worker is assumed stuck and restarted
+SCAN_TIMEOUT = 5.0
+# Seconds between checks that the worker is still alive while waiting for results
+RECEIVE_POLL = 0.5
+
+
+class FrameRing:
+    """
+    A ring of frame slots of one shape (uint8) in a SharedMemory block. frame(seq)
+    is a NumPy view on the slot of frame number seq, so nothing is copied or pickled
+    to hand a frame over; only seq travels between the processes.
+    """
+
+    def __init__(self, shape, slots=RING_SLOTS, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        size = int(np.prod(self.shape)) * slots
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            # The worker shares the parent's resource tracker, so attaching doesn't take ownership
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.frames = np.ndarray((slots, *self.shape), dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def frame(self, seq):
+        return self.frames[seq % self.slots]
+
+    def close(self, unlink=False):
+        # The view must go before the buffer can be released
+        self.frames = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _serve(ring_name, shape, slots, requests, results):
+    """Worker process: scans the frame numbers it is sent until it gets None."""
+    from src.scanner import QRScanner, cv2
+
+    # One scanner for the life of the worker, so "same item" suppression and code tracking carry across frames
+    scanner = QRScanner()
+    ring = FrameRing(shape, slots, name=ring_name)
+    try:
+        while True:
+            seq = requests.get()
+            if seq is None:
+                break
+            try:
+                # Camera frames are BGR; the scanner wants RGB (this also copies the frame out of the ring)
+                rgb_frame = cv2.cvtColor(ring.frame(seq), cv2.COLOR_BGR2RGB)
+                ean, date, msg, _ = scanner.scan_image(rgb_frame)
+            except Exception as e:
+                ean, date, msg = None, None, f"Scan Error: {e}"
+            # The debug image stays here; sending it back would cost as much as sending the frame
+            results.put((seq, (ean, date, msg, None)))
+    finally:
+        ring.close()
+        results.put(None)
+
+
+class ScanWorker:
+    """
+    Scans camera frames in a long-lived process that owns the QRScanner and its
+    state. Frames are copied into a shared-memory FrameRing and the worker is sent
+    only their number; results come back over a queue.
+
+    scan() blocks until its frame is scanned, so call it from a thread
+    (run.io_bound). It is safe to call from several threads (browser tabs); the
+    worker is started on the first scan and restarted if it dies or the frame
+    size changes.
+    """
+
+    def __init__(self, slots=RING_SLOTS, timeout=SCAN_TIMEOUT):
+        self.slots = slots
+        self.timeout = timeout
+        # Guards starting/stopping the worker and handing it frames
+        self.lock = threading.Lock()
+        # One per ring slot that doesn't hold a frame waiting to be scanned
+        self.free_slots = threading.Semaphore(slots)
+        # Results not yet received, by frame number
+        self.pending = {}
+        self.seq = 0
+        self.process = None
+        self.ring = None
+        self.requests = None
+        self.results = None
+        self.receiver = None
+
+    def scan(self, frame):
+        """Scans a BGR camera frame; returns (EAN, Date, Status, None) like QRScanner.scan_image."""
+        if frame is None:
+            return None, None, "No image provided", None
+        if not self.free_slots.acquire(timeout=self.timeout):
+            return None, None, "Scanner busy", None
+        try:
+            with self.lock:
+                frame = np.ascontiguousarray(frame, dtype=np.uint8)
+                if self.process is None or not self.process.is_alive() or self.ring.shape != frame.shape:
+                    self._restart(frame.shape)
+                self.seq += 1
+                seq = self.seq
+                future = self.pending[seq] = Future()
+                # The worker scans frames in order, so with at most `slots` frames waiting
+                # the slot written here has already been scanned
+                self.ring.frame(seq)[...] = frame
+                self.requests.put(seq)
+            try:
+                return future.result(self.timeout)
+            except FutureTimeout:
+                print("Scan worker did not answer, restarting it")
+                with self.lock:
+                    self.pending.pop(seq, None)
+                    self._stop()
+                return None, None, "Scan Error: scanner timed out", None
+        finally:
+            self.free_slots.release()
+
+    def _restart(self, shape):
+        self._stop()
+        # Not fork: the server process has threads (event loop, writers, watcher) whose locks a forked child could inherit held
+        ctx = multiprocessing.get_context('spawn')
+        self.ring = FrameRing(shape, self.slots)
+        self.requests = ctx.Queue()
+        self.results = ctx.Queue()
+        self.process = ctx.Process(target=_serve, name="scan-worker", daemon=True,
+                                   args=(self.ring.name, self.ring.shape, self.slots, self.requests, self.results))
+        self.process.start()
+        self.receiver = threading.Thread(target=self._receive, args=(self.process, self.results, self.pending), daemon=True)
+        self.receiver.start()
+
+    def _receive(self, process, results, pending):
+        """Hands each result to the scan() waiting for it, until the worker stops."""
+        while True:
+            try:
+                item = results.get(timeout=RECEIVE_POLL)
+            except queue.Empty:
+                # A worker that died or was killed never sends its goodbye
+                if not process.is_alive():
+                    return
+                continue
+            if item is None:
+                return
+            seq, result = item
+            future = pending.pop(seq, None)
+            if future is not None:
+                future.set_result(result)
+
+    def _stop(self):
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            self.requests.put(None)
+            self.process.join(1.0)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(1.0)
+        self.receiver.join(RECEIVE_POLL * 2)
+        while self.pending:
+            _, future = self.pending.popitem()
+            future.set_result((None, None, "Scanner restarted", None))
+        self.ring.close(unlink=True)
+        self.process = self.ring = self.requests = self.results = self.receiver = None
+
+    def stop(self):
+        """Ends the worker process; run on shutdown."""
+        with self.lock:
+            self._stop()
@@ -1,18 +1,40 @@
-import cv2
-from pyzbar.pyzbar import decode
-from PIL import Image, ImageOps
 import numpy as np
+from src.startup import LazyModule
+
+# Imported on the first scan, so terminals that never scan don't pay for them
+cv2 = LazyModule('cv2')
+pyzbar = LazyModule('pyzbar.pyzbar')
+Image = LazyModule('PIL.Image')
+ImageOps = LazyModule('PIL.ImageOps')
+
+# Padding around the last code found, as a fraction of its size, and at least this many pixels
+ROI_PADDING = 0.5
+ROI_MIN_PADDING = 40
+# While a code is tracked, every this many frames the whole frame is scanned again to find new codes
+FULL_SCAN_INTERVAL = 15
 
 
 class QRScanner:
     def __init__(self):
-        self.opencv_detector = cv2.QRCodeDetector()
+        # cv2.QRCodeDetector, created on the first frame pyzbar can't read
+        self._opencv_detector = None
         self.last_data = None
         self.blank_count = 0
+        # Where the last code was, as (left, top, right, bottom) padded by _roi_around; None when lost
+        self.roi = None
+        # Frames scanned through the roi since the last full-frame pass
+        self.frames_since_full = 0
+
+    @property
+    def opencv_detector(self):
+        if self._opencv_detector is None:
+            self._opencv_detector = cv2.QRCodeDetector()
+        return self._opencv_detector
 
     def scan_image(self, image_array):
         """
         Scans an image for QR codes and returns (EAN, Date, Status, Debug_Image).
+        After a code is found, the next frames first scan a padded crop around it.
         """
         if image_array is None:
             return None, None, "No image provided", None
@@ -33,57 +55,85 @@ class QRScanner:
             if len(image_array.shape) == 3 and image_array.shape[2] == 4:
                 image_array = cv2.cvtColor(image_array, cv2.COLOR_RGBA2RGB)
 
-            original_img = Image.fromarray(image_array)
-
-            # Step 1: Try pyzbar (raw image)
-            decoded_objects = decode(original_img)
-            debug_view = image_array
-
-            # Step 2: Try pyzbar (contrast enhancement)
-            if not decoded_objects:
-                gray_img = original_img.convert('L')
-                enhanced_img = ImageOps.autocontrast(gray_img)
-                decoded_objects = decode(enhanced_img)
-                if decoded_objects:
-                    debug_view = np.array(enhanced_img)
-
-            # Step 3: Try OpenCV Fallback
-            if not decoded_objects:
-                # OpenCV likes BGR
-                bgr_img = cv2.cvtColor(image_array, cv2.COLOR_RGB2BGR)
-                data, points, _ = self.opencv_detector.detectAndDecode(bgr_img)
-                if data:
-                    # Process OpenCV result with "once" logic
-                    if data == self.last_data:
-                        return None, None, "Same item detected", image_array
-                    self.last_data = data
-                    self.blank_count = 0
-                    return self._process_data(data, image_array)
-
-            if not decoded_objects:
+            # Step 1: Scan around where the last code was, if one is being tracked
+            found = None
+            if self.roi is not None and self.frames_since_full < FULL_SCAN_INTERVAL:
+                self.frames_since_full += 1
+                left, top, right, bottom = self.roi
+                if right > left and bottom > top:
+                    found = self._decode(np.ascontiguousarray(image_array[top:bottom, left:right]))
+                if found:
+                    data, code_type, (x, y, w, h), debug_view = found
+                    found = data, code_type, (x + left, y + top, w, h), debug_view
+
+            # Step 2: Scan the whole frame (nothing tracked, the code moved out of the crop, or the periodic pass)
+            if not found:
+                self.frames_since_full = 0
+                found = self._decode(image_array)
+
+            if not found:
+                self.roi = None
                 self.blank_count += 1
                 if self.blank_count > 5:  # Need 10 blank frames to reset
                     self.last_data = None
-                return None, None, "Scanning... Keep steady", debug_view
+                return None, None, "Scanning... Keep steady", image_array
 
-            # Process pyzbar results with "once" logic
+            # Process the result with "once" logic
+            data, code_type, rect, debug_view = found
+            self.roi = self._roi_around(rect, image_array.shape)
             self.blank_count = 0
-            for obj in decoded_objects:
-                data = obj.data.decode("utf-8")
-                code_type = obj.type  # e.g., 'QRCODE', 'EAN13', 'I25'
-                
-                if data == self.last_data:
-                    return None, None, f"Same {code_type} detected", debug_view
-                
-                self.last_data = data
-                return self._process_data(data, debug_view, code_type)
-
-            return None, None, "No readable code found", debug_view
+            if data == self.last_data:
+                return None, None, f"Same {code_type or 'item'} detected", debug_view
+            self.last_data = data
+            return self._process_data(data, debug_view, code_type or "CODE")
 
         except Exception as e:
             print(f"DEBUG: Scan Error: {str(e)}")
             return None, None, f"Scan Error: {str(e)}", None
 
+    def _decode(self, image_array):
+        """
+        Reads the first code in an RGB image: pyzbar, then pyzbar on a contrast-enhanced
+        copy, then OpenCV. Returns (data, code_type, rect, debug_view) or None; rect is
+        the code's (left, top, width, height) and code_type is None for OpenCV.
+        """
+        original_img = Image.fromarray(image_array)
+
+        # Try pyzbar (raw image)
+        decoded_objects = pyzbar.decode(original_img)
+        debug_view = image_array
+
+        # Try pyzbar (contrast enhancement)
+        if not decoded_objects:
+            gray_img = original_img.convert('L')
+            enhanced_img = ImageOps.autocontrast(gray_img)
+            decoded_objects = pyzbar.decode(enhanced_img)
+            if decoded_objects:
+                debug_view = np.array(enhanced_img)
+
+        if decoded_objects:
+            obj = decoded_objects[0]
+            # obj.type e.g. 'QRCODE', 'EAN13', 'I25'
+            return obj.data.decode("utf-8"), obj.type, tuple(obj.rect), debug_view
+
+        # Try OpenCV Fallback (OpenCV likes BGR)
+        bgr_img = cv2.cvtColor(image_array, cv2.COLOR_RGB2BGR)
+        data, points, _ = self.opencv_detector.detectAndDecode(bgr_img)
+        if data:
+            corners = points.reshape(-1, 2)
+            (x0, y0), (x1, y1) = corners.min(axis=0), corners.max(axis=0)
+            return data, None, (int(x0), int(y0), int(x1 - x0), int(y1 - y0)), image_array
+        return None
+
+    @staticmethod
+    def _roi_around(rect, shape):
+        """A code's (left, top, width, height) padded for movement: (left, top, right, bottom), within the frame."""
+        left, top, width, height = rect
+        pad_x = max(ROI_MIN_PADDING, int(width * ROI_PADDING))
+        pad_y = max(ROI_MIN_PADDING, int(height * ROI_PADDING))
+        return (max(0, left - pad_x), max(0, top - pad_y),
+                min(shape[1], left + width + pad_x), min(shape[0], top + height + pad_y))
+
     def _process_data(self, data, debug_view, code_type="CODE"):
         """Helper to parse the CSV format in the QR code or handle raw barcodes/URLs"""
         data = data.strip()
@@ -0,0 +1,131 @@
+import re
+
+# Runs of letters and digits (any alphabet)
+TOKEN_RE = re.compile(r"[^\W_]+")
+# Longest n-gram kept in the postings; longer terms intersect their trigrams
+GRAM = 3
+
+
+def tokenize(text):
+    """Lower-cased alphanumeric tokens of a text."""
+    if text is None or text != text:  # None or NaN
+        return []
+    return TOKEN_RE.findall(str(text).lower())
+
+
+def grams(token):
+    """Every substring of a token up to GRAM characters."""
+    out = set()
+    for n in range(1, GRAM + 1):
+        for i in range(len(token) - n + 1):
+            out.add(token[i:i + n])
+    return out
+
+
+class SearchIndex:
+    """
+    In-memory substring index over a few weighted text fields per document.
+
+    Every token is broken into its 1- to 3-character substrings, each mapped to
+    the documents containing it. A query term of up to 3 characters is a single
+    lookup; longer terms intersect their trigrams and are then checked against
+    the document's tokens. All terms of a query must match (AND).
+    """
+
+    def __init__(self):
+        # {gram: {doc_id, ...}}
+        self.postings = {}
+        # {doc_id: [(tokens, weight), ...]}
+        self.docs = {}
+
+    def __len__(self):
+        return len(self.docs)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.docs
+
+    def add(self, doc_id, fields):
+        """(Re-)indexes a document. fields: [(text, weight), ...]"""
+        if doc_id in self.docs:
+            self.remove(doc_id)
+        entries = []
+        doc_grams = set()
+        for text, weight in fields:
+            tokens = tokenize(text)
+            if tokens:
+                entries.append((tokens, weight))
+                for token in tokens:
+                    doc_grams |= grams(token)
+        self.docs[doc_id] = entries
+        for gram in doc_grams:
+            self.postings.setdefault(gram, set()).add(doc_id)
+
+    def remove(self, doc_id):
+        entries = self.docs.pop(doc_id, None)
+        if not entries:
+            return
+        doc_grams = set()
+        for tokens, _ in entries:
+            for token in tokens:
+                doc_grams |= grams(token)
+        for gram in doc_grams:
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self.postings[gram]
+
+    def _candidates(self, term):
+        if len(term) <= GRAM:
+            return self.postings.get(term, set())
+        sets = []
+        for i in range(len(term) - GRAM + 1):
+            ids = self.postings.get(term[i:i + GRAM])
+            if not ids:
+                return set()
+            sets.append(ids)
+        sets.sort(key=len)
+        return set.intersection(*sets)
+
+    def _term_score(self, doc_id, term):
+        """Best weight of a field containing the term, boosted for whole-token and prefix hits."""
+        best = 0.0
+        for tokens, weight in self.docs[doc_id]:
+            for token in tokens:
+                if term == token:
+                    score = weight * 3
+                elif token.startswith(term):
+                    score = weight * 2
+                elif term in token:
+                    score = weight
+                else:
+                    continue
+                if score > best:
+                    best = score
+        return best
+
+    def search(self, query, limit=None):
+        """Ranked matches for a query: [(doc_id, score), ...], best first."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        # Rarest term first keeps the candidate set small
+        candidate_sets = sorted((self._candidates(term) for term in terms), key=len)
+        candidates = set(candidate_sets[0])
+        for ids in candidate_sets[1:]:
+            candidates &= ids
+            if not candidates:
+                return []
+        hits = []
+        for doc_id in candidates:
+            score = 0.0
+            for term in terms:
+                term_score = self._term_score(doc_id, term)
+                if term_score == 0:
+                    break
+                score += term_score
+            else:
+                hits.append((doc_id, score))
+        # Best score first, newest (highest) id first among equals
+        hits.sort(key=lambda hit: (hit[1], str(hit[0])), reverse=True)
+        return hits[:limit] if limit else hits
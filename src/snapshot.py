@@ -0,0 +1,58 @@
+import os
+import pickle
+
+# Bump when the layout of any snapshotted data changes; older snapshots are then ignored
+SNAPSHOT_VERSION = 2
+
+
+def file_signature(path):
+    """(mtime_ns, size) of a file, or None if it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def snapshot_path(path):
+    return path + ".snapshot"
+
+
+def load_snapshot(sources, kind):
+    """
+    Data saved with save_snapshot for these source files (e.g. a CSV), or None
+    when there is no snapshot or a source has changed since it was written.
+    The snapshot lives next to the first source file.
+    """
+    path = snapshot_path(sources[0])
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            # The header is a separate pickle, so a stale snapshot is rejected without reading the data
+            header = pickle.load(f)
+            if header != (SNAPSHOT_VERSION, kind, [file_signature(s) for s in sources]):
+                return None
+            return pickle.load(f)
+    except Exception as e:
+        print(f"Ignoring unreadable snapshot {path}: {e}")
+        return None
+
+
+def save_snapshot(sources, kind, data):
+    """
+    Writes a binary (pickle protocol 5) copy of data, tied to the current
+    mtime and size of the source files. Call it right after writing them.
+    """
+    path = snapshot_path(sources[0])
+    tmp_path = path + ".tmp"
+    try:
+        # Pickled in memory first: one C-level pass, so a save in the writer thread
+        # sees the data as it is at this moment
+        payload = pickle.dumps(data, protocol=5)
+        with open(tmp_path, "wb") as f:
+            pickle.dump((SNAPSHOT_VERSION, kind, [file_signature(s) for s in sources]), f, protocol=5)
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Error writing snapshot {path}: {e}")
@@ -0,0 +1,91 @@
+import builtins
+import importlib
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# SHELFLIFE_PROFILE_STARTUP=1 python main.py reports how long every import and init step takes
+PROFILE = os.environ.get("SHELFLIFE_PROFILE_STARTUP", "") not in ("", "0")
+# Steps quicker than this, or nested deeper than this, are left out of the report
+REPORT_MIN_SECONDS = 0.005
+REPORT_MAX_DEPTH = 1
+
+# [(start, depth, label, seconds)] until report_startup() prints them
+_steps = []
+_depth = 0
+_reported = False
+_original_import = builtins.__import__
+
+
+def _record(start, depth, label, seconds):
+    if _reported:
+        # Lazy imports and other late steps are reported as they happen
+        if seconds >= REPORT_MIN_SECONDS and depth == 0:
+            print(f"[startup] {label}: {seconds * 1000:.0f} ms")
+    else:
+        _steps.append((start, depth, label, seconds))
+
+
+def _profiled_import(name, globals=None, locals=None, fromlist=(), level=0):
+    global _depth
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    start = time.perf_counter()
+    _depth += 1
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _depth -= 1
+        _record(start, _depth, f"import {name}", time.perf_counter() - start)
+
+
+def profile_imports():
+    """Starts timing every first import (only in profiling mode). Call before the other imports."""
+    if PROFILE:
+        builtins.__import__ = _profiled_import
+
+
+@contextmanager
+def timed(label):
+    """Times an init step (only in profiling mode)."""
+    if not PROFILE:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(start, _depth, label, time.perf_counter() - start)
+
+
+def report_startup():
+    """Prints the startup steps as an indented tree (only in profiling mode)."""
+    global _reported
+    if not PROFILE or _reported:
+        return
+    builtins.__import__ = _original_import
+    _reported = True
+    total = sum(seconds for _, depth, _, seconds in _steps if depth == 0)
+    print(f"[startup] {total * 1000:.0f} ms in total, steps over {REPORT_MIN_SECONDS * 1000:.0f} ms:")
+    for _, depth, label, seconds in sorted(_steps):
+        if seconds >= REPORT_MIN_SECONDS and depth <= REPORT_MAX_DEPTH:
+            print(f"[startup] {'  ' * depth}{label}: {seconds * 1000:.0f} ms")
+    _steps.clear()
+
+
+class LazyModule:
+    """
+    Stands in for a module and imports it on first attribute access,
+    e.g. cv2 only once the camera is started or a frame is scanned.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            with timed(f"import {self._name} (lazy)"):
+                self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
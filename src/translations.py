@@ -34,6 +34,7 @@ TRANSLATIONS = {
         'ean_code': 'EAN Code',
         'product_name': 'Product Name',
         'shelf_life': 'Shelf Life (Days)',
+        'warn_days': 'Expiry Warning (Days)',
         'product_url': 'Product URL (Optional)',
         'price_in': 'Price In',
         'price_out': 'Price Out',
@@ -61,6 +62,8 @@ TRANSLATIONS = {
         'expiration_alerts': 'Expiration Alerts',
         'no_alerts': 'No alerts.',
         'check_now': 'Check Now',
+        'value_at_risk': 'Value at Risk',
+        'new_alerts': 'new expiry alerts',
         'status': 'Status',
         'scan_to_basket': 'Scan to Add to Basket',
         'step1': '1. Toggle camera in header',
@@ -111,6 +114,7 @@ TRANSLATIONS = {
         'items': 'Order Details (Qty x Product)',
         'tab_orders_list': 'Active orders',
         'tab_order_history': 'Order History',
+        'tab_order_search': 'Order Search',
         'search_placeholder': 'Search ID/Customer...',
         'tab_customer_ordering': 'Customer Ordering',
     },
@@ -149,6 +153,7 @@ TRANSLATIONS = {
         'ean_code': 'EAN-kode',
         'product_name': 'Produktnavn',
         'shelf_life': 'Holdbarhet (Dager)',
+        'warn_days': 'Utløpsvarsel (Dager)',
         'product_url': 'Produkt-URL (Valgfritt)',
         'price_in': 'Innkjøpspris',
         'price_out': 'Utsalgspris',
@@ -176,6 +181,8 @@ TRANSLATIONS = {
         'expiration_alerts': 'Utløpsvarsler',
         'no_alerts': 'Ingen varsler.',
         'check_now': 'Sjekk nå',
+        'value_at_risk': 'Verdi i faresonen',
+        'new_alerts': 'nye utløpsvarsler',
         'status': 'Status',
         'scan_to_basket': 'Skann for å legge i kurv',
         'step1': '1. Slå på kamera i overskriften',
@@ -227,6 +234,7 @@ TRANSLATIONS = {
         'tab_orders_list': 'Aktive bestillinger',
 
         'tab_order_history': 'Ordrehistorikk',
+        'tab_order_search': 'Ordresøk',
         'search_placeholder': 'Søk på ID/kunde...',
         'tab_customer_ordering': 'Kundebestilling',
     }
@@ -1,14 +1,87 @@
 from nicegui import ui, events, context, run
-import pandas as pd
-import cv2
+from nicegui.json import dumps as json_dumps
 import base64
-import numpy as np
-from datetime import datetime, timedelta
 import asyncio
+import queue
 from src.translations import TRANSLATIONS
+from src.dates import normalize_date, today_ordinal
+from src.product_search import product_label
+from src.startup import LazyModule
+from src.events import drain
 import threading
 import time
 
+# Only needed once the camera is started
+cv2 = LazyModule('cv2')
+
+# Rows per page of the server-side paged order tables
+ORDERS_PAGE_SIZE = 25
+# Best matches shown in the order search tab
+ORDER_SEARCH_LIMIT = 100
+# Options sent to a product select per keystroke
+PRODUCT_OPTION_LIMIT = 50
+# Change events from the managers are applied at most this often, as one batch of patches
+CHANGE_FRAME_SECONDS = 0.05
+
+# Applies a row delta to a table in the browser (see patch_table_rows). Rows already in
+# place are moved rather than duplicated, in case a full update of the table got there first
+PATCH_ROWS_JS = """
+(id, key, removed, updated, inserted, props) => {
+  const element = mounted_app.elements[id];
+  if (!element) return;
+  const gone = new Set(removed);
+  const changed = new Map(updated.map((row) => [row[key], row]));
+  const rows = element.props.rows.filter((row) => !gone.has(row[key])).map((row) => changed.get(row[key]) ?? row);
+  for (const [index, row] of inserted) {
+    const i = rows.findIndex((r) => r[key] === row[key]);
+    if (i !== -1) rows.splice(i, 1);
+    rows.splice(index, 0, row);
+  }
+  element.props.rows = rows;
+  Object.assign(element.props, props);
+}
+"""
+
+
+def patch_table_rows(table, removed=(), updated=(), inserted=(), **props):
+    """
+    Applies a row delta to a table and sends the browser only that delta; changing
+    table.rows directly would resend every row.
+    removed: row keys; updated: rows replacing the rows with the same key;
+    inserted: (index, row) pairs in ascending index order, applied last;
+    props: other table props to set, e.g. pagination.
+    """
+    key = table.row_key
+    removed, updated, inserted = list(removed), list(updated), list(inserted)
+    if not (removed or updated or inserted or props):
+        return
+    with table.props.suspend_updates():
+        gone = set(removed)
+        changed = {r[key]: r for r in updated}
+        table.rows[:] = [changed.get(r[key], r) for r in table.rows if r[key] not in gone]
+        for index, row in inserted:
+            table.rows.insert(index, row)
+        for name, value in props.items():
+            table.props[name] = value
+    args = json_dumps([table.id, key, removed, updated, inserted, props])
+    table.client.run_javascript(f"({PATCH_ROWS_JS})(...{args})")
+
+
+def sync_table_rows(table, rows, **props):
+    """Replaces a table's rows (and props such as pagination), sending the browser only the rows that changed."""
+    key = table.row_key
+    old = {r[key]: r for r in table.rows}
+    new_keys = {r[key] for r in rows}
+    if [k for k in old if k in new_keys] != [r[key] for r in rows if r[key] in old]:
+        # Reordered (e.g. a new sort): send the rows again
+        patch_table_rows(table, removed=old, inserted=enumerate(rows), **props)
+        return
+    patch_table_rows(table,
+                     removed=[k for k in old if k not in new_keys],
+                     updated=[r for r in rows if r[key] in old and old[r[key]] != r],
+                     inserted=[(i, r) for i, r in enumerate(rows) if r[key] not in old],
+                     **props)
+
 class ThreadedCamera:
     def __init__(self, source=0):
         self.source = source
@@ -54,22 +127,7 @@ class ThreadedCamera:
             self.cap = None
         self.frame = None
 
-def normalize_date(date_str):
-    """Converts YYYY-MM-DD to DD-MM-YYYY if detected, otherwise returns original."""
-    if not date_str:
-        return ""
-    date_str = str(date_str).strip()
-    
-    # Check if it's in YYYY-MM-DD format (e.g. 2026-03-06)
-    if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
-        try:
-            dt = datetime.strptime(date_str, "%Y-%m-%d")
-            return dt.strftime("%d-%m-%Y")
-        except:
-            pass
-    return date_str
-
-def create_ui(products, inventory, internal_inventory, customers, orders, recipes, qr_gen, alerts, scanner):
+def create_ui(products, inventory, internal_inventory, customers, orders, recipes, qr_gen, alerts, scanner, watcher=None, bus=None):
     # Add CSS for zebra striping and global font size increase
     ui.add_head_html('''
         <style>
@@ -116,51 +174,113 @@ def create_ui(products, inventory, internal_inventory, customers, orders, recipe
         'frame_count': 0,
         'is_scanning': False,
         'last_msg': 'Ready...',
-        'lang': 'en'
+        'lang': 'en',
+        # Data versions each widget was last rendered at (see changed() and patch_stock_table)
+        'rendered_versions': {},
+        # Bumped on every basket edit, like the managers' version counters
+        'basket_versions': {'sales_basket': 0, 'order_basket': 0},
+        # Expiry watcher version the alert badge and table were last rendered at
+        'alerts_version': None
     }
 
     def t(key):
         return TRANSLATIONS[state['lang']].get(key, key)
 
-    def get_product_options():
-        return {ean: f"{details['name']} ({ean})" for ean, details in products.products.items()}
+    # Search text typed into each product select, by element id
+    product_queries = {}
 
-    def get_inventory_product_options():
-        # Only show products that are actually in the regular inventory
-        in_stock_eans = {str(item['ean']) for item in inventory.inventory if item['qty'] > 0}
-        options = {}
-        for ean in in_stock_eans:
-            details = products.get_product_details(ean)
-            name = details['name'] if details else "Unknown"
-            options[ean] = f"{name} ({ean})"
+    def product_options(query='', allowed=None, selected=None):
+        """The best PRODUCT_OPTION_LIMIT matches for a search, plus the selected EAN so it isn't cleared."""
+        options = products.search_products(query, PRODUCT_OPTION_LIMIT, allowed)
+        if selected and selected not in options:
+            details = products.get_product_details(selected)
+            options[selected] = product_label(selected, details['name'] if details else "Unknown")
         return options
 
+    def set_product_options(select, allowed=None):
+        """Refills a product select for its current search text. allowed: optional callable returning EANs to pick from."""
+        select.options = product_options(product_queries.get(select.id, ''), allowed() if allowed else None, select.value)
+        select.update()
+
+    def select_product(select, ean):
+        """Sets a product select to an EAN (e.g. a scanned one), which may not be among its options yet."""
+        select.options = product_options(product_queries.get(select.id, ''), None, ean)
+        select.update()
+        select.value = ean
+
+    def product_select(label, allowed=None, **kwargs):
+        """
+        A select over the product catalogue that only holds the best matches for
+        what is being typed; the product index is queried on every keystroke.
+        """
+        select = ui.select(product_options(allowed=allowed() if allowed else None), label=label, with_input=True, **kwargs)
+
+        def on_input(e):
+            product_queries[select.id] = e.args or ''
+            set_product_options(select, allowed)
+        select.on('input-value', on_input)
+        return select
+
+    def get_inventory_eans():
+        # Only show products that are actually in the regular inventory
+        return inventory.get_in_stock_eans()
+
     def get_customer_options():
         return {cid: f"{d['name']} ({d['company']})" if d['company'] else d['name'] for cid, d in customers.customers.items()}
 
-    def get_internal_product_options():
-        # Ingredients come from the internal inventory (ingredients list)
-        options = {}
-        # We can also get all products if we want to allow anything as an ingredient, 
-        # but usually it's from the ingredients list. 
-        # For simplicity, let's allow all products to be ingredients.
-        for ean, details in products.products.items():
-            options[ean] = f"{details['name']} ({ean})"
-        return options
-
     # Global UI elements that need to be accessed across refreshes
     ui_elements = {}
 
-    @ui.refreshable
-    def render_header():
-        def handle_lang_change(e):
-            state['lang'] = e.value
-            render_header.refresh()
-            render_content.refresh()
+    # Widgets showing translated text, with the function that relabels them: [(element, apply)]
+    relabelers = []
+
+    def on_language(element, apply):
+        """Runs apply() now and again after every language switch, while element exists."""
+        relabelers.append((element, apply))
+        apply()
+        return element
+
+    def tr(element, key, prop='text', template='{}'):
+        """
+        Shows the translation of key on element, as its text or as a prop such as
+        'label' or 'placeholder', and keeps it in the current language.
+        template: e.g. '{}:' for "Customer:". Returns the element.
+        """
+        def apply():
+            value = template.format(t(key))
+            if prop == 'text':
+                element.text = value
+            else:
+                element.props[prop] = value
+                element.update()
+        return on_language(element, apply)
+
+    def translated_columns(columns):
+        """Table columns whose 'label' is a translation key, in the current language."""
+        return [{**c, 'label': t(c['label']) if c['label'] else ''} for c in columns]
+
+    def tr_table(columns, **kwargs):
+        """ui.table with translation keys as column labels, kept in the current language."""
+        table = ui.table(columns=translated_columns(columns), **kwargs)
+
+        def apply():
+            table.columns = translated_columns(columns)
+            table.update()
+        relabelers.append((table, apply))
+        return table
+
+    def set_language(lang):
+        """Switches the language in place: relabels the built widgets and redraws translated table content."""
+        state['lang'] = lang
+        relabelers[:] = [(element, apply) for element, apply in relabelers if not element.is_deleted]
+        for _, apply in relabelers:
+            apply()
+        refresh_all_tables()
 
+    def render_header():
         with ui.row().classes('w-full items-center justify-center mb-4 px-4 relative h-60'):
             ui.image('images/image.png').props('fit=contain').classes('w-60 h-60 absolute left-4')
-            ui.label(t('title')).classes('text-5xl font-bold text-primary')
+            tr(ui.label(), 'title').classes('text-5xl font-bold text-primary')
 
         with ui.row().classes('w-full items-center justify-between px-4'):
             with ui.row().classes('items-center gap-4'):
@@ -170,12 +290,21 @@ def create_ui(products, inventory, internal_inventory, customers, orders, recipe
                 ui_elements['scanner_log'] = ui.label('').classes('text-sm font-mono w-48 overflow-hidden')\
                     .bind_visibility_from(state, 'scanner_running')
                 ui_elements['scanner_log'].bind_text_from(state, 'last_msg')
-                ui.switch(t('camera'), on_change=toggle_scanner).bind_value(state, 'scanner_running')
-                ui.select({'en': 'English', 'no': 'Norsk'}, label=t('language'), 
-                          value=state['lang'], on_change=handle_lang_change).classes('w-32 ml-4')
+                tr(ui.switch(on_change=toggle_scanner), 'camera').bind_value(state, 'scanner_running')
+                tr(ui.select({'en': 'English', 'no': 'Norsk'}, value=state['lang'],
+                             on_change=lambda e: set_language(e.value)), 'language', 'label').classes('w-32 ml-4')
             
-            # Placeholder or empty space if needed on the right
-            ui.element('div')
+            # Expiry alerts pushed by the background watcher
+            if watcher:
+                with ui.button(icon='notifications', on_click=show_alerts).props('flat round size=lg'):
+                    ui_elements['alert_badge'] = ui.badge(str(watcher.count()), color='red').props('floating')
+                    ui_elements['alert_badge'].set_visibility(watcher.count() > 0)
+            else:
+                ui.element('div')
+
+    def show_alerts():
+        state['main_view'] = 'inventory_mgmt'
+        state['current_tab'] = 'alerts'
 
     def toggle_scanner(e):
         state['scanner_running'] = e.value
@@ -212,10 +341,8 @@ def create_ui(products, inventory, internal_inventory, customers, orders, recipe
         if not state['is_scanning']:
             state['is_scanning'] = True
             try:
-                # Convert to RGB and scan in background thread
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                # Use NiceGUI run.cpu_bound to prevent blocking the main event loop
-                result = await run.cpu_bound(scanner.scan_image, rgb_frame)
+                # The scan worker process converts and scans the frame; this thread only waits for it
+                result = await run.io_bound(scanner.scan, frame)
                 ean, date, msg, _ = result
                 
                 state['last_msg'] = msg
@@ -226,10 +353,10 @@ def create_ui(products, inventory, internal_inventory, customers, orders, recipe
                     else:
                         current_tab_text = state['current_tab']
                         if current_tab_text == 'inventory':
-                            if 'reg_ean_input' in ui_elements: ui_elements['reg_ean_input'].value = ean
+                            if 'reg_ean_input' in ui_elements: select_product(ui_elements['reg_ean_input'], ean)
                             if 'reg_date_input' in ui_elements: ui_elements['reg_date_input'].value = date if date else ''
                         elif current_tab_text == 'internal_inventory':
-                            if 'internal_ean_input' in ui_elements: ui_elements['internal_ean_input'].value = ean
+                            if 'internal_ean_input' in ui_elements: select_product(ui_elements['internal_ean_input'], ean)
                             if 'internal_date_input' in ui_elements: ui_elements['internal_date_input'].value = date if date else ''
                     ui.notify(f"Scanned: {ean}")
             finally:
@@ -237,94 +364,193 @@ def create_ui(products, inventory, internal_inventory, customers, orders, recipe
 
     camera_timer = ui.timer(0.04, update_camera_frame, active=state['scanner_running'])
 
+    alert_events = watcher.subscribe() if watcher else None
+
+    def show_alerts(msg, rows):
+        ui_elements['alert_msg_label'].text = msg
+        ui_elements['alert_table'].rows[:] = rows
+        ui_elements['alert_table'].update()
+
+    def refresh_alerts():
+        """Shows the alerts the expiry watcher keeps current (without a watcher, checks them here)."""
+        if 'alert_table' not in ui_elements:
+            return
+        if watcher:
+            show_alerts(*watcher.report)
+        else:
+            check_alerts_now()
+
+    def check_alerts_now():
+        """Checks the stock for alerts on the spot ("Check now")."""
+        if 'alert_table' not in ui_elements:
+            return
+        # Only batches that can alert are read, through the expiry index
+        until = today_ordinal() + alerts.widest_window(products.products)
+        msg, df = alerts.check_alerts(inventory.get_columns(end=until), internal_inventory.get_columns(end=until), products=products.products)
+        show_alerts(msg, df.to_dict('records'))
+
+    def drain_alert_events():
+        """Shows alerts the watcher pushed since the last run and keeps the badge and table current."""
+        watcher.tick()
+        events = []
+        while True:
+            try:
+                events.extend(alert_events.get_nowait())
+            except queue.Empty:
+                break
+        if len(events) > 5:
+            ui.notify(f"{len(events)} {t('new_alerts')}", type='warning')
+        else:
+            for e in events:
+                ui.notify(f"{e['name']} ({e['exp_date']}): {e['status']}", type='warning')
+        if state['alerts_version'] != watcher.version:
+            state['alerts_version'] = watcher.version
+            if 'alert_badge' in ui_elements:
+                count = watcher.count()
+                ui_elements['alert_badge'].text = str(count)
+                ui_elements['alert_badge'].set_visibility(count > 0)
+            refresh_alerts()
+
+    if watcher:
+        ui.timer(1.0, drain_alert_events)
+        context.client.on_delete(lambda: watcher.unsubscribe(alert_events))
+
+    def format_internal_row(row):
+        # Format Qty to 2 decimal places string for display
+        return {**row, 'Qty': f"{float(row['Qty']):.2f}"}
+
+    def changed(key, *versions):
+        """
+        Whether ui_elements[key] needs redrawing: it was last drawn from other data
+        versions, or it is a new element (e.g. after a language switch). Records the
+        versions as drawn, so call it only when the widget is then brought up to date.
+        """
+        element = ui_elements.get(key)
+        if element is None:
+            return False
+        drawn = (element.id, versions)
+        if state['rendered_versions'].get(key) == drawn:
+            return False
+        state['rendered_versions'][key] = drawn
+        return True
+
+    def patch_stock_table(key, manager, format_row=dict):
+        """Brings a stock table up to date, sending only the rows that changed since it was last rendered."""
+        table = ui_elements[key]
+        rendered = state['rendered_versions'].get(key)
+        if rendered == manager.version:
+            return
+        changes = manager.get_inventory_changes(rendered)
+        if changes is None:
+            sync_table_rows(table, [format_row(r) for r in manager.get_inventory_rows()])
+        else:
+            patch_table_rows(table, changes['removed'], [format_row(r) for r in changes['updated']],
+                             [(index, format_row(r)) for index, r in changes['inserted']])
+        state['rendered_versions'][key] = manager.version
+
+    # Status filter of each paged order table
+    order_table_filters = {
+        # Active orders only (Received or Making)
+        'orders_table': {'exclude_status': 'Finished'},
+        # History only (Finished)
+        'order_history_table': {'status': 'Finished'},
+    }
+
+    def load_orders_page(key, pagination=None):
+        """Loads the current page of an order table from the server (Quasar server-side pagination)."""
+        table = ui_elements[key]
+        p = dict(table.pagination)
+        if pagination:
+            p.update(pagination)
+        rows_per_page = p.get('rowsPerPage') or 0
+        page = max(1, p.get('page') or 1)
+        customer_id = state['selected_filter_customer_id']
+        query = dict(order_table_filters[key],
+                     customer_id=customer_id if customer_id and customer_id != 'all' else None,
+                     search=state['order_search_query'],
+                     sort_by=p.get('sortBy') or 'Order ID',
+                     descending=p.get('descending', True) if p.get('sortBy') else True)
+        rows, total = orders.query_orders(offset=(page - 1) * rows_per_page, limit=rows_per_page or None, **query)
+        if not rows and page > 1:
+            # The page ran past the end after a filter or delete, show the last one
+            page = max(1, -(-total // rows_per_page))
+            rows, total = orders.query_orders(offset=(page - 1) * rows_per_page, limit=rows_per_page, **query)
+        p.update(page=page, rowsNumber=total)
+        sync_table_rows(table, rows, pagination=p)
+
+    def refresh_order_tables():
+        """Reloads the order tables after a filter or search change."""
+        for key in order_table_filters:
+            if key in ui_elements:
+                load_orders_page(key)
+        if 'orders_search_table' in ui_elements:
+            # Ranked hits from the order search index; nothing until something is typed
+            query = state['order_search_query'] or ''
+            ui_elements['orders_search_table'].rows[:] = orders.search_orders(query, limit=ORDER_SEARCH_LIMIT) if query.strip() else []
+            ui_elements['orders_search_table'].update()
+
+    # Table and total label of each basket
+    basket_widgets = {
+        'sales_basket': ('basket_table', 'grand_total_label'),
+        'order_basket': ('order_basket_table', 'order_total_label'),
+    }
+
+    def refresh_basket(name):
+        """Redraws a basket's table and total if the basket changed since they were drawn."""
+        table_key, total_key = basket_widgets[name]
+        # The total label is translated, so a language switch redraws it too
+        if not changed(table_key, state['basket_versions'][name], state['lang']):
+            return
+        rows = []
+        grand_total = 0.0
+        for item in state[name]:
+            row_total = item['Price'] * item['Qty']
+            grand_total += row_total
+            rows.append({**item, 'Total': f"{row_total:.2f}"})
+        ui_elements[table_key].rows[:] = rows
+        ui_elements[table_key].update()
+        if total_key in ui_elements:
+            ui_elements[total_key].text = f"{t('grand_total')}: {grand_total:.2f}"
+
+    def basket_changed(name):
+        """Call after editing a basket; redraws just its table and total."""
+        state['basket_versions'][name] += 1
+        refresh_basket(name)
+
     # --- Shared Logic Functions ---
     def refresh_all_tables():
-        product_options = get_product_options()
-        inventory_options = get_inventory_product_options()
-        customer_options = get_customer_options()
-        
-        for key in ['reg_ean_input', 'internal_ean_input', 'qr_ean_input', 'order_product_input']:
-            if key in ui_elements:
-                ui_elements[key].options = product_options
-                ui_elements[key].update()
+        """Redraws the widgets whose data changed since they were last drawn (see changed())."""
+        # Product selects only get the matches for their current search text
+        for key in ['reg_ean_input', 'internal_ean_input', 'qr_ean_input', 'order_product_input',
+                    'recipe_product_selection', 'recipe_ingredient_selection']:
+            if changed(key, products.version):
+                set_product_options(ui_elements[key])
         
-        if 'sales_ean_input' in ui_elements:
-            ui_elements['sales_ean_input'].options = inventory_options
-            ui_elements['sales_ean_input'].update()
+        if changed('sales_ean_input', products.version, inventory.version):
+            set_product_options(ui_elements['sales_ean_input'], get_inventory_eans)
 
-        if 'customer_selection' in ui_elements:
-            ui_elements['customer_selection'].options = customer_options
+        if changed('customer_selection', customers.version):
+            ui_elements['customer_selection'].options = get_customer_options()
             ui_elements['customer_selection'].update()
 
-        if 'product_table' in ui_elements:
+        if changed('product_table', products.version):
             ui_elements['product_table'].rows[:] = products.get_products_df().to_dict('records')
             ui_elements['product_table'].update()
         if 'inventory_table' in ui_elements:
-            ui_elements['inventory_table'].rows[:] = inventory.get_inventory_df().to_dict('records')
-            ui_elements['inventory_table'].update()
+            patch_stock_table('inventory_table', inventory)
         if 'internal_table' in ui_elements:
-            df_internal = internal_inventory.get_inventory_df()
-            # Format Qty to 2 decimal places string for display
-            df_internal['Qty'] = df_internal['Qty'].apply(lambda x: f"{float(x):.2f}")
-            ui_elements['internal_table'].rows[:] = df_internal.to_dict('records')
-            ui_elements['internal_table'].update()
+            patch_stock_table('internal_table', internal_inventory, format_internal_row)
         
-        if 'customer_table' in ui_elements:
+        if changed('customer_table', customers.version):
             ui_elements['customer_table'].rows[:] = customers.get_customers_df().to_dict('records')
             ui_elements['customer_table'].update()
 
-        if 'orders_table' in ui_elements:
-            df = orders.get_orders_df()
-            # Active orders only (Received or Making)
-            df_active = df[df['Status'] != 'Finished']
-            
-            # Apply Customer Filter
-            if state['selected_filter_customer_id'] and state['selected_filter_customer_id'] != 'all':
-                df_active = df_active[df_active['Customer ID'] == state['selected_filter_customer_id']]
-            
-            # Apply Search Filter (ID, Name, or Customer ID)
-            query = state['order_search_query'].lower().strip()
-            if query:
-                df_active = df_active[
-                    df_active['Order ID'].str.lower().str.contains(query) |
-                    df_active['Customer Name'].str.lower().str.contains(query) |
-                    df_active['Customer ID'].str.lower().str.contains(query)
-                ]
-            
-            ui_elements['orders_table'].rows[:] = df_active.to_dict('records')
-            ui_elements['orders_table'].update()
-
-        if 'order_history_table' in ui_elements:
-            df = orders.get_orders_df()
-            # History only (Finished)
-            df_history = df[df['Status'] == 'Finished']
-            
-            # Apply Customer Filter
-            if state['selected_filter_customer_id'] and state['selected_filter_customer_id'] != 'all':
-                df_history = df_history[df_history['Customer ID'] == state['selected_filter_customer_id']]
-            
-            # Apply Search Filter
-            query = state['order_search_query'].lower().strip()
-            if query:
-                df_history = df_history[
-                    df_history['Order ID'].str.lower().str.contains(query) |
-                    df_history['Customer Name'].str.lower().str.contains(query) |
-                    df_history['Customer ID'].str.lower().str.contains(query)
-                ]
-                
-            ui_elements['order_history_table'].rows[:] = df_history.to_dict('records')
-            ui_elements['order_history_table'].update()
+        # A list, not a generator, so every table's version is recorded
+        if any([changed(key, orders.version) for key in [*order_table_filters, 'orders_search_table']]):
+            refresh_order_tables()
 
         # --- Recipes Refresh ---
-        if 'recipe_product_selection' in ui_elements:
-            ui_elements['recipe_product_selection'].options = product_options
-            ui_elements['recipe_product_selection'].update()
-        
-        if 'recipe_ingredient_selection' in ui_elements:
-            ui_elements['recipe_ingredient_selection'].options = get_internal_product_options()
-            ui_elements['recipe_ingredient_selection'].update()
-
-        if 'recipe_table' in ui_elements:
+        if changed('recipe_table', recipes.version, products.version, state['selected_recipe_ean'], state['lang']):
             if state['selected_recipe_ean']:
                 recipe_items = recipes.get_recipe(state['selected_recipe_ean'])
                 display_items = []
@@ -348,35 +574,32 @@ def create_ui(products, inventory, internal_inventory, customers, orders, recipe
                     ui_elements['recipe_header_label'].text = f"{t('recipe_for')}: ..."
             ui_elements['recipe_table'].update()
         
-        if 'filter_customer_selection' in ui_elements:
-            opts = {'all': t('all')}
-            opts.update(customer_options)
-            ui_elements['filter_customer_selection'].options = opts
-            ui_elements['filter_customer_selection'].update()
-
-        if 'basket_table' in ui_elements:
-            basket_rows = []
-            grand_total = 0.0
-            for item in state['sales_basket']:
-                row_total = item['Price'] * item['Qty']
-                grand_total += row_total
-                basket_rows.append({**item, 'Total': f"{row_total:.2f}"})
-            ui_elements['basket_table'].rows[:] = basket_rows
-            ui_elements['basket_table'].update()
-            if 'grand_total_label' in ui_elements:
-                ui_elements['grand_total_label'].text = f"{t('grand_total')}: {grand_total:.2f}"
-
-        if 'order_basket_table' in ui_elements:
-            order_rows = []
-            order_total = 0.0
-            for item in state['order_basket']:
-                row_total = item['Price'] * item['Qty']
-                order_total += row_total
-                order_rows.append({**item, 'Total': f"{row_total:.2f}"})
-            ui_elements['order_basket_table'].rows[:] = order_rows
-            ui_elements['order_basket_table'].update()
-            if 'order_total_label' in ui_elements:
-                ui_elements['order_total_label'].text = f"{t('grand_total')}: {order_total:.2f}"
+        # The order list and history each have a customer filter, sharing one state value
+        for key in ['filter_customer_selection', 'history_customer_selection']:
+            if changed(key, customers.version, state['lang']):
+                opts = {'all': t('all')}
+                opts.update(get_customer_options())
+                ui_elements[key].options = opts
+                ui_elements[key].update()
+
+        for name in basket_widgets:
+            refresh_basket(name)
+
+    # Changes made anywhere (this tab, another tab, another checkout) arrive here
+    change_events = bus.subscribe() if bus else None
+
+    def apply_change_events():
+        """Redraws what the changes published since the last frame touched, in one go."""
+        if change_events.empty():
+            return
+        # Only the fact that something changed matters here: refresh_all_tables works
+        # out from the managers' versions which widgets are stale
+        drain(change_events)
+        refresh_all_tables()
+
+    if bus:
+        ui.timer(CHANGE_FRAME_SECONDS, apply_change_events)
+        context.client.on_delete(lambda: bus.unsubscribe(change_events))
 
     async def handle_sale_scan_global(ean, date):
         date = normalize_date(date)
@@ -386,7 +609,7 @@ def create_ui(products, inventory, internal_inventory, customers, orders, recipe
         if date:
             add_to_basket_global(ean, name, date, price)
         else:
-            batches = [b for b in inventory.get_raw_inventory() if str(b['ean']) == str(ean)]
+            batches = inventory.get_batches(ean)
             if not batches:
                 ui.notify(f"{t('no_inventory_found')}: {ean}", type='warning')
             elif len(batches) == 1:
@@ -399,10 +622,10 @@ def create_ui(products, inventory, internal_inventory, customers, orders, recipe
         for item in state['sales_basket']:
             if item['EAN'] == ean and item['Exp Date'] == date:
                 item['Qty'] += 1
-                refresh_all_tables()
+                basket_changed('sales_basket')
                 return
         state['sales_basket'].append({'EAN': ean, 'Name': name, 'Exp Date': date, 'Qty': 1, 'Price': price})
-        refresh_all_tables()
+        basket_changed('sales_basket')
 
     def show_batch_selection_global(batches, price):
         with ui.dialog() as dialog, ui.card():
@@ -418,14 +641,19 @@ def create_ui(products, inventory, internal_inventory, customers, orders, recipe
         if not state['sales_basket']:
             ui.notify(t('basket_empty'), type='warning')
             return
-        success_count = 0
-        for item in state['sales_basket']:
-            msg, _ = inventory.update_stock(item['EAN'], item['Name'], item['Exp Date'], item['Qty'], "Remove")
-            if "Remove:" in msg: success_count += 1
-        if success_count > 0:
+        # The whole basket is taken out of stock in one go, or not at all
+        success, results = inventory.apply_movements([
+            {'ean': item['EAN'], 'name': item['Name'], 'exp_date': item['Exp Date'], 'qty': item['Qty'], 'action': "Remove"}
+            for item in state['sales_basket']
+        ])
+        if success:
             ui.notify(t('sale_completed'))
             state['sales_basket'] = []
+            basket_changed('sales_basket')
             refresh_all_tables()
+        else:
+            failed = next((item, msg) for item, (ok, msg) in zip(state['sales_basket'], results) if not ok)
+            ui.notify(f"{failed[0]['Name']}: {failed[1]}", type='negative')
 
     def add_to_order_basket(ean, qty):
         details = products.get_product_details(ean)
@@ -439,7 +667,7 @@ def create_ui(products, inventory, internal_inventory, customers, orders, recipe
         for item in state['order_basket']:
             if item['EAN'] == ean:
                 item['Qty'] += qty
-                refresh_all_tables()
+                basket_changed('order_basket')
                 return
         
         state['order_basket'].append({
@@ -449,7 +677,7 @@ def create_ui(products, inventory, internal_inventory, customers, orders, recipe
             'Qty': qty, 
             'Price': price
         })
-        refresh_all_tables()
+        basket_changed('order_basket')
 
     async def complete_order(due_date=""):
         if not state['order_basket']:
@@ -475,47 +703,61 @@ def create_ui(products, inventory, internal_inventory, customers, orders, recipe
         if order_id:
             ui.notify(t('sale_completed'))
             state['order_basket'] = []
+            state['basket_versions']['order_basket'] += 1
             state['selected_order_customer_id'] = None
             if 'customer_selection' in ui_elements:
                 ui_elements['customer_selection'].value = None
-            # The input field is local to the tab panel, so we refresh the content to clear it
-            render_content.refresh()
+            # Clear the rest of the order form for the next order
+            if 'order_due_date_input' in ui_elements:
+                ui_elements['order_due_date_input'].value = ''
+            if 'order_product_input' in ui_elements:
+                ui_elements['order_product_input'].value = None
             refresh_all_tables()
         else:
             ui.notify(msg, type='negative')
 
     def clear_basket():
         state['sales_basket'] = []
-        refresh_all_tables()
-
-    @ui.refreshable
-    def render_content():
-        # --- UI Logic within refreshable ---
-        async def add_product():
-            msg, df = products.add_product(ean_input.value, name_input.value, shelf_life_input.value, url_input.value, price_in_input.value, price_out_input.value)
-            ui.notify(msg)
+        basket_changed('sales_basket')
+
+    # Tab panels not built yet, by tab name: (panel, build). Each is built the first time it is shown
+    unbuilt_panels = {}
+    # The ui.tab_panels of each level, by the tab they sit in ('main' for the top level)
+    panel_groups = {}
+
+    def lazy_panel(name, build):
+        """A tab panel whose content is built by build() the first time it is shown."""
+        unbuilt_panels[name] = (ui.tab_panel(name), build)
+
+    def build_shown_panels():
+        """Builds the shown tab panels (top level, then the sub tab inside it) that are still empty."""
+        built = False
+        group = panel_groups.get('main')
+        while group is not None:
+            name = group.value
+            if name in unbuilt_panels:
+                panel, build = unbuilt_panels.pop(name)
+                with panel:
+                    build()
+                built = True
+            group = panel_groups.get(name)
+        if built:
             refresh_all_tables()
-            ean_input.value = name_input.value = url_input.value = ''
-            price_in_input.value = price_out_input.value = 0.0
 
+    def tab_panels(parent, tabs, value, state_key):
+        """The panels of a tab bar, bound to state[state_key] and built lazily (see lazy_panel)."""
+        group = ui.tab_panels(tabs, value=value).classes('w-full').bind_value(state, state_key)
+        # Registered after the binding has set the initial value, so that doesn't trigger a build
+        panel_groups[parent] = group
+        group.on_value_change(build_shown_panels)
+        return group
+
+    def render_content():
         async def delete_product(ean):
             msg, df = products.delete_product(ean)
             ui.notify(msg)
             refresh_all_tables()
 
-        async def add_customer():
-            msg, df = customers.add_customer(
-                cname_input.value, comp_input.value, 
-                org_nr_input.value, vat_nr_input.value,
-                phone_input.value, email_input.value, 
-                addr_input.value, web_input.value, notes_input.value
-            )
-            ui.notify(msg)
-            refresh_all_tables()
-            # Clear all inputs
-            for inp in [cname_input, comp_input, org_nr_input, vat_nr_input, phone_input, email_input, addr_input, web_input, notes_input]:
-                inp.value = ''
-
         async def delete_customer(cid):
             msg, df = customers.delete_customer(cid)
             ui.notify(msg)
@@ -538,12 +780,12 @@ def create_ui(products, inventory, internal_inventory, customers, orders, recipe
                     edit_addr = ui.input(t('address'), value=details.get('address', '')).classes('w-full')
                     edit_web = ui.input(t('website'), value=details.get('website', '')).classes('w-full')
                     edit_notes = ui.textarea(t('notes'), value=details.get('notes', '')).classes('w-full')
-                
+
                 async def save_edit():
                     customers.update_customer(
-                        cid, edit_name.value, edit_comp.value, 
+                        cid, edit_name.value, edit_comp.value,
                         edit_org.value, edit_vat.value,
-                        edit_phone.value, edit_email.value, 
+                        edit_phone.value, edit_email.value,
                         edit_addr.value, edit_web.value, edit_notes.value
                     )
                     refresh_all_tables()
@@ -559,42 +801,26 @@ def create_ui(products, inventory, internal_inventory, customers, orders, recipe
                 edit_name = ui.input(t('product_name'), value=details['name']).classes('w-full')
                 edit_shelf = ui.number(t('shelf_life'), value=details['shelf_life']).classes('w-full')
                 edit_url = ui.input(t('product_url'), value=details.get('url', '')).classes('w-full')
+                edit_warn = ui.number(t('warn_days'), value=details.get('warn_days')).classes('w-full')
                 with ui.row().classes('w-full gap-2'):
                     edit_price_in = ui.number(t('price_in'), value=details.get('price_in', 0.0), format='%.2f').classes('flex-grow')
                     edit_price_out = ui.number(t('price_out'), value=details.get('price_out', 0.0), format='%.2f').classes('flex-grow')
                 async def save_edit():
-                    products.update_product(ean, edit_name.value, edit_shelf.value, edit_url.value, edit_price_in.value, edit_price_out.value)
+                    products.update_product(ean, edit_name.value, edit_shelf.value, edit_url.value, edit_price_in.value, edit_price_out.value, edit_warn.value)
                     refresh_all_tables()
                     dialog.close()
                 ui.button(t('update_product'), on_click=save_edit)
             dialog.open()
 
-        def generate_qr():
-            ean = qr_ean_input.value if qr_ean_input.value else ""
-            img, info, filepath = qr_gen.generate_qr(ean, products.get_product_details(ean), manual_exp_date=qr_exp_input.value)
-            if img:
-                state['last_qr_path'] = filepath
-                import io
-                buffered = io.BytesIO()
-                img.save(buffered, format="PNG")
-                qr_display.source = f'data:image/png;base64,{base64.b64encode(buffered.getvalue()).decode()}'
-                qr_info_label.text = info
-                qr_download_group.set_visibility(True)
-            else:
-                ui.notify(t('ean_unknown'), type='negative')
-
-        async def update_stock(action, is_internal=False):
+        async def update_stock(action, is_internal, ean_field, date_field, qty_field):
             manager = internal_inventory if is_internal else inventory
-            ean_field = internal_ean_input if is_internal else reg_ean_input
-            date_field = internal_date_input if is_internal else reg_date_input
-            qty_field = internal_qty_input if is_internal else reg_qty_input
-            
+
             ean = ean_field.value if ean_field.value else ""
             qty = float(qty_field.value) if qty_field.value else 0
             details = products.get_product_details(ean)
             name = details['name'] if details else "Unknown"
             shelf_life = details['shelf_life'] if details else None
-            
+
             # Logic for deducting ingredients from recipes when adding to regular inventory
             if not is_internal and action == 'Add' and ean:
                 recipe = recipes.get_recipe(ean)
@@ -606,500 +832,542 @@ def create_ui(products, inventory, internal_inventory, customers, orders, recipe
                         ing_name = ing_details['name'] if ing_details else "Unknown Ingredient"
                         # Recipe qty is in grams, internal inventory is in kg.
                         total_needed_kg = (float(ing['qty']) * qty) / 1000.0
-                        
+
                         # Use deduct_total on internal_inventory (handles FIFO and negative)
                         is_insufficient, available = internal_inventory.deduct_total(ing['ingredient_ean'], ing_name, total_needed_kg)
                         if is_insufficient:
                             insufficient_items.append(f"{ing_name} ({t('qty')}: {available:.2f}kg)")
-                    
+
                     if insufficient_items:
                         ui.notify(f"Warning: Insufficient ingredients! Missing: {', '.join(insufficient_items)}", type='warning', duration=10)
                     else:
                         ui.notify(t('production_deduction'))
 
-            msg, _ = manager.update_stock(ean, name, normalize_date(date_field.value), qty, action, shelf_life=shelf_life)
+            # apply_movements skips the full inventory DataFrame that update_stock returns
+            _, results = manager.apply_movements([{'ean': ean, 'name': name, 'exp_date': normalize_date(date_field.value),
+                                                   'qty': qty, 'action': action, 'shelf_life': shelf_life}])
+            ui.notify(results[0][1])
+            refresh_all_tables()
+
+        # --- Order actions, shared by the order list, history and search tables ---
+        def delete_order(order_id):
+            msg = orders.delete_order(order_id)
             ui.notify(msg)
             refresh_all_tables()
 
+        def open_edit_order_dialog(order_id):
+            current_items = list(orders.get_order_items(order_id))
+            # Find the order object to get current due date
+            current_order = orders.get_order(order_id)
+            current_due_date = current_order.get('Due Date', '') if current_order else ''
+
+            with ui.dialog() as dialog, ui.card().classes('w-[800px] p-4'):
+                ui.label(f"{t('edit_order')}: {order_id}").classes('text-xl font-bold mb-4')
+
+                with ui.input(t('Due Date'), value=current_due_date) as edit_due_date_input:
+                    edit_due_date_input.classes('w-full mb-4')
+                    with ui.menu() as menu:
+                        ui.date().bind_value(edit_due_date_input)
+                    with edit_due_date_input.add_slot('append'):
+                        ui.icon('event').on('click', menu.open).classes('cursor-pointer')
+
+                @ui.refreshable
+                def render_edit_items():
+                    cols = [
+                        {'name': 'Name', 'label': t('name'), 'field': 'Name'},
+                        {'name': 'EAN', 'label': t('ean'), 'field': 'EAN'},
+                        {'name': 'Price', 'label': t('price'), 'field': 'Price'},
+                        {'name': 'Qty', 'label': t('qty'), 'field': 'Qty'},
+                        {'name': 'ACTIONS', 'label': '', 'field': 'ACTIONS'},
+                    ]
+                    table = ui.table(columns=cols, rows=current_items).classes('w-full mb-4')
+
+                    # Make Qty editable with QPopupEdit
+                    table.add_slot('body-cell-Qty', '''
+                        <q-td :props="props">
+                            {{ props.value }}
+                            <q-popup-edit v-model.number="props.row.Qty" v-slot="scope" buttons
+                                @save="(val) => $parent.$emit('update_qty', {ean: props.row.EAN, qty: val})">
+                                <q-input type="number" v-model.number="scope.value" dense autofocus />
+                            </q-popup-edit>
+                        </q-td>
+                    ''')
+
+                    table.add_slot('body-cell-ACTIONS', '<q-td :props="props"><q-btn size="sm" color="negative" icon="delete" @click="$parent.$emit(\'remove_item\', props.row.EAN)" /></q-td>')
+
+                    def update_qty(data):
+                        ean = data['ean']
+                        new_qty = float(data['qty'])
+                        for item in current_items:
+                            if item['EAN'] == ean:
+                                item['Qty'] = new_qty
+                                break
+                        render_edit_items.refresh()
+
+                    def remove_item(ean):
+                        nonlocal current_items
+                        current_items = [it for it in current_items if it['EAN'] != ean]
+                        render_edit_items.refresh()
+
+                    table.on('update_qty', lambda msg: update_qty(msg.args))
+                    table.on('remove_item', lambda msg: remove_item(msg.args))
+
+                with ui.row().classes('w-full gap-2 items-center mb-4'):
+                    add_ean_input = product_select(t('product')).classes('flex-grow')
+                    add_qty_input = ui.number(t('qty'), value=1).classes('w-24')
+
+                    def add_to_edit_list():
+                        ean = add_ean_input.value
+                        if not ean: return
+                        details = products.get_product_details(ean)
+                        if not details: return
+
+                        # Check if already in list
+                        for it in current_items:
+                            if it['EAN'] == ean:
+                                it['Qty'] += add_qty_input.value
+                                render_edit_items.refresh()
+                                return
+
+                        current_items.append({
+                            'EAN': ean,
+                            'Name': details['name'],
+                            'Price': details['price_out'],
+                            'Qty': float(add_qty_input.value),
+                            'Exp Date': 'N/A'
+                        })
+                        render_edit_items.refresh()
+
+                    ui.button(icon='add', on_click=add_to_edit_list).classes('bg-primary text-white')
+
+                render_edit_items()
+
+                async def save_changes():
+                    success, msg = orders.update_order(order_id, current_items, due_date=edit_due_date_input.value)
+                    if success:
+                        ui.notify(msg)
+                        refresh_all_tables()
+                        dialog.close()
+                    else:
+                        ui.notify(msg, type='negative')
+
+                with ui.row().classes('w-full justify-end gap-2'):
+                    ui.button(t('cancel'), on_click=dialog.close).props('flat')
+                    ui.button(t('update_product'), on_click=save_changes)
+
+            dialog.open()
+
+        def show_order_details(order_id):
+            items = orders.get_order_items(order_id)
+            with ui.dialog() as dialog, ui.card().classes('w-[600px] p-4'):
+                ui.label(f"{t('order_details')}: {order_id}").classes('text-xl font-bold mb-4')
+                cols = [
+                    {'name': 'Name', 'label': t('name'), 'field': 'Name'},
+                    {'name': 'EAN', 'label': t('ean'), 'field': 'EAN'},
+                    {'name': 'Exp Date', 'label': t('exp_date'), 'field': 'Exp Date'},
+                    {'name': 'Qty', 'label': t('qty'), 'field': 'Qty'},
+                    {'name': 'Price', 'label': t('price'), 'field': 'Price'},
+                ]
+                ui.table(columns=cols, rows=items).classes('w-full mb-4')
+                ui.button(t('cancel'), on_click=dialog.close).props('flat')
+            dialog.open()
+
+        def toggle_status(row):
+            order_id = row['Order ID']
+            current_status = row['Status']
+            next_status = "Making" if current_status == "Received" else ("Finished" if current_status == "Making" else "Received")
+            orders.update_order_status(order_id, next_status)
+            refresh_all_tables()
+
+        def add_order_actions(table):
+            """The view/edit/delete buttons of an order table."""
+            table.add_slot('body-cell-ACTIONS', '<q-td :props="props"><q-btn size="sm" color="primary" icon="visibility" @click="$parent.$emit(\'view\', props.row[\'Order ID\'])" /><q-btn size="sm" color="orange" icon="edit" @click="$parent.$emit(\'edit\', props.row[\'Order ID\'])" /><q-btn size="sm" color="negative" icon="delete" @click="$parent.$emit(\'delete\', props.row[\'Order ID\'])" /></q-td>')
+            table.on('view', lambda msg: show_order_details(msg.args))
+            table.on('edit', lambda msg: open_edit_order_dialog(msg.args))
+            table.on('delete', lambda msg: delete_order(msg.args))
+            table.on('toggle_status', lambda msg: toggle_status(msg.args))
+
+        order_cols = [
+            {'name': 'Order ID', 'label': 'order_id', 'field': 'Order ID', 'sortable': True},
+            {'name': 'Customer Name', 'label': 'customer', 'field': 'Customer Name', 'sortable': True},
+            {'name': 'Date', 'label': 'date', 'field': 'Date', 'sortable': True},
+            {'name': 'Due Date', 'label': 'Due Date', 'field': 'Due Date', 'sortable': True},
+            {'name': 'Total', 'label': 'total', 'field': 'Total', 'sortable': True},
+            {'name': 'Items', 'label': 'items', 'field': 'Items', 'sortable': True, 'align': 'left'},
+            {'name': 'Status', 'label': 'status', 'field': 'Status', 'sortable': True},
+            {'name': 'ACTIONS', 'label': '', 'field': 'ACTIONS'}
+        ]
+
+        # --- Sale View ---
+        def build_sale():
+            with ui.row().classes('w-full no-wrap'):
+                with ui.card().classes('w-1/3 p-4'):
+                    sales_ean_input = tr(product_select('', get_inventory_eans), 'ean', 'label').classes('w-full mb-2')
+                    ui_elements['sales_ean_input'] = sales_ean_input
+
+                    async def add_manual_sale():
+                        if sales_ean_input.value:
+                            await handle_sale_scan_global(sales_ean_input.value, None)
+                            sales_ean_input.value = None
+                        else:
+                            ui.notify(t('ean_required'), type='warning')
+
+                    tr(ui.button(on_click=add_manual_sale), 'add_to_basket').classes('w-full mb-4')
+                    tr(ui.button(on_click=complete_sale), 'complete_sale').classes('w-full mb-2')
+                    tr(ui.button(on_click=clear_basket), 'clear_basket').classes('w-full')
+                with ui.card().classes('w-2/3 p-4'):
+                    cols = [{'name': k, 'label': k.lower().replace(' ', '_'), 'field': k} for k in ['Name', 'EAN', 'Exp Date', 'Price', 'Qty', 'Total']]
+                    ui_elements['basket_table'] = tr_table(cols, rows=[]).classes('w-full')
+                    ui_elements['grand_total_label'] = ui.label(f"{t('grand_total')}: 0.00")
+
+        # --- Orders View ---
+        def build_orders():
+            with ui.tabs().classes('w-full') as orders_tabs:
+                tr(ui.tab('orders_list'), 'tab_orders_list', 'label')
+                tr(ui.tab('order_history'), 'tab_order_history', 'label')
+                tr(ui.tab('order_search'), 'tab_order_search', 'label')
+                tr(ui.tab('customer_ordering'), 'tab_customer_ordering', 'label')
+
+            with tab_panels('orders', orders_tabs, 'orders_list', 'orders_tab'):
+                lazy_panel('orders_list', build_orders_list)
+                lazy_panel('order_history', build_order_history)
+                lazy_panel('order_search', build_order_search)
+                lazy_panel('customer_ordering', build_customer_ordering)
+
+        def build_orders_list():
+            with ui.row().classes('w-full items-center gap-4 mb-4'):
+                tr(ui.label(), 'customer', template='{}:').classes('font-bold')
+                filter_customer_selection = ui.select({'all': t('all')}, value='all', on_change=refresh_order_tables).classes('w-64')
+                filter_customer_selection.bind_value(state, 'selected_filter_customer_id')
+                ui_elements['filter_customer_selection'] = filter_customer_selection
+
+                tr(ui.input(on_change=refresh_order_tables), 'search_placeholder', 'placeholder').classes('flex-grow').bind_value(state, 'order_search_query').props('clearable icon=search debounce=300')
+
+            ui_elements['orders_table'] = tr_table(order_cols, rows=[], row_key='Order ID',
+                                                   pagination={'rowsPerPage': ORDERS_PAGE_SIZE, 'page': 1, 'sortBy': 'Order ID', 'descending': True, 'rowsNumber': 0}).classes('w-full')
+            # Paging and sorting happen on the server
+            ui_elements['orders_table'].on('request', lambda msg: load_orders_page('orders_table', msg.args['pagination']))
+
+            # Add custom slot for Status with colored chips
+            ui_elements['orders_table'].add_slot('body-cell-Status', '''
+                <q-td :props="props">
+                    <q-chip :color="props.value === 'Received' ? 'blue' : (props.value === 'Making' ? 'orange' : 'green')"
+                            text-color="white" clickable @click="$parent.$emit('toggle_status', props.row)">
+                        {{ props.value }}
+                    </q-chip>
+                </q-td>
+            ''')
+            add_order_actions(ui_elements['orders_table'])
+
+        def build_order_history():
+            with ui.row().classes('w-full items-center gap-4 mb-4'):
+                tr(ui.label(), 'customer', template='{}:').classes('font-bold')
+                # Shares its state with the order list's customer filter
+                history_customer_selection = ui.select({'all': t('all')}, value='all', on_change=refresh_order_tables).classes('w-64').bind_value(state, 'selected_filter_customer_id')
+                ui_elements['history_customer_selection'] = history_customer_selection
+
+                tr(ui.input(on_change=refresh_order_tables), 'search_placeholder', 'placeholder').classes('flex-grow').bind_value(state, 'order_search_query').props('clearable icon=search debounce=300')
+
+            ui_elements['order_history_table'] = tr_table(order_cols, rows=[], row_key='Order ID',
+                                                          pagination={'rowsPerPage': ORDERS_PAGE_SIZE, 'page': 1, 'sortBy': 'Order ID', 'descending': True, 'rowsNumber': 0}).classes('w-full')
+            ui_elements['order_history_table'].on('request', lambda msg: load_orders_page('order_history_table', msg.args['pagination']))
+            ui_elements['order_history_table'].add_slot('body-cell-Status', '''
+                <q-td :props="props">
+                    <q-chip color="green" text-color="white" clickable @click="$parent.$emit('toggle_status', props.row)">
+                        {{ props.value }}
+                    </q-chip>
+                </q-td>
+            ''')
+            add_order_actions(ui_elements['order_history_table'])
+
+        def build_order_search():
+            with ui.row().classes('w-full items-center gap-4 mb-4'):
+                search_input = tr(ui.input(on_change=refresh_order_tables), 'tab_order_search', 'label')
+                tr(search_input, 'search_placeholder', 'placeholder').classes('w-full').bind_value(state, 'order_search_query').props('clearable icon=search debounce=300')
+
+            ui_elements['orders_search_table'] = tr_table(order_cols, rows=[], row_key='Order ID').classes('w-full')
+            ui_elements['orders_search_table'].add_slot('body-cell-Status', '''
+                <q-td :props="props">
+                    <q-chip :color="props.value === 'Received' ? 'blue' : (props.value === 'Making' ? 'orange' : 'green')"
+                            text-color="white" clickable @click="$parent.$emit('toggle_status', props.row)">
+                        {{ props.value }}
+                    </q-chip>
+                </q-td>
+            ''')
+            add_order_actions(ui_elements['orders_search_table'])
+
+        def build_customer_ordering():
+            with ui.row().classes('w-full no-wrap'):
+                with ui.card().classes('w-1/3 p-4'):
+                    tr(ui.label(), 'tab_customer_ordering').classes('text-lg font-bold mb-4')
+                    customer_selection = tr(ui.select(get_customer_options(), with_input=True), 'select_customer', 'label').classes('w-full mb-4')
+                    customer_selection.bind_value(state, 'selected_order_customer_id')
+                    ui_elements['customer_selection'] = customer_selection
+
+                    with tr(ui.input(), 'Due Date', 'label') as order_due_date_input:
+                        order_due_date_input.classes('w-full mb-4')
+                        with ui.menu() as menu:
+                            ui.date().bind_value(order_due_date_input)
+                        with order_due_date_input.add_slot('append'):
+                            ui.icon('event').on('click', menu.open).classes('cursor-pointer')
+                    ui_elements['order_due_date_input'] = order_due_date_input
+
+                    order_product_input = tr(product_select(''), 'product', 'label').classes('w-full mb-2')
+                    ui_elements['order_product_input'] = order_product_input
+                    order_qty_input = tr(ui.number(value=1, step=0.01, format='%.2f'), 'qty', 'label').classes('w-full mb-4')
+
+                    tr(ui.button(on_click=lambda: add_to_order_basket(order_product_input.value, order_qty_input.value)), 'add_to_basket').classes('w-full mb-4')
+                    tr(ui.button(on_click=lambda: complete_order(order_due_date_input.value)), 'save_as_order').classes('w-full')
+
+                with ui.card().classes('w-2/3 p-4'):
+                    basket_cols = [
+                        {'name': 'Name', 'label': 'name', 'field': 'Name'},
+                        {'name': 'EAN', 'label': 'ean', 'field': 'EAN'},
+                        {'name': 'Price', 'label': 'price', 'field': 'Price'},
+                        {'name': 'Qty', 'label': 'qty', 'field': 'Qty', 'format': '(val) => val.toFixed(2)'},
+                        {'name': 'Total', 'label': 'total', 'field': 'Total', 'format': '(val) => val.toFixed(2)'}
+                    ]
+                    ui_elements['order_basket_table'] = tr_table(basket_cols, rows=[]).classes('w-full')
+                    ui_elements['order_total_label'] = ui.label(f"{t('grand_total')}: 0.00").classes('text-lg font-bold mt-4')
+
+        # --- Customers View ---
+        def build_customers():
+            async def add_customer():
+                msg, df = customers.add_customer(
+                    cname_input.value, comp_input.value,
+                    org_nr_input.value, vat_nr_input.value,
+                    phone_input.value, email_input.value,
+                    addr_input.value, web_input.value, notes_input.value
+                )
+                ui.notify(msg)
+                refresh_all_tables()
+                # Clear all inputs
+                for inp in [cname_input, comp_input, org_nr_input, vat_nr_input, phone_input, email_input, addr_input, web_input, notes_input]:
+                    inp.value = ''
+
+            with ui.row().classes('w-full no-wrap gap-4'):
+                # Left: Entry Form
+                with ui.card().classes('w-1/3 p-4'):
+                    tr(ui.label(), 'add_customers').classes('text-lg font-bold mb-2')
+                    with ui.column().classes('w-full gap-2'):
+                        cname_input = tr(ui.input(), 'name', 'label').classes('w-full')
+                        comp_input = tr(ui.input(), 'company_name', 'label').classes('w-full')
+
+                        with ui.row().classes('w-full gap-2'):
+                            org_nr_input = tr(ui.input(), 'org_nr', 'label').classes('flex-grow')
+                            vat_nr_input = tr(ui.input(), 'vat_nr', 'label').classes('flex-grow')
+
+                        with ui.row().classes('w-full gap-2'):
+                            phone_input = tr(ui.input(), 'phone', 'label').classes('flex-grow')
+                            email_input = tr(ui.input(), 'email', 'label').classes('flex-grow')
+
+                        addr_input = tr(ui.input(), 'address', 'label').classes('w-full')
+                        web_input = tr(ui.input(), 'website', 'label').classes('w-full')
+                        notes_input = tr(ui.textarea(), 'notes', 'label').classes('w-full')
+
+                        tr(ui.button(on_click=add_customer), 'save_customer').classes('w-full mt-2')
+
+                # Right: Customer List
+                with ui.card().classes('w-2/3 p-4'):
+                    cols = [
+                        {'name': 'Customer ID', 'label': 'customer_id', 'field': 'Customer ID', 'sortable': True},
+                        {'name': 'Name', 'label': 'name', 'field': 'Name', 'sortable': True},
+                        {'name': 'Company Name', 'label': 'company_name', 'field': 'Company Name', 'sortable': True},
+                        {'name': 'Org Number', 'label': 'org_nr', 'field': 'Org Number', 'sortable': True},
+                        {'name': 'Phone', 'label': 'phone', 'field': 'Phone'},
+                        {'name': 'Email', 'label': 'email', 'field': 'Email'},
+                        {'name': 'ACTIONS', 'label': '', 'field': 'ACTIONS'}
+                    ]
+                    # Rows are filled by refresh_all_tables once the panel is built
+                    ui_elements['customer_table'] = tr_table(cols, rows=[], row_key='Customer ID').classes('w-full')
+                    ui_elements['customer_table'].add_slot('body-cell-ACTIONS', '<q-td :props="props"><q-btn size="sm" color="primary" icon="edit" @click="$parent.$emit(\'edit\', props.row[\'Customer ID\'])" /><q-btn size="sm" color="negative" icon="delete" @click="$parent.$emit(\'delete\', props.row[\'Customer ID\'])" /></q-td>')
+                    ui_elements['customer_table'].on('edit', lambda msg: open_edit_customer_dialog(msg.args))
+                    ui_elements['customer_table'].on('delete', lambda msg: delete_customer(msg.args))
+
+        # --- Inventory Management View ---
+        def build_inventory_mgmt():
+            with ui.tabs().classes('w-full') as tabs:
+                tr(ui.tab('product_setup'), 'tab_product_setup', 'label')
+                tr(ui.tab('qr_labels'), 'tab_qr_labels', 'label')
+                tr(ui.tab('inventory'), 'tab_inventory', 'label')
+                tr(ui.tab('internal_inventory'), 'tab_internal_inventory', 'label')
+                tr(ui.tab('recipes'), 'tab_recipes', 'label')
+                tr(ui.tab('alerts'), 'tab_alerts', 'label')
+
+            with tab_panels('inventory_mgmt', tabs, 'product_setup', 'current_tab'):
+                lazy_panel('product_setup', build_product_setup)
+                lazy_panel('qr_labels', build_qr_labels)
+                lazy_panel('inventory', build_inventory)
+                lazy_panel('internal_inventory', build_internal_inventory)
+                lazy_panel('recipes', build_recipes)
+                lazy_panel('alerts', build_alerts)
+
+        # Tab 1: Product Setup
+        def build_product_setup():
+            async def add_product():
+                msg, df = products.add_product(ean_input.value, name_input.value, shelf_life_input.value, url_input.value, price_in_input.value, price_out_input.value)
+                ui.notify(msg)
+                refresh_all_tables()
+                ean_input.value = name_input.value = url_input.value = ''
+                price_in_input.value = price_out_input.value = 0.0
+
+            with ui.row().classes('w-full no-wrap'):
+                with ui.card().classes('w-1/3 p-4'):
+                    ean_input, name_input = tr(ui.input(), 'ean_code', 'label'), tr(ui.input(), 'product_name', 'label')
+                    shelf_life_input, url_input = tr(ui.number(value=7), 'shelf_life', 'label'), tr(ui.input(), 'product_url', 'label')
+                    with ui.row().classes('w-full gap-2'):
+                        price_in_input, price_out_input = tr(ui.number(value=0.0), 'price_in', 'label'), tr(ui.number(value=0.0), 'price_out', 'label')
+                    tr(ui.button(on_click=add_product), 'save_product')
+                with ui.card().classes('w-2/3 p-4'):
+                    cols = [{'name': k, 'label': k.lower().replace(' ', '_'), 'field': k} for k in ['EAN', 'Name', 'Shelf Life', 'Price In', 'Price Out', 'URL', 'ACTIONS']]
+                    # Rows are filled by refresh_all_tables once the panel is built
+                    ui_elements['product_table'] = tr_table(cols, rows=[], row_key='EAN').classes('w-full')
+                    ui_elements['product_table'].add_slot('body-cell-ACTIONS', '<q-td :props="props"><q-btn size="sm" color="primary" icon="edit" @click="$parent.$emit(\'edit\', props.row.EAN)" /><q-btn size="sm" color="negative" icon="delete" @click="$parent.$emit(\'delete\', props.row.EAN)" /></q-td>')
+                    ui_elements['product_table'].on('edit', lambda msg: open_edit_dialog(msg.args))
+                    ui_elements['product_table'].on('delete', lambda msg: delete_product(msg.args))
+
+        # Tab 2: QR Labels
+        def build_qr_labels():
+            def generate_qr():
+                ean = qr_ean_input.value if qr_ean_input.value else ""
+                img, info, filepath = qr_gen.generate_qr(ean, products.get_product_details(ean), manual_exp_date=qr_exp_input.value)
+                if img:
+                    state['last_qr_path'] = filepath
+                    import io
+                    buffered = io.BytesIO()
+                    img.save(buffered, format="PNG")
+                    qr_display.source = f'data:image/png;base64,{base64.b64encode(buffered.getvalue()).decode()}'
+                    qr_info_label.text = info
+                    qr_download_group.set_visibility(True)
+                else:
+                    ui.notify(t('ean_unknown'), type='negative')
+
+            with ui.column().classes('items-center w-full'):
+                qr_ean_input = tr(product_select(''), 'scan_type_ean', 'label').classes('w-full max-w-sm')
+                ui_elements['qr_ean_input'] = qr_ean_input
+                qr_exp_input = tr(ui.input(), 'exp_date', 'label')
+                tr(ui.button(on_click=generate_qr), 'generate_product_qr')
+                qr_display, qr_info_label = ui.image().classes('w-64 h-64 border'), ui.label()
+                with ui.column().classes('items-center') as qr_download_group:
+                    qr_download_group.set_visibility(False)
+                    qr_qty_input = tr(ui.number(value=1), 'quantity_labels', 'label')
+                    tr(ui.button(on_click=lambda: ui.notify("PDF!")), 'download_pdf')
+
+        # Tab 3: Inventory
+        def build_inventory():
+            with ui.row().classes('w-full no-wrap'):
+                with ui.card().classes('w-1/3 p-4'):
+                    reg_ean_input = tr(product_select(''), 'ean', 'label').classes('w-full')
+                    reg_date_input, reg_qty_input = tr(ui.input(), 'exp_date', 'label'), tr(ui.number(value=1), 'qty', 'label')
+                    ui_elements['reg_ean_input'], ui_elements['reg_date_input'] = reg_ean_input, reg_date_input
+                    tr(ui.button(on_click=lambda: update_stock('Add', False, reg_ean_input, reg_date_input, reg_qty_input)), 'add_stock')
+                    tr(ui.button(on_click=lambda: update_stock('Remove', False, reg_ean_input, reg_date_input, reg_qty_input)), 'remove_stock')
+                with ui.card().classes('w-2/3 p-4'):
+                    cols = [{'name': k, 'label': k.lower().replace(' ', '_'), 'field': k} for k in ['EAN', 'Name', 'Exp Date', 'Qty']]
+                    ui_elements['inventory_table'] = tr_table(cols, rows=inventory.get_inventory_rows(), row_key='id').classes('w-full')
+                    state['rendered_versions']['inventory_table'] = inventory.version
+
+        # Tab 4: Internal Inventory
+        def build_internal_inventory():
+            with ui.row().classes('w-full no-wrap'):
+                with ui.card().classes('w-1/3 p-4'):
+                    internal_ean_input = tr(product_select(''), 'ean', 'label').classes('w-full')
+                    internal_date_input = tr(ui.input(), 'exp_date', 'label')
+                    internal_qty_input = tr(ui.number(value=1, step=0.01, format='%.2f'), 'qty_kg', 'label')
+                    ui_elements['internal_ean_input'], ui_elements['internal_date_input'] = internal_ean_input, internal_date_input
+                    tr(ui.button(on_click=lambda: update_stock('Add', True, internal_ean_input, internal_date_input, internal_qty_input)), 'add_stock')
+                    tr(ui.button(on_click=lambda: update_stock('Remove', True, internal_ean_input, internal_date_input, internal_qty_input)), 'remove_stock')
+                with ui.card().classes('w-2/3 p-4'):
+                    internal_cols = [
+                        {'name': 'EAN', 'label': 'ean', 'field': 'EAN'},
+                        {'name': 'Name', 'label': 'name', 'field': 'Name'},
+                        {'name': 'Exp Date', 'label': 'exp_date', 'field': 'Exp Date'},
+                        {'name': 'Qty', 'label': 'qty_kg', 'field': 'Qty'}
+                    ]
+                    ui_elements['internal_table'] = tr_table(internal_cols, rows=[], row_key='id').classes('w-full')
+                    state['rendered_versions'].pop('internal_table', None)
+
+        # Tab 5: Recipes
+        def build_recipes():
+            with ui.row().classes('w-full no-wrap gap-4'):
+                with ui.card().classes('w-1/3 p-4'):
+                    tr(ui.label(), 'tab_recipes').classes('text-lg font-bold mb-4')
+                    recipe_product_selection = tr(product_select('', on_change=refresh_all_tables), 'product', 'label').classes('w-full mb-4')
+                    recipe_product_selection.bind_value(state, 'selected_recipe_ean')
+                    ui_elements['recipe_product_selection'] = recipe_product_selection
+
+                    ui.separator().classes('mb-4')
+
+                    recipe_ingredient_selection = tr(product_select(''), 'ingredient', 'label').classes('w-full mb-2')
+                    ui_elements['recipe_ingredient_selection'] = recipe_ingredient_selection
+                    recipe_qty_input = tr(ui.number(value=0), 'grams', 'label').classes('w-full mb-4')
+
+                    def add_ingredient_to_recipe():
+                        if not state['selected_recipe_ean']:
+                            ui.notify(t('ean_required'), type='warning')
+                            return
+                        if not recipe_ingredient_selection.value:
+                            ui.notify(t('ean_required'), type='warning')
+                            return
+
+                        recipes.add_ingredient_to_recipe(state['selected_recipe_ean'], recipe_ingredient_selection.value, recipe_qty_input.value)
+                        ui.notify(t('sale_completed'))
+                        refresh_all_tables()
+
+                    tr(ui.button(on_click=add_ingredient_to_recipe), 'add_ingredient').classes('w-full')
+
+                with ui.card().classes('w-2/3 p-4'):
+                    ui_elements['recipe_header_label'] = ui.label(f"{t('recipe_for')}: ...").classes('text-lg font-bold mb-4')
+
+                    cols_recipe = [
+                        {'name': 'Name', 'label': 'name', 'field': 'Name'},
+                        {'name': 'Ingredient EAN', 'label': 'ean', 'field': 'Ingredient EAN'},
+                        {'name': 'Qty', 'label': 'grams', 'field': 'Qty'},
+                        {'name': 'ACTIONS', 'label': '', 'field': 'ACTIONS'},
+                    ]
+                    ui_elements['recipe_table'] = tr_table(cols_recipe, rows=[]).classes('w-full')
+                    ui_elements['recipe_table'].add_slot('body-cell-ACTIONS', '<q-td :props="props"><q-btn size="sm" color="negative" icon="delete" @click="$parent.$emit(\'remove_ing\', props.row[\'Ingredient EAN\'])" /></q-td>')
+
+                    def remove_ing(ing_ean):
+                        recipes.remove_ingredient_from_recipe(state['selected_recipe_ean'], ing_ean)
+                        refresh_all_tables()
+
+                    ui_elements['recipe_table'].on('remove_ing', lambda msg: remove_ing(msg.args))
+
+        # Tab 6: Alerts
+        def build_alerts():
+            tr(ui.label(), 'expiration_alerts').classes('text-xl font-bold')
+            # The message is written by refresh_alerts in the current language
+            ui_elements['alert_msg_label'] = ui.label(t('no_alerts')).classes('text-lg')
+
+            alert_cols = [
+                {'name': 'EAN', 'label': 'ean', 'field': 'EAN', 'sortable': True},
+                {'name': 'Name', 'label': 'name', 'field': 'Name', 'sortable': True},
+                {'name': 'Exp Date', 'label': 'exp_date', 'field': 'Exp Date', 'sortable': True},
+                {'name': 'Qty', 'label': 'qty', 'field': 'Qty', 'sortable': True},
+                {'name': 'Status', 'label': 'status', 'field': 'Status', 'sortable': True},
+                {'name': 'Value', 'label': 'value_at_risk', 'field': 'Value', 'sortable': True},
+            ]
+            ui_elements['alert_table'] = tr_table(alert_cols, rows=[]).classes('w-full mt-4')
+            # Kept current by the expiry watcher; the button forces a recheck
+            refresh_alerts()
+
+            tr(ui.button(on_click=check_alerts_now), 'check_now').classes('mt-4')
+
         # --- Main View Tabs ---
         with ui.tabs().classes('w-full') as main_tabs:
-            ui.tab('sale', label=t('tab_sale_view'))
-            ui.tab('orders', label=t('tab_orders'))
-            ui.tab('customers', label=t('tab_customers'))
-            ui.tab('inventory_mgmt', label=t('tab_inventory_view'))
-
-        with ui.tab_panels(main_tabs, value='sale').classes('w-full').bind_value(state, 'main_view'):
-            # --- Sale View ---
-            with ui.tab_panel('sale'):
-                with ui.row().classes('w-full no-wrap'):
-                    with ui.card().classes('w-1/3 p-4'):
-                        sales_ean_input = ui.select(get_inventory_product_options(), label=t('ean'), with_input=True).classes('w-full mb-2')
-                        ui_elements['sales_ean_input'] = sales_ean_input
-                        
-                        async def add_manual_sale():
-                            if sales_ean_input.value:
-                                await handle_sale_scan_global(sales_ean_input.value, None)
-                                sales_ean_input.value = None
-                            else:
-                                ui.notify(t('ean_required'), type='warning')
-
-                        ui.button(t('add_to_basket'), on_click=add_manual_sale).classes('w-full mb-4')
-                        ui.button(t('complete_sale'), on_click=complete_sale).classes('w-full mb-2')
-                        ui.button(t('clear_basket'), on_click=clear_basket).classes('w-full')
-                    with ui.card().classes('w-2/3 p-4'):
-                        cols = [{'name': k, 'label': t(k.lower().replace(' ', '_')), 'field': k} for k in ['Name', 'EAN', 'Exp Date', 'Price', 'Qty', 'Total']]
-                        ui_elements['basket_table'] = ui.table(columns=cols, rows=[]).classes('w-full')
-                        ui_elements['grand_total_label'] = ui.label(f"{t('grand_total')}: 0.00")
-            
-            # --- Orders View ---
-            with ui.tab_panel('orders'):
-                with ui.tabs().classes('w-full') as orders_tabs:
-                    ui.tab('orders_list', label=t('tab_orders_list'))
-                    ui.tab('order_history', label=t('tab_order_history'))
-                    ui.tab('customer_ordering', label=t('tab_customer_ordering'))
-
-                with ui.tab_panels(orders_tabs, value='orders_list').classes('w-full').bind_value(state, 'orders_tab'):
-                    with ui.tab_panel('orders_list'):
-                        with ui.row().classes('w-full items-center gap-4 mb-4'):
-                            ui.label(f"{t('customer')}:").classes('font-bold')
-                            filter_customer_selection = ui.select({'all': t('all')}, value='all', on_change=refresh_all_tables).classes('w-64')
-                            filter_customer_selection.bind_value(state, 'selected_filter_customer_id')
-                            ui_elements['filter_customer_selection'] = filter_customer_selection
-                            
-                            ui.input(placeholder=t('search_placeholder'), on_change=refresh_all_tables).classes('flex-grow').bind_value(state, 'order_search_query').props('clearable icon=search')
-
-                        def delete_order(order_id):
-                            msg = orders.delete_order(order_id)
-                            ui.notify(msg)
-                            refresh_all_tables()
-
-                        def open_edit_order_dialog(order_id):
-                            current_items = list(orders.get_order_items(order_id))
-                            # Find the order object to get current due date
-                            current_order = next((o for o in orders.orders if o['Order ID'] == order_id), None)
-                            current_due_date = current_order.get('Due Date', '') if current_order else ''
-                            
-                            with ui.dialog() as dialog, ui.card().classes('w-[800px] p-4'):
-                                ui.label(f"{t('edit_order')}: {order_id}").classes('text-xl font-bold mb-4')
-                                
-                                with ui.input(t('Due Date'), value=current_due_date) as edit_due_date_input:
-                                    edit_due_date_input.classes('w-full mb-4')
-                                    with ui.menu() as menu:
-                                        ui.date().bind_value(edit_due_date_input)
-                                    with edit_due_date_input.add_slot('append'):
-                                        ui.icon('event').on('click', menu.open).classes('cursor-pointer')
-
-                                @ui.refreshable
-                                def render_edit_items():
-                                    cols = [
-                                        {'name': 'Name', 'label': t('name'), 'field': 'Name'},
-                                        {'name': 'EAN', 'label': t('ean'), 'field': 'EAN'},
-                                        {'name': 'Price', 'label': t('price'), 'field': 'Price'},
-                                        {'name': 'Qty', 'label': t('qty'), 'field': 'Qty'},
-                                        {'name': 'ACTIONS', 'label': '', 'field': 'ACTIONS'},
-                                    ]
-                                    table = ui.table(columns=cols, rows=current_items).classes('w-full mb-4')
-                                    
-                                    # Make Qty editable with QPopupEdit
-                                    table.add_slot('body-cell-Qty', '''
-                                        <q-td :props="props">
-                                            {{ props.value }}
-                                            <q-popup-edit v-model.number="props.row.Qty" v-slot="scope" buttons 
-                                                @save="(val) => $parent.$emit('update_qty', {ean: props.row.EAN, qty: val})">
-                                                <q-input type="number" v-model.number="scope.value" dense autofocus />
-                                            </q-popup-edit>
-                                        </q-td>
-                                    ''')
-
-                                    table.add_slot('body-cell-ACTIONS', '<q-td :props="props"><q-btn size="sm" color="negative" icon="delete" @click="$parent.$emit(\'remove_item\', props.row.EAN)" /></q-td>')
-                                    
-                                    def update_qty(data):
-                                        ean = data['ean']
-                                        new_qty = float(data['qty'])
-                                        for item in current_items:
-                                            if item['EAN'] == ean:
-                                                item['Qty'] = new_qty
-                                                break
-                                        render_edit_items.refresh()
-
-                                    def remove_item(ean):
-                                        nonlocal current_items
-                                        current_items = [it for it in current_items if it['EAN'] != ean]
-                                        render_edit_items.refresh()
-                                    
-                                    table.on('update_qty', lambda msg: update_qty(msg.args))
-                                    table.on('remove_item', lambda msg: remove_item(msg.args))
-
-                                with ui.row().classes('w-full gap-2 items-center mb-4'):
-                                    add_ean_input = ui.select(get_product_options(), label=t('product'), with_input=True).classes('flex-grow')
-                                    add_qty_input = ui.number(t('qty'), value=1).classes('w-24')
-                                    
-                                    def add_to_edit_list():
-                                        ean = add_ean_input.value
-                                        if not ean: return
-                                        details = products.get_product_details(ean)
-                                        if not details: return
-                                        
-                                        # Check if already in list
-                                        for it in current_items:
-                                            if it['EAN'] == ean:
-                                                it['Qty'] += add_qty_input.value
-                                                render_edit_items.refresh()
-                                                return
-                                        
-                                        current_items.append({
-                                            'EAN': ean,
-                                            'Name': details['name'],
-                                            'Price': details['price_out'],
-                                            'Qty': float(add_qty_input.value),
-                                            'Exp Date': 'N/A'
-                                        })
-                                        render_edit_items.refresh()
-
-                                    ui.button(icon='add', on_click=add_to_edit_list).classes('bg-primary text-white')
-
-                                render_edit_items()
-
-                                async def save_changes():
-                                    success, msg = orders.update_order(order_id, current_items, due_date=edit_due_date_input.value)
-                                    if success:
-                                        ui.notify(msg)
-                                        refresh_all_tables()
-                                        dialog.close()
-                                    else:
-                                        ui.notify(msg, type='negative')
-
-                                with ui.row().classes('w-full justify-end gap-2'):
-                                    ui.button(t('cancel'), on_click=dialog.close).props('flat')
-                                    ui.button(t('update_product'), on_click=save_changes)
-                            
-                            dialog.open()
-
-                        def show_order_details(order_id):
-                            items = orders.get_order_items(order_id)
-                            with ui.dialog() as dialog, ui.card().classes('w-[600px] p-4'):
-                                ui.label(f"{t('order_details')}: {order_id}").classes('text-xl font-bold mb-4')
-                                cols = [
-                                    {'name': 'Name', 'label': t('name'), 'field': 'Name'},
-                                    {'name': 'EAN', 'label': t('ean'), 'field': 'EAN'},
-                                    {'name': 'Exp Date', 'label': t('exp_date'), 'field': 'Exp Date'},
-                                    {'name': 'Qty', 'label': t('qty'), 'field': 'Qty'},
-                                    {'name': 'Price', 'label': t('price'), 'field': 'Price'},
-                                ]
-                                ui.table(columns=cols, rows=items).classes('w-full mb-4')
-                                ui.button(t('cancel'), on_click=dialog.close).props('flat')
-                            dialog.open()
-
-                        cols = [
-                            {'name': 'Order ID', 'label': t('order_id'), 'field': 'Order ID', 'sortable': True},
-                            {'name': 'Customer Name', 'label': t('customer'), 'field': 'Customer Name', 'sortable': True},
-                            {'name': 'Date', 'label': t('date'), 'field': 'Date', 'sortable': True},
-                            {'name': 'Due Date', 'label': t('Due Date'), 'field': 'Due Date', 'sortable': True},
-                            {'name': 'Total', 'label': t('total'), 'field': 'Total', 'sortable': True},
-                            {'name': 'Items', 'label': t('items'), 'field': 'Items', 'sortable': True, 'align': 'left'},
-                            {'name': 'Status', 'label': t('status'), 'field': 'Status', 'sortable': True},
-                            {'name': 'ACTIONS', 'label': '', 'field': 'ACTIONS'}
-                        ]
-
-                        ui_elements['orders_table'] = ui.table(columns=cols, rows=[], row_key='Order ID').classes('w-full')
-                        
-                        # Add custom slot for Status with colored chips
-                        ui_elements['orders_table'].add_slot('body-cell-Status', '''
-                            <q-td :props="props">
-                                <q-chip :color="props.value === 'Received' ? 'blue' : (props.value === 'Making' ? 'orange' : 'green')" 
-                                        text-color="white" clickable @click="$parent.$emit('toggle_status', props.row)">
-                                    {{ props.value }}
-                                </q-chip>
-                            </q-td>
-                        ''')
-
-                        def toggle_status(row):
-                            order_id = row['Order ID']
-                            current_status = row['Status']
-                            next_status = "Making" if current_status == "Received" else ("Finished" if current_status == "Making" else "Received")
-                            orders.update_order_status(order_id, next_status)
-                            refresh_all_tables()
-
-                        ui_elements['orders_table'].on('toggle_status', lambda msg: toggle_status(msg.args))
-                        
-                        ui_elements['orders_table'].add_slot('body-cell-ACTIONS', '<q-td :props="props"><q-btn size="sm" color="primary" icon="visibility" @click="$parent.$emit(\'view\', props.row[\'Order ID\'])" /><q-btn size="sm" color="orange" icon="edit" @click="$parent.$emit(\'edit\', props.row[\'Order ID\'])" /><q-btn size="sm" color="negative" icon="delete" @click="$parent.$emit(\'delete\', props.row[\'Order ID\'])" /></q-td>')
-                        ui_elements['orders_table'].on('view', lambda msg: show_order_details(msg.args))
-                        ui_elements['orders_table'].on('edit', lambda msg: open_edit_order_dialog(msg.args))
-                        ui_elements['orders_table'].on('delete', lambda msg: delete_order(msg.args))
-                    
-                    with ui.tab_panel('order_history'):
-                        with ui.row().classes('w-full items-center gap-4 mb-4'):
-                            ui.label(f"{t('customer')}:").classes('font-bold')
-                            # We don't need to store this separately as they share the same state
-                            ui.select({'all': t('all')}, value='all', on_change=refresh_all_tables).classes('w-64').bind_value(state, 'selected_filter_customer_id')
-                            
-                            ui.input(placeholder=t('search_placeholder'), on_change=refresh_all_tables).classes('flex-grow').bind_value(state, 'order_search_query').props('clearable icon=search')
-
-                        cols_history = [
-                            {'name': 'Order ID', 'label': t('order_id'), 'field': 'Order ID', 'sortable': True},
-                            {'name': 'Customer Name', 'label': t('customer'), 'field': 'Customer Name', 'sortable': True},
-                            {'name': 'Date', 'label': t('date'), 'field': 'Date', 'sortable': True},
-                            {'name': 'Due Date', 'label': t('Due Date'), 'field': 'Due Date', 'sortable': True},
-                            {'name': 'Total', 'label': t('total'), 'field': 'Total', 'sortable': True},
-                            {'name': 'Items', 'label': t('items'), 'field': 'Items', 'sortable': True, 'align': 'left'},
-                            {'name': 'Status', 'label': t('status'), 'field': 'Status', 'sortable': True},
-                            {'name': 'ACTIONS', 'label': '', 'field': 'ACTIONS'}
-                        ]
-                        ui_elements['order_history_table'] = ui.table(columns=cols_history, rows=[], row_key='Order ID').classes('w-full')
-                        ui_elements['order_history_table'].add_slot('body-cell-Status', '''
-                            <q-td :props="props">
-                                <q-chip color="green" text-color="white" clickable @click="$parent.$emit('toggle_status', props.row)">
-                                    {{ props.value }}
-                                </q-chip>
-                            </q-td>
-                        ''')
-                        ui_elements['order_history_table'].on('toggle_status', lambda msg: toggle_status(msg.args))
-                        ui_elements['order_history_table'].add_slot('body-cell-ACTIONS', '<q-td :props="props"><q-btn size="sm" color="primary" icon="visibility" @click="$parent.$emit(\'view\', props.row[\'Order ID\'])" /><q-btn size="sm" color="orange" icon="edit" @click="$parent.$emit(\'edit\', props.row[\'Order ID\'])" /><q-btn size="sm" color="negative" icon="delete" @click="$parent.$emit(\'delete\', props.row[\'Order ID\'])" /></q-td>')
-                        ui_elements['order_history_table'].on('view', lambda msg: show_order_details(msg.args))
-                        ui_elements['order_history_table'].on('edit', lambda msg: open_edit_order_dialog(msg.args))
-                        ui_elements['order_history_table'].on('delete', lambda msg: delete_order(msg.args))
-
-                    with ui.tab_panel('order_search'):
-                        with ui.row().classes('w-full items-center gap-4 mb-4'):
-                            ui.input(t('tab_order_search'), placeholder=t('search_placeholder'), on_change=refresh_all_tables).classes('w-full').bind_value(state, 'order_search_query').props('clearable icon=search')
-
-                        cols_search = [
-                            {'name': 'Order ID', 'label': t('order_id'), 'field': 'Order ID', 'sortable': True},
-                            {'name': 'Customer Name', 'label': t('customer'), 'field': 'Customer Name', 'sortable': True},
-                            {'name': 'Date', 'label': t('date'), 'field': 'Date', 'sortable': True},
-                            {'name': 'Due Date', 'label': t('Due Date'), 'field': 'Due Date', 'sortable': True},
-                            {'name': 'Total', 'label': t('total'), 'field': 'Total', 'sortable': True},
-                            {'name': 'Items', 'label': t('items'), 'field': 'Items', 'sortable': True, 'align': 'left'},
-                            {'name': 'Status', 'label': t('status'), 'field': 'Status', 'sortable': True},
-                            {'name': 'ACTIONS', 'label': '', 'field': 'ACTIONS'}
-                        ]
-                        ui_elements['orders_search_table'] = ui.table(columns=cols_search, rows=[], row_key='Order ID').classes('w-full')
-                        ui_elements['orders_search_table'].add_slot('body-cell-Status', '''
-                            <q-td :props="props">
-                                <q-chip :color="props.value === 'Received' ? 'blue' : (props.value === 'Making' ? 'orange' : 'green')" 
-                                        text-color="white" clickable @click="$parent.$emit('toggle_status', props.row)">
-                                    {{ props.value }}
-                                </q-chip>
-                            </q-td>
-                        ''')
-                        ui_elements['orders_search_table'].on('toggle_status', lambda msg: toggle_status(msg.args))
-                        ui_elements['orders_search_table'].add_slot('body-cell-ACTIONS', '<q-td :props="props"><q-btn size="sm" color="primary" icon="visibility" @click="$parent.$emit(\'view\', props.row[\'Order ID\'])" /><q-btn size="sm" color="orange" icon="edit" @click="$parent.$emit(\'edit\', props.row[\'Order ID\'])" /><q-btn size="sm" color="negative" icon="delete" @click="$parent.$emit(\'delete\', props.row[\'Order ID\'])" /></q-td>')
-                        ui_elements['orders_search_table'].on('view', lambda msg: show_order_details(msg.args))
-                        ui_elements['orders_search_table'].on('edit', lambda msg: open_edit_order_dialog(msg.args))
-                        ui_elements['orders_search_table'].on('delete', lambda msg: delete_order(msg.args))
-
-                    with ui.tab_panel('customer_ordering'):
-                        with ui.row().classes('w-full no-wrap'):
-                            with ui.card().classes('w-1/3 p-4'):
-                                ui.label(t('tab_customer_ordering')).classes('text-lg font-bold mb-4')
-                                customer_selection = ui.select(get_customer_options(), label=t('select_customer'), with_input=True).classes('w-full mb-4')
-                                customer_selection.bind_value(state, 'selected_order_customer_id')
-                                ui_elements['customer_selection'] = customer_selection
-
-                                with ui.input(t('Due Date')) as order_due_date_input:
-                                    order_due_date_input.classes('w-full mb-4')
-                                    with ui.menu() as menu:
-                                        ui.date().bind_value(order_due_date_input)
-                                    with order_due_date_input.add_slot('append'):
-                                        ui.icon('event').on('click', menu.open).classes('cursor-pointer')
-
-                                order_product_input = ui.select(get_product_options(), label=t('product'), with_input=True).classes('w-full mb-2')
-                                ui_elements['order_product_input'] = order_product_input
-                                order_qty_input = ui.number(t('qty'), value=1, step=0.01, format='%.2f').classes('w-full mb-4')
-
-                                ui.button(t('add_to_basket'), on_click=lambda: add_to_order_basket(order_product_input.value, order_qty_input.value)).classes('w-full mb-4')
-                                ui.button(t('save_as_order'), on_click=lambda: complete_order(order_due_date_input.value)).classes('w-full')
-                            
-                            with ui.card().classes('w-2/3 p-4'):
-                                basket_cols = [
-                                    {'name': 'Name', 'label': t('name'), 'field': 'Name'},
-                                    {'name': 'EAN', 'label': t('ean'), 'field': 'EAN'},
-                                    {'name': 'Price', 'label': t('price'), 'field': 'Price'},
-                                    {'name': 'Qty', 'label': t('qty'), 'field': 'Qty', 'format': '(val) => val.toFixed(2)'},
-                                    {'name': 'Total', 'label': t('total'), 'field': 'Total', 'format': '(val) => val.toFixed(2)'}
-                                ]
-                                ui_elements['order_basket_table'] = ui.table(columns=basket_cols, rows=[]).classes('w-full')
-                                ui_elements['order_total_label'] = ui.label(f"{t('grand_total')}: 0.00").classes('text-lg font-bold mt-4')
-
-            # --- Customers View ---
-            with ui.tab_panel('customers'):
-                with ui.row().classes('w-full no-wrap gap-4'):
-                    # Left: Entry Form
-                    with ui.card().classes('w-1/3 p-4'):
-                        ui.label(t('add_customers')).classes('text-lg font-bold mb-2')
-                        with ui.column().classes('w-full gap-2'):
-                            cname_input = ui.input(t('name')).classes('w-full')
-                            comp_input = ui.input(t('company_name')).classes('w-full')
-                            
-                            with ui.row().classes('w-full gap-2'):
-                                org_nr_input = ui.input(t('org_nr')).classes('flex-grow')
-                                vat_nr_input = ui.input(t('vat_nr')).classes('flex-grow')
-                            
-                            with ui.row().classes('w-full gap-2'):
-                                phone_input = ui.input(t('phone')).classes('flex-grow')
-                                email_input = ui.input(t('email')).classes('flex-grow')
-                            
-                            addr_input = ui.input(t('address')).classes('w-full')
-                            web_input = ui.input(t('website')).classes('w-full')
-                            notes_input = ui.textarea(t('notes')).classes('w-full')
-                            
-                            ui.button(t('save_customer'), on_click=add_customer).classes('w-full mt-2')
-
-                    # Right: Customer List
-                    with ui.card().classes('w-2/3 p-4'):
-                        cols = [
-                            {'name': 'Customer ID', 'label': t('customer_id'), 'field': 'Customer ID', 'sortable': True},
-                            {'name': 'Name', 'label': t('name'), 'field': 'Name', 'sortable': True},
-                            {'name': 'Company Name', 'label': t('company_name'), 'field': 'Company Name', 'sortable': True},
-                            {'name': 'Org Number', 'label': t('org_nr'), 'field': 'Org Number', 'sortable': True},
-                            {'name': 'Phone', 'label': t('phone'), 'field': 'Phone'},
-                            {'name': 'Email', 'label': t('email'), 'field': 'Email'},
-                            {'name': 'ACTIONS', 'label': '', 'field': 'ACTIONS'}
-                        ]
-                        ui_elements['customer_table'] = ui.table(columns=cols, rows=customers.get_customers_df().to_dict('records'), row_key='Customer ID').classes('w-full')
-                        ui_elements['customer_table'].add_slot('body-cell-ACTIONS', '<q-td :props="props"><q-btn size="sm" color="primary" icon="edit" @click="$parent.$emit(\'edit\', props.row[\'Customer ID\'])" /><q-btn size="sm" color="negative" icon="delete" @click="$parent.$emit(\'delete\', props.row[\'Customer ID\'])" /></q-td>')
-                        ui_elements['customer_table'].on('edit', lambda msg: open_edit_customer_dialog(msg.args))
-                        ui_elements['customer_table'].on('delete', lambda msg: delete_customer(msg.args))
-
-            # --- Inventory Management View ---
-            with ui.tab_panel('inventory_mgmt'):
-                with ui.tabs().classes('w-full') as tabs:
-                    ui.tab('product_setup', label=t('tab_product_setup'))
-                    ui.tab('qr_labels', label=t('tab_qr_labels'))
-                    ui.tab('inventory', label=t('tab_inventory'))
-                    ui.tab('internal_inventory', label=t('tab_internal_inventory'))
-                    ui.tab('recipes', label=t('tab_recipes'))
-                    ui.tab('alerts', label=t('tab_alerts'))
-
-                with ui.tab_panels(tabs, value='product_setup').classes('w-full').bind_value(state, 'current_tab'):
-                    # Tab 1: Product Setup
-                    with ui.tab_panel('product_setup'):
-                        with ui.row().classes('w-full no-wrap'):
-                            with ui.card().classes('w-1/3 p-4'):
-                                ean_input, name_input, shelf_life_input, url_input = ui.input(t('ean_code')), ui.input(t('product_name')), ui.number(t('shelf_life'), value=7), ui.input(t('product_url'))
-                                with ui.row().classes('w-full gap-2'):
-                                    price_in_input, price_out_input = ui.number(t('price_in'), value=0.0), ui.number(t('price_out'), value=0.0)
-                                ui.button(t('save_product'), on_click=add_product)
-                            with ui.card().classes('w-2/3 p-4'):
-                                cols = [{'name': k, 'label': t(k.lower().replace(' ', '_')), 'field': k} for k in ['EAN', 'Name', 'Shelf Life', 'Price In', 'Price Out', 'URL', 'ACTIONS']]
-                                ui_elements['product_table'] = ui.table(columns=cols, rows=products.get_products_df().to_dict('records'), row_key='EAN').classes('w-full')
-                                ui_elements['product_table'].add_slot('body-cell-ACTIONS', '<q-td :props="props"><q-btn size="sm" color="primary" icon="edit" @click="$parent.$emit(\'edit\', props.row.EAN)" /><q-btn size="sm" color="negative" icon="delete" @click="$parent.$emit(\'delete\', props.row.EAN)" /></q-td>')
-                                ui_elements['product_table'].on('edit', lambda msg: open_edit_dialog(msg.args))
-                                ui_elements['product_table'].on('delete', lambda msg: delete_product(msg.args))
-
-                    # Tab 2: QR Labels
-                    with ui.tab_panel('qr_labels'):
-                        with ui.column().classes('items-center w-full'):
-                            qr_ean_input = ui.select(get_product_options(), label=t('scan_type_ean'), with_input=True).classes('w-full max-w-sm')
-                            ui_elements['qr_ean_input'] = qr_ean_input
-                            qr_exp_input = ui.input(t('exp_date'))
-                            ui.button(t('generate_product_qr'), on_click=generate_qr)
-                            qr_display, qr_info_label = ui.image().classes('w-64 h-64 border'), ui.label()
-                            with ui.column().classes('items-center') as qr_download_group:
-                                qr_download_group.set_visibility(False)
-                                qr_qty_input = ui.number(t('quantity_labels'), value=1)
-                                ui.button(t('download_pdf'), on_click=lambda: ui.notify("PDF!"))
-
-                    # Tab 3: Inventory
-                    with ui.tab_panel('inventory'):
-                        with ui.row().classes('w-full no-wrap'):
-                            with ui.card().classes('w-1/3 p-4'):
-                                reg_ean_input = ui.select(get_product_options(), label=t('ean'), with_input=True).classes('w-full')
-                                reg_date_input, reg_qty_input = ui.input(t('exp_date')), ui.number(t('qty'), value=1)
-                                ui_elements['reg_ean_input'], ui_elements['reg_date_input'] = reg_ean_input, reg_date_input
-                                ui.button(t('add_stock'), on_click=lambda: update_stock('Add'))
-                                ui.button(t('remove_stock'), on_click=lambda: update_stock('Remove'))
-                            with ui.card().classes('w-2/3 p-4'):
-                                cols = [{'name': k, 'label': t(k.lower().replace(' ', '_')), 'field': k} for k in ['EAN', 'Name', 'Exp Date', 'Qty']]
-                                ui_elements['inventory_table'] = ui.table(columns=cols, rows=inventory.get_inventory_df().to_dict('records')).classes('w-full')
-
-                    # Tab 4: Internal Inventory
-                    with ui.tab_panel('internal_inventory'):
-                        with ui.row().classes('w-full no-wrap'):
-                            with ui.card().classes('w-1/3 p-4'):
-                                internal_ean_input = ui.select(get_product_options(), label=t('ean'), with_input=True).classes('w-full')
-                                internal_date_input, internal_qty_input = ui.input(t('exp_date')), ui.number(t('qty_kg'), value=1, step=0.01, format='%.2f')
-                                ui_elements['internal_ean_input'], ui_elements['internal_date_input'] = internal_ean_input, internal_date_input
-                                ui.button(t('add_stock'), on_click=lambda: update_stock('Add', is_internal=True))
-                                ui.button(t('remove_stock'), on_click=lambda: update_stock('Remove', is_internal=True))
-                            with ui.card().classes('w-2/3 p-4'):
-                                internal_cols = [
-                                    {'name': 'EAN', 'label': t('ean'), 'field': 'EAN'},
-                                    {'name': 'Name', 'label': t('name'), 'field': 'Name'},
-                                    {'name': 'Exp Date', 'label': t('exp_date'), 'field': 'Exp Date'},
-                                    {'name': 'Qty', 'label': t('qty_kg'), 'field': 'Qty'}
-                                ]
-                                ui_elements['internal_table'] = ui.table(columns=internal_cols, rows=[]).classes('w-full')
-
-                    # Tab 5: Recipes
-                    with ui.tab_panel('recipes'):
-                        with ui.row().classes('w-full no-wrap gap-4'):
-                            with ui.card().classes('w-1/3 p-4'):
-                                ui.label(t('tab_recipes')).classes('text-lg font-bold mb-4')
-                                recipe_product_selection = ui.select(get_product_options(), label=t('product'), with_input=True, on_change=refresh_all_tables).classes('w-full mb-4')
-                                recipe_product_selection.bind_value(state, 'selected_recipe_ean')
-                                ui_elements['recipe_product_selection'] = recipe_product_selection
-
-                                ui.separator().classes('mb-4')
-                                
-                                recipe_ingredient_selection = ui.select(get_internal_product_options(), label=t('ingredient'), with_input=True).classes('w-full mb-2')
-                                ui_elements['recipe_ingredient_selection'] = recipe_ingredient_selection
-                                recipe_qty_input = ui.number(t('grams'), value=0).classes('w-full mb-4')
-
-                                def add_ingredient_to_recipe():
-                                    if not state['selected_recipe_ean']:
-                                        ui.notify(t('ean_required'), type='warning')
-                                        return
-                                    if not recipe_ingredient_selection.value:
-                                        ui.notify(t('ean_required'), type='warning')
-                                        return
-                                    
-                                    recipes.add_ingredient_to_recipe(state['selected_recipe_ean'], recipe_ingredient_selection.value, recipe_qty_input.value)
-                                    ui.notify(t('sale_completed'))
-                                    refresh_all_tables()
-
-                                ui.button(t('add_ingredient'), on_click=add_ingredient_to_recipe).classes('w-full')
-
-                            with ui.card().classes('w-2/3 p-4'):
-                                ui_elements['recipe_header_label'] = ui.label(f"{t('recipe_for')}: ...").classes('text-lg font-bold mb-4')
-                                
-                                cols_recipe = [
-                                    {'name': 'Name', 'label': t('name'), 'field': 'Name'},
-                                    {'name': 'Ingredient EAN', 'label': t('ean'), 'field': 'Ingredient EAN'},
-                                    {'name': 'Qty', 'label': t('grams'), 'field': 'Qty'},
-                                    {'name': 'ACTIONS', 'label': '', 'field': 'ACTIONS'},
-                                ]
-                                ui_elements['recipe_table'] = ui.table(columns=cols_recipe, rows=[]).classes('w-full')
-                                ui_elements['recipe_table'].add_slot('body-cell-ACTIONS', '<q-td :props="props"><q-btn size="sm" color="negative" icon="delete" @click="$parent.$emit(\'remove_ing\', props.row[\'Ingredient EAN\'])" /></q-td>')
-                                
-                                def remove_ing(ing_ean):
-                                    recipes.remove_ingredient_from_recipe(state['selected_recipe_ean'], ing_ean)
-                                    refresh_all_tables()
-                                
-                                ui_elements['recipe_table'].on('remove_ing', lambda msg: remove_ing(msg.args))
-
-                    # Tab 6: Alerts
-                    with ui.tab_panel('alerts'):
-                        ui.label(t('expiration_alerts')).classes('text-xl font-bold')
-                        alert_msg_label = ui.label(t('no_alerts')).classes('text-lg')
-                        
-                        alert_cols = [
-                            {'name': 'EAN', 'label': t('ean'), 'field': 'EAN', 'sortable': True},
-                            {'name': 'Name', 'label': t('name'), 'field': 'Name', 'sortable': True},
-                            {'name': 'Exp Date', 'label': t('exp_date'), 'field': 'Exp Date', 'sortable': True},
-                            {'name': 'Qty', 'label': t('qty'), 'field': 'Qty', 'sortable': True},
-                            {'name': 'Status', 'label': t('status'), 'field': 'Status', 'sortable': True},
-                        ]
-                        alert_table = ui.table(columns=alert_cols, rows=[]).classes('w-full mt-4')
-                        
-                        def check_alerts():
-                            # Combine regular and internal inventory for checking
-                            msg, df = alerts.check_alerts(inventory.get_raw_inventory(), internal_inventory.get_raw_inventory())
-                            alert_msg_label.text = msg
-                            alert_table.rows[:] = df.to_dict('records')
-                            alert_table.update()
-
-                        ui.button(t('check_now'), on_click=check_alerts).classes('mt-4')
+            tr(ui.tab('sale'), 'tab_sale_view', 'label')
+            tr(ui.tab('orders'), 'tab_orders', 'label')
+            tr(ui.tab('customers'), 'tab_customers', 'label')
+            tr(ui.tab('inventory_mgmt'), 'tab_inventory_view', 'label')
+
+        # Only the shown panels are built; the others on their first visit
+        with tab_panels('main', main_tabs, 'sale', 'main_view'):
+            lazy_panel('sale', build_sale)
+            lazy_panel('orders', build_orders)
+            lazy_panel('customers', build_customers)
+            lazy_panel('inventory_mgmt', build_inventory_mgmt)
+        build_shown_panels()
 
     render_header()
     render_content()